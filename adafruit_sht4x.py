@@ -1,5 +1,6 @@
 import time
 import struct
+import uasyncio as asyncio
 from machine import I2C, Pin
 
 _SHT4X_DEFAULT_ADDR = const(0x44)  # SHT4X I2C Address
@@ -115,15 +116,43 @@ class SHT4x:
 
     def measurements(self):
         """both `temperature` and `relative_humidity`, read simultaneously"""
+        self._start_measurement()
+        time.sleep_ms(self._delay_ms())  # Delay in milliseconds
+        self.i2c.readfrom_into(_SHT4X_DEFAULT_ADDR, self._buffer)
+        return self._decode()
+
+    def read(self):
+        """
+        Same as `measurements`, under the name sampler.Sampler and the
+        SEN0546 driver use: returns (temperature_in_F, humidity). Raises
+        OSError where `measurements` returns Nones after an I/O error.
+        """
+        temperature, humidity = self.measurements()
+        if temperature is None:
+            raise OSError("SHT4x read failed")
+        return (temperature, humidity)
 
-        temperature = None
-        humidity = None
-        command = self._mode
+    async def read_async(self):
+        """
+        Same as `measurements`, but yields to other tasks during the
+        conversion delay (up to 1.1 s in the heater modes).
+        """
+        self._start_measurement()
+        await asyncio.sleep_ms(self._delay_ms())
+        self.i2c.readfrom_into(_SHT4X_DEFAULT_ADDR, self._buffer)
+        return self._decode()
 
-        self._buffer[0] = command
+    def _start_measurement(self):
+        self._buffer[0] = self._mode
         self.i2c.writeto(_SHT4X_DEFAULT_ADDR, self._buffer)
-        time.sleep_ms(int(Mode.delay[self._mode] * 1000))  # Delay in milliseconds
-        self.i2c.readfrom_into(_SHT4X_DEFAULT_ADDR, self._buffer)
+
+    def _delay_ms(self):
+        return int(Mode.delay[self._mode] * 1000)
+
+    def _decode(self):
+        """CRC check and convert the 6 bytes in the buffer"""
+        temperature = None
+        humidity = None
 
         try:
             # separate the read data
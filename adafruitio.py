@@ -0,0 +1,228 @@
+import json
+import uasyncio as asyncio
+from asynchttp import ConnectionPool, Response
+from mqtt import MQTTClient
+
+AIO_HOST = 'io.adafruit.com'
+
+class AdafruitIO:
+    """
+    Adafruit IO REST client over a shared keep-alive connection pool.
+
+    The headers dict and the per-feed paths are built once and reused, so
+    each request only encodes its body.
+
+    Parameters:
+      username  -- Adafruit IO username
+      key       -- Adafruit IO key
+      pool_size -- number of keep-alive connections to hold open (default: 2)
+      timeout   -- seconds allowed for each request
+    """
+
+    def __init__(self, username, key, pool_size=2, timeout=15):
+        self.pool = ConnectionPool(AIO_HOST, size=pool_size)
+        self.base = f'/api/v2/{username}'
+        self.timeout = timeout
+        self.headers = {
+            'X-AIO-Key': key,
+            'Content-Type': 'application/json'
+        }
+        self._paths = {}
+
+    def _path(self, kind, key, suffix):
+        name = (kind, key, suffix)
+        path = self._paths.get(name)
+        if path is None:
+            path = f'{self.base}/{kind}/{key}/data{suffix}'
+            self._paths[name] = path
+        return path
+
+    async def get_last(self, feed, etag=None):
+        """
+        GET the most recent value of a feed. With the ETag of an earlier
+        reply, an unchanged value comes back as a bodyless 304.
+        """
+        headers = self.headers
+        if etag:
+            headers = dict(self.headers)
+            headers['If-None-Match'] = etag
+        return await self.pool.request('GET', self._path('feeds', feed, '/last?include=value,created_at'),
+                                       headers=headers, timeout=self.timeout)
+
+    async def post_feed(self, feed, value):
+        """POST one value to a feed."""
+        return await self.pool.request('POST', self._path('feeds', feed, ''),
+                                       headers=self.headers, json={'value': value}, timeout=self.timeout)
+
+    async def post_batch(self, feed, data):
+        """POST a list of {'value', 'created_at'} dicts to a feed in one request."""
+        return await self.pool.request('POST', self._path('feeds', feed, '/batch'),
+                                       headers=self.headers, json={'data': data}, timeout=self.timeout)
+
+    async def post_group(self, feeds, group='default'):
+        """POST a list of {'key', 'value'} dicts to a group in one request."""
+        return await self.pool.request('POST', self._path('groups', group, ''),
+                                       headers=self.headers, json={'feeds': feeds}, timeout=self.timeout)
+
+    def reconnected(self):
+        """Drop pooled sockets after Wi-Fi has been re-established."""
+        self.pool.reset()
+
+    def stats(self):
+        return self.pool.stats()
+
+class AdafruitIOMQTT:
+    """
+    Adafruit IO over one persistent MQTT connection, with the calls
+    TelemetryQueue and main.py make on AdafruitIO.
+
+    Values of the subscribed feeds are pushed by the broker and kept in
+    values, so get_last() answers from RAM; changed is set whenever one
+    arrives. Group and feed posts become publishes. post_batch(), and
+    get_last() for a feed not seen yet, go to the HTTP client if one is
+    given. A message on the throttle topic makes the next post_group()
+    answer 429 so the telemetry queue backs off.
+
+    run() must be running: it connects, subscribes, asks for the current
+    value of each subscribed feed, pings and reconnects with backoff.
+
+    Parameters:
+      username  -- Adafruit IO username
+      key       -- Adafruit IO key
+      subscribe -- feed keys to subscribe to
+      http      -- an AdafruitIO for the calls MQTT can't do, or None
+      keepalive -- seconds between pings
+      port      -- 8883 (TLS) or 1883
+    """
+
+    def __init__(self, username, key, subscribe=(), http=None, keepalive=60, port=8883):
+        self.username = username
+        self.feeds = subscribe
+        self.http = http
+        self.keepalive = keepalive
+        self.client = MQTTClient(f'{username}-gecko', AIO_HOST, port, username, key,
+                                 ssl=port == 8883, keepalive=keepalive)
+        self.client.callback = self._message
+        self.values = {}
+        self.changed = asyncio.Event()
+        self.connected = False
+        self._throttled = False
+        self.connects = 0
+        self.published = 0
+        self.received = 0
+        self.throttles = 0
+
+    def _topic(self, feed):
+        return f'{self.username}/feeds/{feed}'
+
+    def _message(self, topic, payload):
+        value = payload.decode()
+        if topic.endswith('/throttle'):
+            print(f"Adafruit IO throttle: {value}")
+            self.throttles += 1
+            self._throttled = True
+            return
+        if topic.endswith('/errors'):
+            print(f"Adafruit IO error: {value}")
+            return
+        self.received += 1
+        feed = topic.rsplit('/', 1)[-1]
+        if self.values.get(feed) != value:
+            self.values[feed] = value
+            self.changed.set()
+
+    async def _connect(self):
+        # A broker that accepts the socket but never sends CONNACK would hold run() here for good
+        try:
+            await asyncio.wait_for(self.client.connect(clean_session=False), self.keepalive)
+        except asyncio.TimeoutError:
+            raise OSError("MQTT connect timed out")
+        self.connects += 1
+        for feed in self.feeds:
+            await self.client.subscribe(self._topic(feed))
+        await self.client.subscribe(f'{self.username}/throttle')
+        await self.client.subscribe(f'{self.username}/errors')
+        # Adafruit IO doesn't retain, /get makes it send the current value
+        for feed in self.feeds:
+            await self.client.publish(self._topic(feed) + '/get', '')
+        self.connected = True
+
+    async def _pinger(self):
+        while True:
+            await asyncio.sleep(self.keepalive // 2)
+            if self.client.silent_ms() > self.keepalive * 1500:
+                # No PINGRESP either, the link is dead; run() sees the close
+                print("MQTT broker silent, reconnecting")
+                self.client.close()
+                return
+            try:
+                await self.client.ping()
+            except Exception:
+                return
+
+    async def run(self):
+        """Keep the connection up. Runs forever."""
+        backoff = 1
+        while True:
+            try:
+                await self._connect()
+                backoff = 1
+                pinger = asyncio.create_task(self._pinger())
+                try:
+                    await self.client.run()
+                finally:
+                    pinger.cancel()
+            except Exception as e:
+                print(f"MQTT connection lost: {e}")
+            self.connected = False
+            self.client.close()
+            await asyncio.sleep(backoff)
+            backoff = min(backoff * 2, 60)
+
+    def _require(self):
+        if not self.connected:
+            raise OSError("MQTT not connected")
+
+    async def get_last(self, feed, etag=None):
+        """The last value pushed for a subscribed feed."""
+        if feed in self.values:
+            return Response(200, {}, json.dumps({'value': self.values[feed]}).encode())
+        if self.http:
+            return await self.http.get_last(feed, etag)
+        return Response(404, {}, b'{"error": "no value yet"}')
+
+    async def post_feed(self, feed, value):
+        self._require()
+        await self.client.publish(self._topic(feed), str(value))
+        self.published += 1
+        return Response(200, {}, b'{}')
+
+    async def post_batch(self, feed, data):
+        if self.http:
+            return await self.http.post_batch(feed, data)
+        raise OSError("Batch posts need HTTP")
+
+    async def post_group(self, feeds, group='default'):
+        self._require()
+        if self._throttled:
+            self._throttled = False
+            return Response(429, {}, b'{"error": "throttled"}')
+        values = {}
+        for item in feeds:
+            values[item['key']] = item['value']
+        await self.client.publish(f'{self.username}/groups/{group}', json.dumps({'feeds': values}))
+        self.published += 1
+        return Response(200, {}, b'[]')
+
+    def reconnected(self):
+        """Drop the connection after Wi-Fi has been re-established; run() reconnects."""
+        self.client.close()
+        if self.http:
+            self.http.reconnected()
+
+    def stats(self):
+        stats = {'connected': self.connected, 'connects': self.connects, 'published': self.published,
+                 'received': self.received, 'throttles': self.throttles}
+        if self.http:
+            stats['http'] = self.http.stats()
+        return stats
@@ -0,0 +1,201 @@
+import json
+import uasyncio as asyncio
+
+class Response:
+    """
+    Minimal response object with the parts of the urequests API main.py uses:
+    status_code, text, json() and close().
+    """
+
+    def __init__(self, status_code, headers, content):
+        self.status_code = status_code
+        self.headers = headers
+        self.content = content
+
+    @property
+    def text(self):
+        return self.content.decode('utf-8')
+
+    def json(self):
+        return json.loads(self.content)
+
+    def close(self):
+        # The connection is already closed once the body has been read
+        self.content = b''
+
+def parse_url(url):
+    """Split a URL into (use_ssl, host, port, path)."""
+    parts = url.split('/', 3)
+    proto, host = parts[0], parts[2]
+    path = parts[3] if len(parts) > 3 else ''
+    if proto == 'https:':
+        use_ssl, port = True, 443
+    elif proto == 'http:':
+        use_ssl, port = False, 80
+    else:
+        raise ValueError("Unsupported protocol: " + proto)
+    if ':' in host:
+        host, port = host.split(':', 1)
+        port = int(port)
+    return use_ssl, host, port, '/' + path
+
+def encode_request(method, host, path, headers, json_data, data, keep_alive=False):
+    """Build the raw HTTP/1.1 request bytes."""
+    if json_data is not None:
+        data = json.dumps(json_data)
+    if isinstance(data, str):
+        data = data.encode('utf-8')
+    lines = [f'{method} {path} HTTP/1.1', f'Host: {host}']
+    lines.append('Connection: keep-alive' if keep_alive else 'Connection: close')
+    if headers:
+        for name in headers:
+            lines.append(f'{name}: {headers[name]}')
+    if data is not None:
+        lines.append(f'Content-Length: {len(data)}')
+    head = ('\r\n'.join(lines) + '\r\n\r\n').encode('utf-8')
+    return head + data if data is not None else head
+
+def _no_body(method, status_code):
+    # These never have a body, whatever the headers say (RFC 9112 section 6.3)
+    return method == 'HEAD' or status_code < 200 or status_code in (204, 304)
+
+async def read_response(reader, method='GET'):
+    """
+    Read the status line, headers and body of one HTTP/1.1 response to a
+    method request. A body without Content-Length or chunked encoding is
+    read until the server closes the connection.
+    """
+    line = await reader.readline()
+    if not line:
+        raise OSError("Connection closed before response")
+    status_code = int(line.split(None, 2)[1])
+    headers = {}
+    while True:
+        line = await reader.readline()
+        if not line or line == b'\r\n':
+            break
+        name, _, value = line.decode('utf-8').partition(':')
+        headers[name.strip().lower()] = value.strip()
+    if _no_body(method, status_code):
+        content = b''
+    elif headers.get('transfer-encoding', '').lower() == 'chunked':
+        chunks = []
+        while True:
+            size = int((await reader.readline()).split(b';')[0], 16)
+            if size == 0:
+                await reader.readline()
+                break
+            chunks.append(await reader.readexactly(size))
+            await reader.readline()
+        content = b''.join(chunks)
+    elif 'content-length' in headers:
+        content = await reader.readexactly(int(headers['content-length']))
+    else:
+        content = await reader.read(-1)
+    return Response(status_code, headers, content)
+
+async def _request(method, url, headers, json_data, data):
+    use_ssl, host, port, path = parse_url(url)
+    reader, writer = await asyncio.open_connection(host, port, ssl=use_ssl)
+    try:
+        writer.write(encode_request(method, host, path, headers, json_data, data))
+        await writer.drain()
+        return await read_response(reader, method)
+    finally:
+        writer.close()
+        await writer.wait_closed()
+
+async def request(method, url, headers=None, json=None, data=None, timeout=10):
+    """
+    Perform one HTTP/1.1 request without blocking the event loop.
+
+    The TLS handshake and the response read yield to other tasks. DNS does
+    not: MicroPython's asyncio.open_connection() calls getaddrinfo()
+    synchronously, so every new connection still blocks the loop for the
+    lookup. ConnectionPool keeps that to one lookup per new connection.
+    Raises asyncio.TimeoutError if the whole exchange takes longer than
+    timeout seconds; the connection is closed either way.
+    """
+    return await asyncio.wait_for(_request(method, url, headers, json, data), timeout)
+
+async def get(url, **kw):
+    return await request('GET', url, **kw)
+
+async def post(url, **kw):
+    return await request('POST', url, **kw)
+
+class ConnectionPool:
+    """
+    Keeps up to size HTTP/1.1 keep-alive connections to one host open and
+    reuses them across requests, so each request skips the connect and TLS
+    handshake.
+
+    An idle connection the server or Wi-Fi has dropped is replaced with a
+    fresh one and the request retried once. Call reset() after Wi-Fi comes
+    back to discard sockets from the old link.
+
+    Counters: hits (request reused an idle connection), misses (a new
+    connection was opened) and reconnects (an idle connection was dead).
+    """
+
+    def __init__(self, host, port=443, ssl=True, size=2):
+        self.host = host
+        self.port = port
+        self.ssl = ssl
+        self.size = size
+        self._idle = []
+        self.hits = 0
+        self.misses = 0
+        self.reconnects = 0
+
+    def _close(self, conn):
+        try:
+            conn[1].close()
+        except Exception:
+            pass
+
+    def reset(self):
+        """Close every idle connection."""
+        while self._idle:
+            self._close(self._idle.pop())
+
+    async def _send(self, conn, method, payload):
+        reader, writer = conn
+        done = False
+        try:
+            writer.write(payload)
+            await writer.drain()
+            response = await read_response(reader, method)
+            done = True
+        finally:
+            if not done:
+                self._close(conn)
+        reusable = response.headers.get('connection', '').lower() != 'close' and (
+            'content-length' in response.headers or 'transfer-encoding' in response.headers or
+            _no_body(method, response.status_code))
+        if reusable and len(self._idle) < self.size:
+            self._idle.append(conn)
+        else:
+            self._close(conn)
+        return response
+
+    async def _request(self, method, payload):
+        if self._idle:
+            self.hits += 1
+            try:
+                return await self._send(self._idle.pop(), method, payload)
+            except (OSError, EOFError):
+                # Stale socket, fall through to a fresh connection
+                self.reconnects += 1
+        else:
+            self.misses += 1
+        conn = await asyncio.open_connection(self.host, self.port, ssl=self.ssl)
+        return await self._send(conn, method, payload)
+
+    async def request(self, method, path, headers=None, json=None, data=None, timeout=10):
+        """Same as request() but takes a path on the pooled host."""
+        payload = encode_request(method, self.host, path, headers, json, data, keep_alive=True)
+        return await asyncio.wait_for(self._request(method, payload), timeout)
+
+    def stats(self):
+        return {'hits': self.hits, 'misses': self.misses, 'reconnects': self.reconnects, 'idle': len(self._idle)}
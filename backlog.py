@@ -0,0 +1,206 @@
+#Store-and-forward buffer for readings taken while Wi-Fi is down.
+
+import struct
+import time
+from array import array
+
+# RAM per record: epoch 4 + temp 2 + humidity 2 + relay 1 bytes
+BYTES_PER_RECORD = 9
+# Flash slot: seq, UTC epoch, temp x10, humidity x10, relay
+RECORD = '<IIhhB'
+RECORD_SIZE = struct.calcsize(RECORD)
+# Flash header: seq of the oldest record not delivered yet
+HEADER = '<I'
+HEADER_SIZE = struct.calcsize(HEADER)
+
+def iso_utc(epoch):
+    return '%04d-%02d-%02dT%02d:%02d:%02dZ' % tuple(time.gmtime(epoch)[:6])
+
+class Backlog:
+    """
+    Fixed-size ring of compact (epoch, temp x10, humidity x10, relay)
+    records. Readings go in while Wi-Fi is down and drain() uploads them,
+    oldest first, once it is back. When full the oldest record is
+    overwritten. RAM use is capacity * BYTES_PER_RECORD, allocated up front.
+
+    With a path every record is also written to a fixed slot in a flash
+    file, so a reset during an outage doesn't lose them. The header is
+    rewritten once per delivered batch.
+
+    drain() sends at most batch records as one Adafruit IO batch request
+    per feed, with the original timestamps. A relay change between records
+    becomes a lamp event. If any request fails the whole batch stays
+    queued; on the retry, values already accepted may be sent again.
+
+    Parameters:
+      feeds    -- (temperature, humidity, lamp) feed keys
+      capacity -- records held
+      path     -- flash file to mirror to, or None
+      batch    -- records per drain()
+      interval -- seconds between drain() calls, to stay under the rate limit
+    """
+
+    def __init__(self, feeds, capacity=720, path=None, batch=8, interval=60):
+        self.feeds = feeds
+        self.capacity = capacity
+        self.path = path
+        self.batch = batch
+        self.interval = interval
+        self._epoch = array('I', bytes(4 * capacity))
+        self._temp = array('h', bytes(2 * capacity))
+        self._humidity = array('h', bytes(2 * capacity))
+        self._relay = array('B', bytes(capacity))
+        self._buf = bytearray(RECORD_SIZE)
+        self._head = 0  # Index of the oldest record
+        self._count = 0
+        self._seq = 1  # Seq of the next record; 0 marks an empty flash slot
+        self._last_relay = None
+        self.stored = 0
+        self.overwritten = 0
+        self.sent = 0
+        self.failures = 0
+        if path:
+            self._load()
+
+    def __len__(self):
+        return self._count
+
+    def footprint(self):
+        """Bytes of RAM held by the records."""
+        return self.capacity * BYTES_PER_RECORD
+
+    def push(self, epoch, temp, humidity, relay):
+        """Store one reading; temp and humidity are floats."""
+        if self._count == self.capacity:
+            self._head = (self._head + 1) % self.capacity
+            self._count -= 1
+            self.overwritten += 1
+        i = (self._head + self._count) % self.capacity
+        self._epoch[i] = epoch
+        self._temp[i] = int(round(temp * 10))
+        self._humidity[i] = int(round(humidity * 10))
+        self._relay[i] = 1 if relay else 0
+        self._count += 1
+        self.stored += 1
+        if self.path:
+            self._write_slot(i, self._seq)
+        self._seq += 1
+
+    def _write_slot(self, i, seq):
+        struct.pack_into(RECORD, self._buf, 0, seq, self._epoch[i], self._temp[i],
+                         self._humidity[i], self._relay[i])
+        try:
+            with open(self.path, 'r+b') as f:
+                f.seek(HEADER_SIZE + (seq % self.capacity) * RECORD_SIZE)
+                f.write(self._buf)
+        except OSError as e:
+            print(f"Backlog flash write failed: {e}")
+
+    def _write_header(self):
+        struct.pack_into(HEADER, self._buf, 0, self._seq - self._count)
+        try:
+            with open(self.path, 'r+b') as f:
+                f.write(memoryview(self._buf)[:HEADER_SIZE])
+        except OSError as e:
+            print(f"Backlog flash write failed: {e}")
+
+    def _create(self):
+        blank = bytes(RECORD_SIZE)
+        with open(self.path, 'wb') as f:
+            f.write(bytes(HEADER_SIZE))
+            for _ in range(self.capacity):
+                f.write(blank)
+
+    def _load(self):
+        # Rebuild the ring from the undelivered slots left by the last boot
+        try:
+            f = open(self.path, 'rb')
+        except OSError:
+            self._create()
+            return
+        records = []
+        with f:
+            f.readinto(memoryview(self._buf)[:HEADER_SIZE])
+            delivered = struct.unpack_from(HEADER, self._buf)[0]
+            last = delivered
+            for _ in range(self.capacity):
+                if f.readinto(self._buf) != RECORD_SIZE:
+                    break
+                record = struct.unpack_from(RECORD, self._buf)
+                last = max(last, record[0])
+                if record[0] and record[0] >= delivered:
+                    records.append(record)
+        records.sort()
+        # New records go after every seq on flash, so they land in free or stale slots
+        self._seq = last + 1
+        for seq, epoch, temp, humidity, relay in records:
+            i = self._count
+            self._epoch[i] = epoch
+            self._temp[i] = temp
+            self._humidity[i] = humidity
+            self._relay[i] = relay
+            self._count += 1
+        if records:
+            print(f"Backlog: {len(records)} undelivered readings restored from flash")
+
+    def _drop(self, n):
+        self._head = (self._head + n) % self.capacity
+        self._count -= n
+        self.sent += n
+        if self.path:
+            self._write_header()
+
+    def _batches(self, n):
+        temps = []
+        humidities = []
+        lamps = []
+        last_relay = self._last_relay
+        for k in range(n):
+            i = (self._head + k) % self.capacity
+            created_at = iso_utc(self._epoch[i])
+            temp = self._temp[i] / 10
+            temps.append({'value': temp, 'created_at': created_at})
+            humidities.append({'value': self._humidity[i] / 10, 'created_at': created_at})
+            relay = self._relay[i]
+            if last_relay is not None and relay != last_relay:
+                lamps.append({'value': f"{'ON' if relay else 'OFF'}, Temp {temp}", 'created_at': created_at})
+            last_relay = relay
+        return (temps, humidities, lamps), last_relay
+
+    async def drain(self, aio):
+        """Upload the next batch of records. Returns how many were delivered."""
+        n = min(self._count, self.batch)
+        if not n:
+            return 0
+        batches, last_relay = self._batches(n)
+        try:
+            for feed, data in zip(self.feeds, batches):
+                if not data:
+                    continue
+                reply = await aio.post_batch(feed, data)
+                status = reply.status_code
+                if status != 200:
+                    print(status)
+                    print(reply.text)
+                reply.close()
+                if status != 200:
+                    self.failures += 1
+                    return 0
+        except Exception as e:
+            print(f"Failed to send backlog: {e}")
+            self.failures += 1
+            return 0
+        self._drop(n)
+        # A later outage starts from its own first record, not the relay state this one ended on
+        self._last_relay = last_relay if self._count else None
+        return n
+
+    def stats(self):
+        return {
+            'pending': self._count,
+            'stored': self.stored,
+            'sent': self.sent,
+            'overwritten': self.overwritten,
+            'failures': self.failures,
+            'ram_bytes': self.footprint(),
+        }
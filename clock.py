@@ -0,0 +1,174 @@
+import time
+import uasyncio as asyncio
+
+HOUR = 3600
+DAY = 86400
+TIME_URL = "http://worldtimeapi.org/api/timezone/Etc/UTC"
+
+def nth_sunday(year, month, n):
+    """UTC epoch of midnight on the nth Sunday of a month."""
+    first = time.mktime((year, month, 1, 0, 0, 0, 0, 0, 0))
+    weekday = time.gmtime(first)[6]  # Monday is 0
+    return first + ((6 - weekday) % 7 + (n - 1) * 7) * DAY
+
+def us_dst(utc, std_offset):
+    """True if US daylight saving time is in effect at a UTC epoch."""
+    year = time.gmtime(utc)[0]
+    # Clocks change at 2:00 local: second Sunday in March, first Sunday in November
+    start = nth_sunday(year, 3, 2) + 2 * HOUR - std_offset
+    end = nth_sunday(year, 11, 1) + 2 * HOUR - (std_offset + HOUR)
+    return start <= utc < end
+
+class Clock:
+    """
+    Keeps local time on the RTC so periodic tasks don't need a web request
+    to know the time or the day of the year.
+
+    The RTC is set to UTC from NTP once at boot and again every
+    resync_interval seconds; in between, time.time() runs locally. Each
+    resync records how far the RTC had drifted from NTP. When NTP doesn't
+    answer, one HTTP request to worldtimeapi sets the RTC instead; its
+    unixtime is UTC, so the offset and DST still come from here.
+
+    Parameters:
+      std_offset      -- standard time offset from UTC in seconds (default: Eastern, -5 h)
+      dst             -- apply US daylight saving rules (default: True)
+      resync_interval -- seconds between NTP syncs (default: 12 h)
+      retry_interval  -- seconds before retrying a failed sync (default: 5 min)
+    """
+
+    def __init__(self, std_offset=-5 * HOUR, dst=True, resync_interval=12 * HOUR, retry_interval=300):
+        self.std_offset = std_offset
+        self.dst = dst
+        self.resync_interval = resync_interval
+        self.retry_interval = retry_interval
+        self.synced = False
+        self.restored = False
+        self.syncs = 0
+        self.http_syncs = 0  # Syncs that fell back to worldtimeapi
+        self.source = None
+        self.failures = 0
+        self.last_sync = 0
+        self.last_drift = 0
+        self.max_drift = 0
+
+    def _ntp_time(self):
+        try:
+            import ntptime
+            return ntptime.time()
+        except Exception as e:
+            print(f"Error syncing clock: {e}")
+            return None
+
+    def _http_time(self):
+        try:
+            import urequests as requests
+            data = requests.get(TIME_URL)
+            try:
+                if data.status_code != 200:
+                    print(f"Error fetching time: {data.status_code}")
+                    return None
+                return int(data.json()['unixtime'])
+            finally:
+                data.close()
+        except Exception as e:
+            print(f"Error fetching time: {e}")
+            return None
+
+    def sync(self):
+        """Set the RTC from NTP, or from worldtimeapi if NTP fails. Returns True on success."""
+        t = self._ntp_time()
+        source = 'ntp'
+        if t is None:
+            t = self._http_time()
+            source = 'http'
+        if t is None:
+            self.failures += 1
+            return False
+        if self.synced or self.restored:
+            self.last_drift = time.time() - t
+            if abs(self.last_drift) > abs(self.max_drift):
+                self.max_drift = self.last_drift
+        self._set_rtc(t)
+        self.synced = True
+        self.restored = False
+        self.syncs += 1
+        if source == 'http':
+            self.http_syncs += 1
+        self.source = source
+        self.last_sync = t
+        return True
+
+    def _set_rtc(self, utc):
+        from machine import RTC
+        tm = time.gmtime(utc)
+        RTC().datetime((tm[0], tm[1], tm[2], tm[6] + 1, tm[3], tm[4], tm[5], 0))
+
+    def restore(self, utc):
+        """
+        Wind the RTC forward to a saved UTC epoch when a reset has set it
+        back, so a warm boot has about the right time before NTP answers.
+        An RTC already past it is kept. Either way the time counts as
+        restored: usable for timestamps, but still unsynced, and the next
+        sync records how far off it was. Returns True if the RTC was set.
+        """
+        self.restored = True
+        if time.time() >= utc:
+            return False
+        self._set_rtc(utc)
+        return True
+
+    async def run(self):
+        while True:
+            if not self.synced or time.time() - self.last_sync >= self.resync_interval:
+                if not self.sync():
+                    await asyncio.sleep(self.retry_interval)
+                    continue
+            await asyncio.sleep(min(self.resync_interval, 3600))
+
+    def utc(self):
+        return time.time()
+
+    def valid(self):
+        """True once the time came from NTP or a saved snapshot, not the RTC's reset value."""
+        return self.synced or self.restored
+
+    def offset(self, utc=None):
+        """Offset from UTC in seconds at a UTC epoch (default: now)."""
+        if utc is None:
+            utc = time.time()
+        if self.dst and us_dst(utc, self.std_offset):
+            return self.std_offset + HOUR
+        return self.std_offset
+
+    def local(self):
+        """Local epoch seconds."""
+        utc = time.time()
+        return utc + self.offset(utc)
+
+    def localtime(self):
+        return time.gmtime(self.local())
+
+    def today(self):
+        """Local epoch seconds at the start of today."""
+        local = self.local()
+        return local - local % DAY
+
+    def day_of_year(self):
+        return self.localtime()[7]
+
+    def date(self):
+        """Local date as YYYY-MM-DD."""
+        tm = self.localtime()
+        return f"{tm[0]:04d}-{tm[1]:02d}-{tm[2]:02d}"
+
+    def stats(self):
+        return {
+            'synced': self.synced,
+            'syncs': self.syncs,
+            'http_syncs': self.http_syncs,
+            'failures': self.failures,
+            'since_sync': time.time() - self.last_sync if self.synced else None,
+            'last_drift': self.last_drift,
+            'max_drift': self.max_drift,
+        }
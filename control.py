@@ -0,0 +1,115 @@
+import time
+
+class BangBang:
+    """
+    On below setpoint - deadband, off at or above setpoint, otherwise hold.
+
+    Parameters:
+      deadband -- °F below setpoint before the lamp turns back on (default: 0.25)
+    """
+
+    def __init__(self, deadband=0.25):
+        self.deadband = deadband
+        self.state = False
+
+    def reset(self):
+        self.state = False
+
+    def update(self, temperature, setpoint, now):
+        """Returns whether the relay should be on. now is time.ticks_ms()."""
+        if temperature < setpoint - self.deadband:
+            self.state = True
+        elif temperature >= setpoint:
+            self.state = False
+        return self.state
+
+class TimeProportional:
+    """
+    PID on temperature, turned into relay on-time within a fixed window.
+
+    The PID runs once at the start of each window and its output (0-1) is
+    the fraction of the window the lamp stays on. The on-time sits at the
+    start of one window and the end of the next, so consecutive on-times
+    join up and the relay switches about once per window. On-times shorter
+    than min_on are skipped and off-times shorter than min_on are filled
+    in, to avoid brief pulses.
+
+    So the window trades relay wear against ripple: about 3600 / window
+    switches an hour, and the longer the lamp stays on or off, the further
+    the enclosure drifts. In testscripts/controlbench.py a 120 s window
+    holds 75 °F to 0.4 °F but switches 30 times an hour, twice as often as
+    bang-bang. The 240 s default switches 15 times an hour, like
+    bang-bang, with about the same 1.6 °F ripple and less overshoot.
+    The integral term is clamped to the output range and is not wound
+    further while the output is saturated (anti-windup).
+
+    Parameters:
+      kp     -- proportional gain, duty per °F of error
+      ki     -- integral gain, duty per °F·s
+      kd     -- derivative gain on the measurement, duty per °F/s
+      window -- cycle length in seconds
+      min_on -- shortest on or off period in seconds
+    """
+
+    def __init__(self, kp=0.2, ki=0.0002, kd=30.0, window=240, min_on=10):
+        self.kp = kp
+        self.ki = ki
+        self.kd = kd
+        self.window = window
+        self.min_on = min_on
+        self.reset()
+
+    def reset(self):
+        self.integral = 0.0
+        self.duty = 0.0
+        self.state = False
+        self._last_temp = None
+        self._window_start = None
+        self._on_ms = 0
+        self._on_last = False
+
+    def _pid(self, temperature, setpoint):
+        error = setpoint - temperature
+        derivative = 0.0
+        if self._last_temp is not None:
+            derivative = (temperature - self._last_temp) / self.window
+        self._last_temp = temperature
+
+        p = self.kp * error
+        d = -self.kd * derivative
+        out = p + self.ki * self.integral + d
+        # Only integrate when it doesn't push a saturated output further
+        if not (out >= 1 and error > 0) and not (out <= 0 and error < 0):
+            self.integral += error * self.window
+        if self.ki:
+            self.integral = max(min(self.integral, 1 / self.ki), 0)
+        out = p + self.ki * self.integral + d
+        return max(min(out, 1.0), 0.0)
+
+    def update(self, temperature, setpoint, now):
+        """Returns whether the relay should be on. now is time.ticks_ms()."""
+        window_ms = self.window * 1000
+        if self._window_start is None or time.ticks_diff(now, self._window_start) >= window_ms:
+            self._window_start = now
+            self.duty = self._pid(temperature, setpoint)
+            on_ms = int(self.duty * window_ms)
+            if on_ms < self.min_on * 1000:
+                on_ms = 0
+            elif on_ms > window_ms - self.min_on * 1000:
+                on_ms = window_ms
+            self._on_ms = on_ms
+            self._on_last = not self._on_last
+        elapsed = time.ticks_diff(now, self._window_start)
+        if self._on_last:
+            self.state = elapsed >= window_ms - self._on_ms
+        else:
+            self.state = elapsed < self._on_ms
+        return self.state
+
+def make_controller(mode, **kw):
+    """Build a controller by name: 'bangbang' or 'pid'."""
+    if mode == 'pid':
+        return TimeProportional(**kw)
+    if mode == 'bangbang':
+        return BangBang(**kw)
+    raise ValueError("Unknown control mode: " + str(mode))
@@ -0,0 +1,235 @@
+#Local history on flash: minute and hour min/mean/max rollups in fixed-width binary files.
+
+import os
+import struct
+
+# Period start (UTC epoch), temp min/mean/max x10, humidity min/mean/max x10, lamp on %
+RECORD = '<IhhhhhhB'
+RECORD_SIZE = struct.calcsize(RECORD)
+
+def _exists(path):
+    try:
+        os.stat(path)
+        return True
+    except OSError:
+        return False
+
+class Rollup:
+    """Running min/mean/max of one period, kept as integers."""
+
+    def __init__(self, period):
+        self.period = period
+        self.reset(None)
+
+    def reset(self, start):
+        self.start = start
+        self.count = 0
+        self.lamp = 0
+        self.t_min = self.h_min = 32767
+        self.t_max = self.h_max = -32768
+        self.t_sum = self.h_sum = 0
+
+    def add(self, temp_x10, humidity_x10, relay):
+        self.count += 1
+        self.lamp += relay
+        self.t_sum += temp_x10
+        self.h_sum += humidity_x10
+        if temp_x10 < self.t_min:
+            self.t_min = temp_x10
+        if temp_x10 > self.t_max:
+            self.t_max = temp_x10
+        if humidity_x10 < self.h_min:
+            self.h_min = humidity_x10
+        if humidity_x10 > self.h_max:
+            self.h_max = humidity_x10
+
+    def pack_into(self, buf, offset):
+        n = self.count
+        struct.pack_into(RECORD, buf, offset, self.start,
+                         self.t_min, (self.t_sum + n // 2) // n, self.t_max,
+                         self.h_min, (self.h_sum + n // 2) // n, self.h_max,
+                         (self.lamp * 100 + n // 2) // n)
+
+class Series:
+    """
+    One rollup period written to rotating files name.0.bin (newest) to
+    name.{files-1}.bin (oldest). Finished periods are packed into a RAM
+    buffer and written flush_records at a time, so flash sees one small
+    append every flush_records periods.
+
+    read() relies on the records being in time order, so a reading from
+    a period before the newest one logged is dropped and counted. That
+    happens after a warm boot: the restored clock can be behind the log
+    on flash until NTP answers.
+    """
+
+    def __init__(self, name, period, records_per_file, files=2, flush_records=8):
+        self.name = name
+        self.period = period
+        self.records_per_file = records_per_file
+        self.files = files
+        self.rollup = Rollup(period)
+        self._buf = bytearray(flush_records * RECORD_SIZE)
+        self._pending = 0
+        self.records = 0
+        self.writes = 0
+        self.bytes_written = 0
+        self.rotations = 0
+        self.dropped = 0
+        self._last = self._newest()  # Start of the newest period logged
+        try:
+            self._in_file = os.stat(self._path(0))[6] // RECORD_SIZE
+        except OSError:
+            self._in_file = 0
+
+    def _newest(self):
+        buf = bytearray(RECORD_SIZE)
+        for k in range(self.files):
+            try:
+                with open(self._path(k), 'rb') as f:
+                    count = os.stat(self._path(k))[6] // RECORD_SIZE
+                    if count:
+                        f.seek((count - 1) * RECORD_SIZE)
+                        f.readinto(buf)
+                        return struct.unpack_from('<I', buf)[0]
+            except OSError:
+                pass
+        return 0
+
+    def _path(self, k):
+        return f'{self.name}.{k}.bin'
+
+    def add(self, epoch, temp_x10, humidity_x10, relay):
+        start = epoch - epoch % self.period
+        if start < self._last:
+            self.dropped += 1
+            return
+        rollup = self.rollup
+        if rollup.start != start:
+            if rollup.count:
+                rollup.pack_into(self._buf, self._pending * RECORD_SIZE)
+                self._pending += 1
+                self.records += 1
+                if self._pending * RECORD_SIZE == len(self._buf):
+                    self.flush()
+            rollup.reset(start)
+            self._last = start
+        rollup.add(temp_x10, humidity_x10, relay)
+
+    def _rotate(self):
+        oldest = self._path(self.files - 1)
+        if _exists(oldest):
+            os.remove(oldest)
+        for k in range(self.files - 2, -1, -1):
+            if _exists(self._path(k)):
+                os.rename(self._path(k), self._path(k + 1))
+        self._in_file = 0
+        self.rotations += 1
+
+    def flush(self):
+        """Write the finished periods held in RAM."""
+        done = 0
+        try:
+            while done < self._pending:
+                if self._in_file >= self.records_per_file:
+                    self._rotate()
+                n = min(self._pending - done, self.records_per_file - self._in_file)
+                with open(self._path(0), 'ab') as f:
+                    f.write(memoryview(self._buf)[done * RECORD_SIZE:(done + n) * RECORD_SIZE])
+                done += n
+                self._in_file += n
+                self.writes += 1
+                self.bytes_written += n * RECORD_SIZE
+        except OSError as e:
+            print(f"Datalog write failed: {e}")
+        # Anything not written is dropped rather than retried forever
+        self._pending = 0
+
+    def _first_at_or_after(self, f, count, epoch, buf):
+        # Records are in time order, so bisect with seeks instead of scanning
+        lo, hi = 0, count
+        while lo < hi:
+            mid = (lo + hi) // 2
+            f.seek(mid * RECORD_SIZE)
+            f.readinto(buf)
+            if struct.unpack_from('<I', buf)[0] < epoch:
+                lo = mid + 1
+            else:
+                hi = mid
+        return lo
+
+    def read(self, start=0, end=0xFFFFFFFF):
+        """
+        Yield (epoch, t_min, t_mean, t_max, h_min, h_mean, h_max, lamp_pct)
+        for periods starting in [start, end), oldest first, with values
+        x10. Only one record is held in RAM at a time.
+        """
+        buf = bytearray(RECORD_SIZE)
+        for k in range(self.files - 1, -1, -1):
+            try:
+                f = open(self._path(k), 'rb')
+            except OSError:
+                continue
+            with f:
+                count = os.stat(self._path(k))[6] // RECORD_SIZE
+                if not count:
+                    continue
+                f.seek((count - 1) * RECORD_SIZE)
+                f.readinto(buf)
+                if struct.unpack_from('<I', buf)[0] < start:
+                    continue
+                i = self._first_at_or_after(f, count, start, buf)
+                f.seek(i * RECORD_SIZE)
+                while i < count:
+                    f.readinto(buf)
+                    record = struct.unpack_from(RECORD, buf)
+                    if record[0] >= end:
+                        return
+                    yield record
+                    i += 1
+        # Finished periods not flushed yet
+        for i in range(self._pending):
+            record = struct.unpack_from(RECORD, self._buf, i * RECORD_SIZE)
+            if record[0] >= end:
+                return
+            if record[0] >= start:
+                yield record
+
+    def stats(self):
+        return {'records': self.records, 'writes': self.writes, 'bytes': self.bytes_written,
+                'rotations': self.rotations, 'dropped': self.dropped}
+
+class DataLog:
+    """
+    Minute and hour rollups of every reading, logged to flash.
+
+    Each reading only updates two running rollups; a 17-byte record per
+    finished period goes to a RAM buffer and reaches flash in batches. With
+    the defaults that is a write every 8 minutes and every 4 hours, about
+    24 KB a day, keeping 3 days of minutes and about 2 months of hours.
+
+    Parameters:
+      prefix       -- file name prefix
+      minute_files -- rotating files of one day of minutes each
+      hour_files   -- rotating files of one month of hours each
+    """
+
+    def __init__(self, prefix='log', minute_files=3, hour_files=2):
+        self.minute = Series(f'{prefix}-min', 60, 1440, minute_files, flush_records=8)
+        self.hour = Series(f'{prefix}-hour', 3600, 744, hour_files, flush_records=4)
+
+    def add(self, epoch, temp, humidity, relay):
+        """Log one reading; temp and humidity are floats, epoch UTC."""
+        temp_x10 = int(round(temp * 10))
+        humidity_x10 = int(round(humidity * 10))
+        relay = 1 if relay else 0
+        self.minute.add(epoch, temp_x10, humidity_x10, relay)
+        self.hour.add(epoch, temp_x10, humidity_x10, relay)
+
+    def flush(self):
+        """Write buffered periods, e.g. before a reset. The periods in progress are not written."""
+        self.minute.flush()
+        self.hour.flush()
+
+    def stats(self):
+        return {'minute': self.minute.stats(), 'hour': self.hour.stats()}
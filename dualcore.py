@@ -0,0 +1,194 @@
+#Optional split across the RP2040's two cores: sampling and heater control
+#on core 1, networking and everything else on core 0.
+
+import time
+import _thread
+
+class _NoLock:
+    # For a mailbox shared with micropython.schedule() callbacks on the same core. They run
+    # between bytecodes of whatever they interrupt, so a lock held there would never be released.
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+class Mailbox:
+    """
+    What the two cores exchange, behind one lock held only long enough to
+    copy a few values. Core 0 writes the setpoint; core 1 writes the
+    latest reading and lamp state, and queues lamp changes for core 0 to
+    send or log. When the queue is full the oldest change is dropped.
+
+    With lock=False the other side is a scheduled timer callback on the
+    same core instead (sampletick.py), which can't interrupt itself, and
+    no lock is taken.
+    """
+
+    def __init__(self, max_events=16, lock=True):
+        self.lock = _thread.allocate_lock() if lock else _NoLock()
+        self.setpoint = 0
+        self.lamp = 0
+        self.sensor_ok = True
+        self.max_events = max_events
+        self._events = []
+        self.dropped = 0
+
+    def set_setpoint(self, setpoint):
+        with self.lock:
+            self.setpoint = setpoint
+
+    def get_setpoint(self):
+        with self.lock:
+            return self.setpoint
+
+    def post(self, lamp, sensor_ok, event=None):
+        """From core 1: current lamp state and sensor health, plus a (utc, temp, humidity, lamp) change."""
+        with self.lock:
+            self.lamp = lamp
+            self.sensor_ok = sensor_ok
+            if event is not None:
+                if len(self._events) >= self.max_events:
+                    self._events.pop(0)
+                    self.dropped += 1
+                self._events.append(event)
+
+    def take_events(self):
+        with self.lock:
+            events = self._events
+            self._events = []
+        return events
+
+class ControlCore:
+    """
+    The sampling and relay half of read_sensor() as a plain loop for core
+    1, started with _thread. Each tick takes a reading, runs the
+    controller against the setpoint from the mailbox and switches the
+    relay, so control timing no longer depends on TLS handshakes or JSON
+    parsing in the core 0 event loop. A stale reading holds the lamp off,
+    like read_sensor().
+
+    Ticks are scheduled on a fixed grid. Jitter is how late each tick
+    starts against its slot. A tick that overruns the next slot restarts
+    the grid and is counted.
+
+    Instead of start(), tick() can be driven from elsewhere, e.g. a
+    sampletick.TimerTick on core 0. With pipelined each tick collects the
+    conversion the previous one started (Sampler.step()), so a tick never
+    waits for the sensor.
+
+    Parameters:
+      sampler    -- Sampler; only this loop calls update() on it
+      controller -- from control.make_controller()
+      relay      -- heat lamp relay Pin
+      mailbox    -- Mailbox shared with core 0
+      period_ms  -- control tick
+      pipelined  -- read with sampler.step() instead of sampler.update()
+    """
+
+    def __init__(self, sampler, controller, relay, mailbox, period_ms=1000, pipelined=False):
+        self.sampler = sampler
+        self.controller = controller
+        self.relay = relay
+        self.mailbox = mailbox
+        self.period_ms = period_ms
+        self.pipelined = pipelined
+        self.running = False
+        self.alive = False
+        self.heartbeat = time.ticks_ms()
+        self.lamp = 0
+        self.ticks = 0
+        self.first_ms = None  # ticks_ms() of the first tick, i.e. ms after reset
+        self.overruns = 0
+        self.errors = 0
+        self.jitter_max_us = 0
+        self._jitter_total = 0
+        self.tick_max_us = 0
+
+    def start(self):
+        self.running = True
+        self.alive = True
+        _thread.start_new_thread(self._loop, ())
+
+    def stop(self, timeout_ms=3000):
+        """Ask the loop to finish and wait for it, then leave the relay off."""
+        self.running = False
+        deadline = time.ticks_add(time.ticks_ms(), timeout_ms)
+        while self.alive and time.ticks_diff(deadline, time.ticks_ms()) > 0:
+            time.sleep_ms(10)
+        self.relay.off()
+
+    def tick(self, ticks=None):
+        """One control step; ticks is when it was due (default: now). Errors leave the relay off."""
+        self.ticks += 1
+        if self.first_ms is None:
+            self.first_ms = time.ticks_ms()
+        try:
+            self._tick(time.ticks_ms() if ticks is None else ticks)
+        except Exception as e:
+            self.errors += 1
+            self.relay.off()
+            print(f"Control core error: {e}")
+        self.heartbeat = time.ticks_ms()
+
+    def _tick(self, ticks):
+        if self.pipelined:
+            self.sampler.step(ticks)
+        else:
+            self.sampler.update()
+        sample = self.sampler.latest()
+        if sample is None:
+            self.relay.off()
+            self.controller.reset()
+            self.lamp = 0
+            self.mailbox.post(0, False)
+            return
+        on = self.controller.update(sample.temp, self.mailbox.get_setpoint(), ticks)
+        if on:
+            self.relay.on()
+        else:
+            self.relay.off()
+        event = None
+        if on != self.lamp:
+            self.lamp = 1 if on else 0
+            event = (time.time(), sample.temp, sample.humidity, self.lamp)
+        self.mailbox.post(self.lamp, True, event)
+
+    def _loop(self):
+        slot = time.ticks_us()
+        try:
+            while self.running:
+                start = time.ticks_us()
+                jitter = time.ticks_diff(start, slot)
+                self._jitter_total += jitter
+                if jitter > self.jitter_max_us:
+                    self.jitter_max_us = jitter
+                self.tick()
+                took = time.ticks_diff(time.ticks_us(), start)
+                if took > self.tick_max_us:
+                    self.tick_max_us = took
+                slot = time.ticks_add(slot, self.period_ms * 1000)
+                wait = time.ticks_diff(slot, time.ticks_us())
+                if wait < 0:
+                    self.overruns += 1
+                    slot = time.ticks_us()
+                else:
+                    time.sleep_us(wait)
+        finally:
+            self.relay.off()
+            self.alive = False
+
+    def silent_ms(self):
+        """Milliseconds since the loop last finished a tick."""
+        return time.ticks_diff(time.ticks_ms(), self.heartbeat)
+
+    def stats(self):
+        return {
+            'ticks': self.ticks,
+            'overruns': self.overruns,
+            'errors': self.errors,
+            'jitter_avg_us': self._jitter_total // self.ticks if self.ticks else 0,
+            'jitter_max_us': self.jitter_max_us,
+            'tick_max_us': self.tick_max_us,
+            'events_dropped': self.mailbox.dropped,
+        }
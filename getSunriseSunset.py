@@ -1,6 +1,12 @@
 import urequests as requests
 import time
+import solar
 from gc import collect as gc
+from clock import us_dst
+
+# Enclosure location for the sunrise/sunset calculation
+LAT, LON = 42.385408, -71.113114
+sun_table = None
 
 def GetTimeTuple(timestamp):
     year = int(timestamp[0:4])
@@ -9,7 +15,7 @@ def GetTimeTuple(timestamp):
     hour = int(timestamp[11:13])
     minute = int(timestamp[14:16])
     second = int(timestamp[17:19])
-    timetuple = (year, month, day, hour, minute, second, 0, 0)
+    timetuple = (year, month, day, hour, minute, second, 0, 0, 0)
     return timetuple
 
 def GetTime():
@@ -17,12 +23,11 @@ def GetTime():
         gc()
         data = requests.get("http://worldtimeapi.org/api/timezone/America/New_York")
         if data.status_code == 200:
-            if data.json()['dst'] == True:
-                time = data.json()['unixtime'] + data.json()['raw_offset'] +3600
-                data.close()
-            else:
-                time = data.json()['unixtime'] + data.json()['raw_offset']
-                data.close()
+            result = data.json()
+            data.close()
+            time = result['unixtime'] + result['raw_offset']
+            if result['dst'] == True:
+                time += 3600
             return time
         else:
             print(f"Error fetching time: {data.status_code}")
@@ -46,9 +51,10 @@ def GetDay():
         print(f"Error fetching day of the year: {e}")
         return None
 
-def GetEasternDate():
+def GetEasternDate(unix_time=None):
     """Converts Unix time to YYYY-MM-DD (Eastern Time) manually."""
-    unix_time = GetTime()
+    if unix_time is None:
+        unix_time = GetTime()
     if unix_time is None:
         return None
     time_tuple = time.localtime(unix_time)  # Convert Unix time to a time tuple
@@ -56,45 +62,42 @@ def GetEasternDate():
     return f"{year:04d}-{month:02d}-{day:02d}"
 
 def GetTimeStamp(input_timestamp):
-    timestamp = []
-    for item in input_timestamp:
-        if item < 10:
-            timestamp.append(f'0{item}')
-        else:
-            timestamp.append(item)
-    timestamp_final = f'{timestamp[0]}-{timestamp[1]}-{timestamp[2]}T{timestamp[3]}:{timestamp[4]}:{timestamp[5]}'
-    return timestamp_final
+    t = input_timestamp
+    return '%04d-%02d-%02dT%02d:%02d:%02d' % (t[0], t[1], t[2], t[3], t[4], t[5])
 
-def GetSunriseSunset():
-    """Fetches sunrise and sunset for the correct Eastern Time date."""
-    date = GetEasternDate()
-    if date is None:
-        return "Error fetching date"
-    
-    lat, lon = 42.385408, -71.113114
-    url = f"https://api.sunrisesunset.io/json?lat={lat}&lng={lon}&time_format=24&timezone=EST&date={date}"
-
-    try:
+def GetSunTable(year):
+    """The year-long sunrise/sunset table for the enclosure location, built once per year."""
+    global sun_table
+    if sun_table is None or sun_table.year != year:
         gc()
-        data = requests.get(url)
-        if data.status_code == 200:
-            results = data.json().get('results', {})
-            data.close()
+        sun_table = solar.SunTable(year, LAT, LON)
+    return sun_table
+
+def GetSunriseSunset(date=None):
+    """
+    Computes sunrise and sunset on-device for the Eastern Time date (YYYY-MM-DD, looked up if not given).
+    Returns (offset in minutes, sunrise, sunset) with both times in local epoch seconds, or None on error.
+    """
+    if date is None:
+        date = GetEasternDate()
+    if date is None:
+        print("Error fetching date")
+        return None
 
-            if not results:
-                return "Error fetching sunrise/sunset times"
+    year, month, day = int(date[0:4]), int(date[5:7]), int(date[8:10])
+    # Eastern offset in effect at local noon, in minutes
+    noon = time.mktime((year, month, day, 17, 0, 0, 0, 0, 0))
+    offset = -240 if us_dst(noon, -5 * 3600) else -300
 
-            sunrise = f"{date}T{results['sunrise']}Z"
-            sunset = f"{date}T{results['sunset']}Z"
-            offset = results["utc_offset"]
+    rise, sset = GetSunTable(year).utc_minutes(solar.day_of_year(year, month, day))
+    if rise is None or sset is None:
+        print("Error fetching sunrise/sunset times")
+        return None
 
-            return offset, sunrise, sunset
-        else:
-            print(f"Error fetching sunrise/sunset times: {data.status_code}")
-            return "Error fetching sunrise/sunset times"
-    except Exception as e:
-        print(f"Error fetching sunrise/sunset times: {e}")
-        return "Error fetching sunrise/sunset times"
+    midnight = time.mktime((year, month, day, 0, 0, 0, 0, 0, 0))
+    sunrise = midnight + int(rise + offset) * 60
+    sunset = midnight + int(sset + offset) * 60
+    return offset, sunrise, sunset
 
 if __name__ == "__main__":
     print(GetSunriseSunset())
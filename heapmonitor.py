@@ -0,0 +1,148 @@
+#Heap health: free heap, largest free block and fragmentation over time, so
+#the board is reset when the heap is measurably running out, not by the calendar.
+
+import gc
+import time
+from array import array
+
+class HeapMonitor:
+    """
+    check() runs a collection, then records the free heap, the largest
+    block that can still be allocated and the fragmentation: the share
+    of the free heap outside that block. An allocation fails when no
+    single block is big enough, however much is free in total, so the
+    largest block is what predicts a MemoryError.
+
+    unhealthy() turns true once the largest block has stayed below
+    min_block, or the free heap below min_free, for `strikes` checks in a
+    row, so one check right after a burst of allocations doesn't count.
+
+    The probe for the largest block stops margin bytes short of the free
+    heap. The control tick can allocate while a probe is held (on core 1,
+    or as a scheduled timer callback between bytecodes), and it needs a
+    little heap left to do that. A largest block past the cap is
+    reported as the cap.
+
+    Every trend_period seconds the free heap and largest block go into a
+    ring of trend_points, and stats() reports how each moved per hour
+    over it. Given a profiler.Profiler, stats() also lists the tasks
+    allocating the most, in bytes per second since the previous check.
+
+    Parameters:
+      min_free     -- bytes of free heap below which a check fails
+      min_block    -- bytes of largest free block below which a check fails
+      strikes      -- failed checks in a row before unhealthy()
+      trend_period -- seconds between trend points
+      trend_points -- trend points kept
+      resolution   -- bytes to which the largest block is measured
+      margin       -- bytes of free heap the probe never takes
+      profiler     -- a profiler.Profiler, or None
+    """
+
+    def __init__(self, min_free=24 * 1024, min_block=8 * 1024, strikes=3, trend_period=3600, trend_points=24,
+                 resolution=256, margin=4096, profiler=None):
+        self.min_free = min_free
+        self.min_block = min_block
+        self.strikes = strikes
+        self.trend_period = trend_period
+        self.resolution = resolution
+        self.margin = margin
+        self.profiler = profiler
+        self._free = array('I', [0] * trend_points)
+        self._largest = array('I', [0] * trend_points)
+        self._points = 0  # Trend points taken, the ring holds the last len(self._free)
+        self._next_point = None
+        self._checked = None
+        self._alloc_seen = {}
+        self.alloc_rates = {}  # Task name -> bytes per second
+        self.checks = 0
+        self.failed = 0  # Failed checks in a row
+        self.free = 0
+        self.largest = 0
+        self.min_seen_free = None
+        self.min_seen_largest = None
+        self.check_ms = 0
+
+    def largest_block(self, limit):
+        # MicroPython has no call for this, so find the biggest bytearray that still allocates
+        lo, hi = 0, max(limit - self.margin, 0)
+        while hi - lo > self.resolution:
+            mid = (lo + hi) // 2
+            try:
+                bytearray(mid)  # Only whether it allocates matters, it is garbage straight away
+                lo = mid
+            except MemoryError:
+                hi = mid
+        return lo
+
+    def fragmentation(self):
+        """Percent of the free heap outside the largest free block."""
+        if not self.free:
+            return 0
+        return 100 - self.largest * 100 // self.free
+
+    def check(self):
+        start = time.ticks_ms()
+        gc.collect()
+        free = gc.mem_free()
+        largest = self.largest_block(free)
+        gc.collect()  # Drop the probes
+        self.checks += 1
+        self.free = free
+        self.largest = largest
+        if self.min_seen_free is None or free < self.min_seen_free:
+            self.min_seen_free = free
+        if self.min_seen_largest is None or largest < self.min_seen_largest:
+            self.min_seen_largest = largest
+        if free < self.min_free or largest < self.min_block:
+            self.failed += 1
+        else:
+            self.failed = 0
+        now = time.ticks_ms()
+        if self._next_point is None or time.ticks_diff(now, self._next_point) >= 0:
+            i = self._points % len(self._free)
+            self._free[i] = free
+            self._largest[i] = largest
+            self._points += 1
+            self._next_point = time.ticks_add(now, self.trend_period * 1000)
+        self._rates(now)
+        self.check_ms = time.ticks_diff(time.ticks_ms(), start)
+
+    def _rates(self, now):
+        if self.profiler is None:
+            return
+        if self._checked is not None:
+            seconds = max(time.ticks_diff(now, self._checked), 1) / 1000
+            for name, p in self.profiler.tasks.items():
+                self.alloc_rates[name] = int((p.alloc_total - self._alloc_seen.get(name, 0)) / seconds)
+        for name, p in self.profiler.tasks.items():
+            self._alloc_seen[name] = p.alloc_total
+        self._checked = now
+
+    def unhealthy(self):
+        return self.failed >= self.strikes
+
+    def _trend(self, ring):
+        # Change per hour from the oldest point in the ring to the newest
+        n = min(self._points, len(ring))
+        if n < 2:
+            return None
+        newest = ring[(self._points - 1) % len(ring)]
+        oldest = ring[(self._points - n) % len(ring)]
+        return (newest - oldest) * 3600 // ((n - 1) * self.trend_period)
+
+    def stats(self, top=3):
+        rates = sorted(self.alloc_rates.items(), key=lambda item: item[1], reverse=True)
+        return {
+            'free': self.free,
+            'largest': self.largest,
+            'frag_pct': self.fragmentation(),
+            'checks': self.checks,
+            'min_free': self.min_seen_free,
+            'min_largest': self.min_seen_largest,
+            'free_per_h': self._trend(self._free),
+            'largest_per_h': self._trend(self._largest),
+            'failed': self.failed,
+            'check_ms': self.check_ms,
+            'top_alloc_Bps': rates[:top],
+        }
@@ -0,0 +1,86 @@
+#Daily lighting schedule for the Trinket NeoPixels, laid out once per day.
+
+from array import array
+
+class LightSchedule:
+    """
+    The day's light levels as a keyframe table: each entry is a local time
+    and the brightness that holds from then until the next entry. It is
+    built once per day from sunrise and sunset, so the lighting task only
+    looks up the current level, writes it if it changed, and sleeps until
+    the next keyframe.
+
+    With a ramp, brightness climbs from off to full over ramp seconds
+    after sunrise and falls back over the ramp seconds before sunset, in
+    steps along a squared curve. The eye sees low levels as brighter than
+    they are, so a linear ramp looks like it jumps on.
+
+    Parameters:
+      ramp  -- seconds for each of the sunrise and sunset ramps, 0 to just switch
+      steps -- brightness changes per ramp
+      full  -- brightness between the ramps
+    """
+
+    def __init__(self, ramp=1800, steps=16, full=255):
+        self.ramp = ramp
+        self.steps = max(steps, 1)
+        self.full = full
+        self.day = None
+        self.sunrise = 0
+        self.sunset = 0
+        self.times = array('i')
+        self.levels = bytearray()
+        self.builds = 0
+        self.wakeups = 0
+        self.writes = 0
+
+    def _level(self, i):
+        # Rounded up so the first step is never 0
+        n = self.steps * self.steps
+        return (self.full * i * i + n - 1) // n
+
+    def build(self, day, sunrise, sunset):
+        """Lay out the keyframes for the local day starting at epoch seconds day."""
+        day, sunrise, sunset = int(day), int(sunrise), int(sunset)
+        times = [day]
+        levels = [0]
+        if sunrise < sunset:
+            ramp = min(self.ramp, (sunset - sunrise) // 2)
+            steps = self.steps if ramp else 1
+            for i in range(1, steps + 1):
+                times.append(sunrise + ramp * (i - 1) // steps)
+                levels.append(self._level(i) if ramp else self.full)
+            for i in range(1, steps):
+                times.append(sunset - ramp + ramp * i // steps)
+                levels.append(self._level(steps - i))
+            times.append(sunset)
+            levels.append(0)
+        self.times = array('i', times)
+        self.levels = bytearray(levels)
+        self.day = day
+        self.sunrise = sunrise
+        self.sunset = sunset
+        self.builds += 1
+
+    def at(self, t):
+        """Brightness at local time t, and when it next changes (None if not again today)."""
+        lo, hi = 0, len(self.times)
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if self.times[mid] <= t:
+                lo = mid + 1
+            else:
+                hi = mid
+        level = self.levels[lo - 1] if lo else 0
+        return level, (self.times[lo] if lo < len(self.times) else None)
+
+    def is_day(self, t):
+        return self.sunrise <= t < self.sunset
+
+    def stats(self):
+        return {
+            'keyframes': len(self.times),
+            'builds': self.builds,
+            'wakeups': self.wakeups,
+            'writes': self.writes,
+        }
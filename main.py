@@ -1,27 +1,122 @@
 #This code was written by Chris Tilton for his Crested Gecko, Buddy, in 2024-2025
 
-import machine, time, sys, network, io
+import machine, time, sys, io
 import uasyncio as asyncio
-import urequests as requests
 import gc as garbage
 import getSunriseSunset as gss
-from gc import collect as gc
 from secrets import ADAFRUIT_AIO_KEY, ADAFRUIT_AIO_USERNAME, ssid, password
 from machine import I2C, Pin, WDT
 from sen0546 import SEN0546 
+from telemetry import TelemetryQueue
+from adafruitio import AdafruitIO, AdafruitIOMQTT
+from sampler import Sampler
+from clock import Clock
+from control import make_controller
+from backlog import Backlog
+from datalog import DataLog
+from setpoints import SetpointCache
+from lighting import LightSchedule
+from trinket import TrinketChannel
+from supervisor import Supervisor
+from profiler import Profiler
+from wifi import WifiManager, CONNECTING, CONNECTED, BACKOFF
+from dualcore import Mailbox, ControlCore
+from sampletick import TimerTick
+from heapmonitor import HeapMonitor
+from snapshot import Snapshot
 
 # Global variable for setpoint
 setpoint = 0
 deadband = .25
+# Heater control: 'bangbang' uses deadband, 'pid' uses time-proportioning over PID_WINDOW seconds
+CONTROL_MODE = 'bangbang'
+PID_GAINS = (0.2, 0.0002, 30.0)  # kp, ki, kd
+PID_WINDOW = 240  # Shorter holds the setpoint closer but switches the relay more
+if CONTROL_MODE == 'pid':
+    controller = make_controller('pid', kp=PID_GAINS[0], ki=PID_GAINS[1], kd=PID_GAINS[2], window=PID_WINDOW)
+else:
+    controller = make_controller('bangbang', deadband=deadband)
 sunHasRisen = False
 sunHasSet = False
-connected = False
+# Scheduling times are local epoch seconds; strings are only built for reports
 current_timestamp = 0
+sunrise = 0
+sunset = 0
+# Seconds between batched uplinks to Adafruit IO
+TELEMETRY_INTERVAL = 10
+# Temperature/humidity only go out when they move more than this, or every TELEMETRY_HEARTBEAT seconds
+TELEMETRY_DELTAS = {'temperature-gecko': 0.2, 'humidity-gecko': 1.0}
+TELEMETRY_HEARTBEAT = 300
+# 'http' polls Adafruit IO for setpoints; 'mqtt' keeps one connection open and has
+# setpoint and pump changes pushed the moment they are made
+AIO_TRANSPORT = 'http'
+aio = AdafruitIO(ADAFRUIT_AIO_USERNAME, ADAFRUIT_AIO_KEY)
+if AIO_TRANSPORT == 'mqtt':
+    link = AdafruitIOMQTT(ADAFRUIT_AIO_USERNAME, ADAFRUIT_AIO_KEY,
+                          subscribe=('day-setpoint-gecko', 'night-setpoint-gecko', 'pump-gecko'), http=aio)
+else:
+    link = aio
+telemetry = TelemetryQueue(link, interval=TELEMETRY_INTERVAL, deltas=TELEMETRY_DELTAS, heartbeat=TELEMETRY_HEARTBEAT)
+# Readings kept while Wi-Fi is down (one per BACKLOG_PERIOD seconds plus every lamp change),
+# mirrored to flash and uploaded in rate-limited batches once it is back
+BACKLOG_PERIOD = 60
+BACKLOG_SIZE = 720  # 12 h of readings, 6.5 KB of RAM
+BACKLOG_FILE = 'backlog.bin'
+backlog = Backlog(('temperature-gecko', 'humidity-gecko', 'lamp-gecko'), capacity=BACKLOG_SIZE, path=BACKLOG_FILE)
+# Minute and hour min/mean/max history on flash, see datalog.py
+datalog = DataLog()
+# Last known good setpoints live in setpoints.json; the defaults are only used on a first boot
+# that can't reach Adafruit IO. Cached values are rechecked after SETPOINT_MAX_AGE seconds.
+DEFAULT_SETPOINTS = {'day': 69.0, 'night': 64.0}
+SETPOINT_MAX_AGE = 300
+setpoints = SetpointCache(link, {'day': 'day-setpoint-gecko', 'night': 'night-setpoint-gecko'},
+                          DEFAULT_SETPOINTS, max_age=SETPOINT_MAX_AGE)
+# Per-task step times, heap use and loop lag, summarized to the status feed every PROFILE_INTERVAL seconds.
+# PROFILE = False leaves the tasks unwrapped; profiler.enabled can also be switched off at runtime.
+PROFILE = True
+PROFILE_INTERVAL = 900
+profiler = Profiler() if PROFILE else None
+# Runs the tasks in main(); a crashed task is restarted after a backoff instead of resetting the board
+supervisor = Supervisor(profiler=profiler)
+# Heap health is checked every HEAP_CHECK_INTERVAL seconds. Instead of a reboot every day, the board is reset
+# only once the largest free block stays under HEAP_MIN_BLOCK bytes or the free heap under HEAP_MIN_FREE.
+HEAP_CHECK_INTERVAL = 60
+HEAP_MIN_FREE = 24 * 1024
+HEAP_MIN_BLOCK = 8 * 1024
+heap = HeapMonitor(min_free=HEAP_MIN_FREE, min_block=HEAP_MIN_BLOCK, profiler=profiler)
+# Seconds between sensor conversions, and how old a reading may get before control treats the sensor as failed
+SAMPLE_PERIOD = 1
+SAMPLE_MAX_AGE = 5
+sampler = None
+# 0 runs everything in the one event loop. 1 moves sampling and heater control to the second core
+# (dualcore.py) so network I/O can't delay them; lighting and networking stay here.
+CONTROL_CORE = 0
+# Seconds without a core 1 tick before the board is reset
+CONTROL_CORE_TIMEOUT = 30
+# With CONTROL_CORE = 0: 'sleep' paces sampling and control with asyncio sleeps, 'timer' runs them
+# from a hardware timer (sampletick.py) every SAMPLE_PERIOD exactly, however busy the loop is
+SAMPLE_TICK = 'sleep'
+sample_tick = None
+mailbox = Mailbox(lock=CONTROL_CORE == 1)
+control_core = None
+# Local time kept on the RTC, resynced from NTP twice a day
+clock = Clock()
 # Initialize relay pin
 relay = Pin(4, Pin.OUT)
 relay.off()
 sht = None
-wlan = None
+# Wi-Fi is kept up by wifi.run(); boot waits at most BOOT_WIFI_TIMEOUT seconds before carrying on offline
+BOOT_WIFI_TIMEOUT = 60
+wifi = WifiManager(ssid, password)
+# Clock, active setpoint, sun times and lamp state kept on flash (snapshot.py), checked every SNAPSHOT_INTERVAL
+# seconds. With WARM_BOOT a boot that finds them starts heater control from them straight away and brings
+# Wi-Fi, NTP and Adafruit IO up in the background instead of first.
+WARM_BOOT = True
+SNAPSHOT_INTERVAL = 60
+SNAPSHOT_MAX_AGE = 900
+snapshot = Snapshot(max_age=SNAPSHOT_MAX_AGE, volatile=('lamp',))
+boot_mode = 'cold'
+first_decision_ms = None
 # I2C configuration for controlling NeoPixels
 SDA_PIN = 0  # Adjust pins as necessary
 SCL_PIN = 1
@@ -30,9 +125,17 @@ trinket = I2C(0,scl=Pin(SCL_PIN, Pin.PULL_UP), sda=Pin(SDA_PIN, Pin.PULL_UP))
 resetpin = Pin(2, Pin.OUT)
 resetpin.high()
 TRINKET_ADDRESS = 0x12 
+# Color frames go through a queue written by neopixels.run(), so a hung Trinket can't stall the loop
+neopixels = TrinketChannel(trinket, TRINKET_ADDRESS, reset_pin=resetpin)
 
 DAY_COLOR = (1,255, 150, 20,255)  # Golden Yellow
 OFF_COLOR = (1, 0, 0, 0, 0)   
+# Lights fade in over LIGHT_RAMP seconds after sunrise and out over the LIGHT_RAMP seconds before sunset
+LIGHT_RAMP = 1800
+LIGHT_RAMP_STEPS = 16
+# Longest sleep between keyframes, so clock resyncs and DST changes are picked up
+LIGHT_MAX_SLEEP = 900
+lights = LightSchedule(ramp=LIGHT_RAMP, steps=LIGHT_RAMP_STEPS, full=DAY_COLOR[4])
     
 #button_pin = Pin(15, Pin.IN)
 
@@ -43,44 +146,14 @@ def reset_i2c():
 
 # Function to send RGB color to the Trinket
 def send_color(lighttype,r, g, b,brightness):
-    color_data = bytearray([lighttype,r, g, b,brightness])
-    while True:
-        try:
-            trinket.writeto(TRINKET_ADDRESS, color_data)
-            break
-        except OSError as e:
-            print(f"Error sending color: {e}")
-            time.sleep(5)
-            continue
+    neopixels.send(lighttype, r, g, b, brightness)
 
 def reset_trinket():
-    resetpin.low()
-    time.sleep(.1)
-    resetpin.high()
-    time.sleep(.1)
+    neopixels.reset()
 
 async def update_setpoint_feed(new_setpoint):
-    global setpoint
-    FEED_KEY = 'setpoint-gecko'
-    url = f'https://io.adafruit.com/api/v2/{ADAFRUIT_AIO_USERNAME}/feeds/{FEED_KEY}/data'
-    
-    data = {'value': new_setpoint}
-    headers = {
-        'X-AIO-Key': ADAFRUIT_AIO_KEY,
-        'Content-Type': 'application/json'
-    }
-    
-    try:
-        if new_setpoint != 0:
-            gc()
-            response = requests.post(url, headers=headers, json=data)
-            if response.status_code == 200:
-                print(f"Successfully updated setpoint feed.")
-            else:
-                print(response.text)
-            response.close()
-    except Exception as e:
-        print(f"Failed to update setpoint feed: {e}")
+    if new_setpoint != 0:
+        telemetry.put('setpoint-gecko', new_setpoint)
     await asyncio.sleep(1)  # Small delay to prevent CPU overload
         
 async def send_setpoint_periodically():
@@ -88,411 +161,420 @@ async def send_setpoint_periodically():
     while True:
         
         await update_setpoint_feed(setpoint)  # Send the current setpoint to Adafruit IO
-        await asyncio.sleep(3600)  # Wait for an hour before sending again
+        await supervisor.pause(3600)  # Wait for an hour before sending again
 
 async def manage_setpoint():
     global setpoint
     global current_timestamp
+    pushed = False
     while True:
-        url = f'https://io.adafruit.com/api/v2/{ADAFRUIT_AIO_USERNAME}/feeds/day-setpoint-gecko/data/last'
-        headers = {
-        'X-AIO-Key': ADAFRUIT_AIO_KEY,
-        'Content-Type': 'application/json'
-        }
-        gc()
-        if wlan and wlan.isconnected():
-            response = requests.get(url, headers=headers)
-            if response.status_code == 200:
-                data = response.json()
-                #print(data)
-                daytime_setpoint = float(data['value'])
-                response.close()
-            else:
-                daytime_setpoint = 69.0 #HARDCODE HERE
-        else:
-            daytime_setpoint = 69.0 #HARDCODE HERE
-        url = f'https://io.adafruit.com/api/v2/{ADAFRUIT_AIO_USERNAME}/feeds/night-setpoint-gecko/data/last'
-        headers = {
-        'X-AIO-Key': ADAFRUIT_AIO_KEY,
-        'Content-Type': 'application/json'
-        }
-        gc()
-        if wlan and wlan.isconnected():
-            response = requests.get(url, headers=headers)
-            if response.status_code == 200:
-                data = response.json()
-                nighttime_setpoint = float(data['value'])
-            else:
-                nighttime_setpoint = 64.0 #HARDCODE HERE
-        else:
-            nighttime_setpoint = 64.0
-        response.close()
+        current_timestamp = clock.local()
+        # Offline or failing, the cache keeps the last good day/night values
+        if wifi.isconnected():
+            await setpoints.refresh(force=pushed)
         
         #HANDLE TIME HERE
-        if wlan and wlan.isconnected():
-            new_setpoint = nighttime_setpoint if compare_timestamps(current_timestamp, sunset,1800) or not compare_timestamps(current_timestamp, sunrise,3600) else daytime_setpoint
-        else:
-            new_setpoint = 67.0
+        night = current_timestamp >= sunset or current_timestamp < sunrise
+        new_setpoint = setpoints.get('night' if night else 'day')
         
         if setpoint != new_setpoint:
             setpoint = new_setpoint
             print(f"Setpoint changed to: {setpoint}°F")
             await update_setpoint_feed(setpoint)
         
-        await asyncio.sleep(90)  # Check every minute     
+        pushed = await wait_for_setpoints(90)  # Check every minute     
 
-async def read_sensor(sht):
-    lamp_status = 0
-    max_retries = 5
+async def wait_for_setpoints(seconds):
+    # Over MQTT a pushed setpoint ends the wait early; returns True if it did
+    if link is aio:
+        await supervisor.pause(seconds)
+        return False
+    try:
+        await asyncio.wait_for(link.changed.wait(), seconds)
+    except asyncio.TimeoutError:
+        pass
+    pushed = link.changed.is_set()
+    link.changed.clear()
+    return pushed
+
+def lamp_changed(lamp, temperature, humidity, utc):
+    state = 'ON' if lamp else 'OFF'
+    if wifi.isconnected():
+        telemetry.append('lamp-gecko', f'{state}, Temp {temperature}')
+    elif clock.valid():  # Until then the RTC reads 2021, readings stamped with it would be filed there
+        backlog.push(utc, temperature, humidity, lamp)
+    print(f"Heat Lamp turned {state}.")
+
+def stop_control():
+    if sample_tick is not None:
+        sample_tick.stop()
+    if control_core is not None:
+        control_core.stop()
+
+async def control_mailbox():
+    # The event loop half of read_sensor() when control runs on core 1 or from the timer
+    sensor_ok = True
     while True:
-        
-        retries = 0
-        if retries < max_retries:
-            while retries < max_retries:
-                try:
-                    temperature = sht.temp()
-                    humidity = sht.humidity()
-                    break  # Successful read, exit retry loop
-                except OSError as e:
-                    retries += 1
-                    await asyncio.sleep(0.5)
+        mailbox.set_setpoint(setpoint)
+        for utc, temperature, humidity, lamp in mailbox.take_events():
+            lamp_changed(lamp, temperature, humidity, utc)
+        if not mailbox.sensor_ok:
+            if sensor_ok:
+                print("No fresh sensor reading, heat lamp held OFF.")
+                await send_status_notification("Temperature Sensor Error. Resetting...")
+                sensor_ok = False
         else:
-            print("Max retries reached, skipping this cycle.")
-            await send_status_notification("Temperature Sensor Error. Resetting...")
-            reset_i2c()
+            sensor_ok = True
+            sample = sampler.latest()
+            if sample is not None and clock.valid():
+                datalog.add(clock.utc(), sample.temp, sample.humidity, mailbox.lamp)
+        if control_core.silent_ms() > CONTROL_CORE_TIMEOUT * 1000:
+            # Nothing is running the heater, start over
             relay.off()
+            await send_status_notification("Control loop stopped, System Resetting", now=True)
+            save_snapshot(force=True)
+            datalog.flush()
+            machine.reset()
+        await supervisor.pause(1)
+
+async def read_sensor():
+    global first_decision_ms
+    lamp_status = 0
+    sensor_ok = True
+    while True:
+        sample = sampler.latest()
+        if sample is None:
+            # No reading younger than SAMPLE_MAX_AGE, keep the lamp off until the sensor recovers
+            relay.off()
+            lamp_status = 0
+            controller.reset()
+            if sensor_ok:
+                print("No fresh sensor reading, heat lamp held OFF.")
+                await send_status_notification("Temperature Sensor Error. Resetting...")
+                reset_i2c()
+                sensor_ok = False
+            await supervisor.pause(1)
             continue
-            # Skip to next loop iteration
-        #print("Temperature: {}°F, Humidity: {}%".format(temperature, humidity))
+        sensor_ok = True
+        temperature = sample.temp
+        #print("Temperature: {}°F, Humidity: {}%".format(temperature, sample.humidity))
 
-        # Bang-bang controller logic
-        if temperature < setpoint - deadband:
+        if controller.update(temperature, setpoint, time.ticks_ms()):
             relay.on()  # Turn on the heat lamp
             if lamp_status == 0 :
-                if wlan and wlan.isconnected():
-                    data = {'value': f'ON, Temp {temperature}'}
-                    FEED_KEY = 'lamp-gecko'
-                    url = f'https://io.adafruit.com/api/v2/{ADAFRUIT_AIO_USERNAME}/feeds/{FEED_KEY}/data'
-                    headers = {
-                        'X-AIO-Key': ADAFRUIT_AIO_KEY,
-                        'Content-Type': 'application/json'
-                    }
-                    reply = requests.post(url, headers=headers, json=data)
-                    reply.close()
+                lamp_changed(1, temperature, sample.humidity, clock.utc())
                 lamp_status = 1
-                print("Heat Lamp turned ON.")
     
-        elif temperature >= setpoint:
+        else:
             relay.off()  # Turn off the heat lamp
             if lamp_status == 1:
-                if wlan and wlan.isconnected():
-                    data = {'value': f'OFF, Temp {temperature}'}
-                    FEED_KEY = 'lamp-gecko'
-                    url = f'https://io.adafruit.com/api/v2/{ADAFRUIT_AIO_USERNAME}/feeds/{FEED_KEY}/data'
-                    headers = {
-                        'X-AIO-Key': ADAFRUIT_AIO_KEY,
-                        'Content-Type': 'application/json'
-                    }
-                    reply = requests.post(url, headers=headers, json=data)
-                    reply.close()
-
+                lamp_changed(0, temperature, sample.humidity, clock.utc())
                 lamp_status = 0
-                print("Heat Lamp turned OFF.")
-    
-        await asyncio.sleep(1)  # Read sensor values every second
+        if first_decision_ms is None:
+            first_decision_ms = time.ticks_ms()
+
+        if clock.valid():
+            # Before NTP an offline cold boot's RTC reads 2021, out of order with the log on flash
+            datalog.add(clock.utc(), temperature, sample.humidity, lamp_status)
+        await supervisor.pause(1)  # Read sensor values every second
 
 async def send_temp():
-    if wlan and wlan.isconnected():
-        FEED_KEY = 'temperature-gecko'
-        url = f'https://io.adafruit.com/api/v2/{ADAFRUIT_AIO_USERNAME}/feeds/{FEED_KEY}/data'
-        global current_timestamp
-        
-        while True:
-            
-            if sht is not None:
-                temperature = sht.temp()
-            #print(temperature)
-            data = {'value': temperature}
-            headers = {
-                'X-AIO-Key': ADAFRUIT_AIO_KEY,
-                'Content-Type': 'application/json'
-            }
-            
-            try:
-                # Send data to Adafruit IO
-                gc()
-                reply = requests.post(url, headers=headers, json=data)
-                #print(reply.text)
-                data = reply.json()
-                timestamp_str = data['created_at']
-                #print(timestamp_str)
-                sse = time.mktime(gss.GetTimeTuple(timestamp_str)) # type: ignore
-                current_timestamp = gss.GetTimeStamp((time.localtime(sse+(offset*60))))
-                
-                #print(f"Current Time: {current_timestamp} ET")
-                if reply.status_code != 200:
-                    print(reply.status_code)
-                    print(reply.text)
-                reply.close()  # Close the response to free up resources
-            except Exception as e:
-                print("Failed to send data (T):", e)
-            
-            await asyncio.sleep(10)  # Send data every 10 seconds
+    while True:
+        sample = sampler.latest()
+        if sample is not None and wifi.isconnected():
+            telemetry.put('temperature-gecko', sample.temp)
+        await supervisor.pause(10)  # Queue data every 10 seconds
 
 async def send_humidity():
-    if wlan and wlan.isconnected():
-        FEED_KEY = 'humidity-gecko'
-        url = f'https://io.adafruit.com/api/v2/{ADAFRUIT_AIO_USERNAME}/feeds/{FEED_KEY}/data'
-        
-        while True:
-            if sht is not None:
-                if sht.humidity() is not None:
-                    humidity = sht.humidity()
-            
-            data = {'value': humidity}
-            headers = {
-                'X-AIO-Key': ADAFRUIT_AIO_KEY,
-                'Content-Type': 'application/json'
-            }
-            
-            try:
-                # Send data to Adafruit IO
-                gc()
-                reply = requests.post(url, headers=headers, json=data)
-                if reply.status_code != 200:
-                    print(reply.status_code)
-                    print(reply.text)
-                reply.close()  # Close the response to free up resources
-            except Exception as e:
-                print("Failed to send data: (H)", e)
-            
-            await asyncio.sleep(10)  # Send data every 10 seconds
+    while True:
+        sample = sampler.latest()
+        if sample is not None and wifi.isconnected():
+            telemetry.put('humidity-gecko', sample.humidity)
+        await supervisor.pause(10)  # Queue data every 10 seconds
+
+async def store_offline():
+    while True:
+        await wifi.wait_disconnected()  # Idle while online
+        sample = sampler.latest()
+        if sample is not None and clock.valid():
+            backlog.push(clock.utc(), sample.temp, sample.humidity, relay.value())
+        await supervisor.pause(BACKLOG_PERIOD)
+
+async def drain_backlog():
+    while True:
+        await supervisor.pause(backlog.interval)
+        await wifi.wait_connected()
+        if len(backlog):
+            await backlog.drain(aio)
+
+async def flush_telemetry():
+    while True:
+        await supervisor.pause(telemetry.interval)
+        await wifi.wait_connected()  # Keep queueing while offline
+        await telemetry.flush()
         
 async def control_neopixels():
-    global current_timestamp, sunHasRisen, sunHasSet
+    global current_timestamp, sunrise, sunset
 
-    brightness = 255  # Default to full brightness
+    brightness = None  # Last level written to the Trinket
     lights_on = None  # Track light status to avoid redundant notifications
 
     while True:
-        
-        if compare_timestamps (current_timestamp, sunrise, 0):
-            sunHasRisen = True
-        if compare_timestamps (current_timestamp, sunset, 0):
-            sunHasSet = True
-        if sunHasRisen and not sunHasSet:
-            if lights_on != True:  
-                send_color(*DAY_COLOR)
-                await send_lights_notification("Daytime, Lights ON")
-                lights_on = True  # Update state
+        current_timestamp = clock.local()
+        #print(f"Current Time: {gss.GetTimeStamp(time.gmtime(current_timestamp))} ET")
+        today = clock.today()
+        if lights.day != today:
+            # Once a day: sun times and the day's keyframes
+            times = gss.GetSunriseSunset(clock.date())
+            if times is not None:  # Otherwise keep yesterday's
+                offset, sunrise, sunset = times
+            lights.build(today, sunrise, sunset)
+        lights.wakeups += 1
+        level, next_change = lights.at(current_timestamp)
+        if level != brightness:
+            if level:
+                send_color(DAY_COLOR[0], DAY_COLOR[1], DAY_COLOR[2], DAY_COLOR[3], level)
+            else:
+                send_color(*OFF_COLOR)
+            lights.writes += 1
+            brightness = level
 
-        else:
-            if lights_on != False:  # Notify only if status changes
-                await send_lights_notification("Nighttime, Lights OFF")
-                lights_on = False  # Update state
-            send_color(1, 0, 0, 0, 0)  # Ensure lights are off
-            brightness = 0  # Reset brightness
-
-        await asyncio.sleep(5)  # Prevent CPU overload
-
-async def send_status_notification(message):
-    if wlan and wlan.isconnected():
-        FEED_KEY = 'status-gecko'
-        url = f'https://io.adafruit.com/api/v2/{ADAFRUIT_AIO_USERNAME}/feeds/{FEED_KEY}/data'
-        data = {'value': str(message)}
-        headers = {
-            'X-AIO-Key': ADAFRUIT_AIO_KEY,
-            'Content-Type': 'application/json'
-        }
-        try:
-            response = requests.post(url, headers=headers, json=data)
-            response.close()
-        except Exception as e:
-            print(f"Failed to send error notification: {e}")
+        day = lights.is_day(current_timestamp)
+        if lights_on != day:  # Notify only if status changes
+            await send_lights_notification("Daytime, Lights ON" if day else "Nighttime, Lights OFF")
+            lights_on = day
 
-async def send_lights_notification(message):
-    if wlan and wlan.isconnected():
-        FEED_KEY = 'lights-gecko'
-        url = f'https://io.adafruit.com/api/v2/{ADAFRUIT_AIO_USERNAME}/feeds/{FEED_KEY}/data'
-        data = {'value': str(message)}
-        headers = {
-            'X-AIO-Key': ADAFRUIT_AIO_KEY,
-            'Content-Type': 'application/json'
-        }
-        try:
-            response = requests.post(url, headers=headers, json=data)
-            response.close()
-        except Exception as e:
-            print(f"Failed to send error notification: {e}")
-
-async def check_reboot(upday):
-    if wlan and wlan.isconnected():
-        while True:
-            
-            current_day = gss.GetDay()
-            print(f'upday = {upday}, current_day = {current_day}')
-           # await send_status_notification(f'Checking Reboot: upday = {upday}, current_day = {current_day}')
-            
-            if current_day is None:
-                print("Error: Unable to fetch current day")
-                await send_status_notification("System unable to verify date, skipping reboot check.")
-                continue
+        if next_change is None:
+            next_change = today + 86400  # Tomorrow's schedule
+        await supervisor.pause(max(1, min(next_change - current_timestamp, LIGHT_MAX_SLEEP)))
 
-            if current_day != upday:
-                await send_status_notification("System Resetting")
-                relay.off()
-                reset_trinket()
-                machine.reset()
-                
-            await asyncio.sleep(900)
+async def send_status_notification(message, now=False):
+    telemetry.append('status-gecko', str(message))
+    # Messages sent right before a reset or shutdown can't wait for the next flush
+    if now and wifi.isconnected():
+        await telemetry.flush()
 
-async def check_connection():
-    global wlan, connected
+async def send_lights_notification(message):
+    telemetry.append('lights-gecko', str(message))
+
+async def check_heap():
+    # Sun times, lights, the clock and setpoints all refresh on their own, so the only
+    # reason left to reset is a heap too fragmented to allocate from
     while True:
-        if not wlan or not wlan.isconnected():
-            print("Wi-Fi disconnected! Attempting to reconnect...")
-            send_color(59, 255, 255, 255, 50)  # White = Reconnecting
-            
-            wlan = connectWifi()  # ✅ This ensures wlan is updated globally
-            
-            if wlan:
-                connected = True
-            else:
-                connected = False
-        else:
-            connected = True
-        
-        await asyncio.sleep(60)  # Check every minute
+        heap.check()
+        if heap.unhealthy():
+            print(f"Heap exhausted: {heap.stats()}")
+            await send_status_notification(f"Heap exhausted, System Resetting: {heap.stats()}", now=True)
+            stop_control()
+            relay.off()
+            save_snapshot(force=True)
+            datalog.flush()
+            reset_trinket()
+            machine.reset()
+        await supervisor.pause(HEAP_CHECK_INTERVAL)
+
+def wifi_changed(state, previous):
+    if state == CONNECTING:
+        send_color(59, 255, 255, 255, 50 if wifi.disconnects else 5)  # White = Connecting, brighter when reconnecting
+    elif state == CONNECTED:
+        send_color(59, 0, 255, 0, 25)
+        if wifi.connects > 1:
+            link.reconnected()  # Sockets belong to the old link
+    elif state == BACKOFF:
+        send_color(59, 255, 0, 0, 5)
 
 async def periodic_status_report():
     while True:
          free_mem = garbage.mem_free()/1024
          total_mem = free_mem + garbage.mem_alloc()/1024
          await send_status_notification(f"System is running smoothly. Free Memory: {free_mem} KB, Total Memory:{total_mem} KB")
-         await asyncio.sleep(3600)  # Every hour
+         # Adafruit IO takes at most 1 KB per value, and a rejected value takes the rest of its batch with it
+         await send_status_notification(f"Telemetry: {telemetry.stats()}, Connections: {link.stats()}, Sensor: {sampler.stats()}")
+         await send_status_notification(f"Clock: {clock.stats()}, Backlog: {backlog.stats()}, Datalog: {datalog.stats()}")
+         await send_status_notification(f"Setpoints: {setpoints.stats()}, Lights: {lights.stats()}, Trinket: {neopixels.stats()}, WiFi: {wifi.stats()}")
+         if control_core is not None:
+             await send_status_notification(f"Control core: {control_core.stats()}")
+         if sample_tick is not None:
+             await send_status_notification(f"Sample tick: {sample_tick.stats()}")
+         await send_status_notification(f"Tasks: {supervisor.stats()}")
+         await send_status_notification(f"Heap: {heap.stats()}")
+         await send_status_notification(f"Boot: {boot_mode}, first control decision {first_decision()} ms after reset, Snapshot: {snapshot.stats()}")
+         await supervisor.pause(3600)  # Every hour
         
-def connectWifi():
-    global wlan, connected
-    send_color(59, 255, 255, 255, 5)
-    print('Attempting to Connect to WiFi...')
-    if wlan is None:
-        new_wlan = network.WLAN(network.STA_IF)
-        new_wlan.active(True)
-    
-    elif wlan.isconnected():
-        print(f'Already connected to {ssid}.')
-        send_color(59, 0, 255, 0, 5)  # Green = already connected
-        connected = True
-        return wlan
-
-    new_wlan.connect(ssid, password)
-    timeout = 0
-    backoff = 1  # Start with 1 second backoff
-
-    while not new_wlan.isconnected():
-        new_wlan.connect(ssid, password)
-        for _ in range(10):  # 1 second increments
-            if new_wlan.isconnected():
-                wlan = new_wlan
-                connected = True
-                send_color(59, 0, 255, 0, 25)
-                print(f'Connected to {ssid}.')
-                return wlan
-            time.sleep(1)
-        timeout += 1
-        backoff = min(backoff * 2, 60)  # Double backoff up to 60 seconds
-        print(f"Retrying WiFi in {backoff} seconds...")
-        time.sleep(backoff)
-    send_color(59, 255, 0, 0, 5)
-    connected = False
-    return None
-
-def compare_timestamps(currenttime,eventtime,newoffset):
-    ct = time.mktime(gss.GetTimeTuple(currenttime))-newoffset # type: ignore
-    et = time.mktime(gss.GetTimeTuple(eventtime))-newoffset # type: ignore
-    if int(ct) >= int(et):
-        return True
-    else:
-        return False
-  
+def first_decision():
+    # ticks_ms() counts from reset, so this is the boot to first control decision time
+    if control_core is not None:
+        return control_core.first_ms
+    return first_decision_ms
+
+def save_snapshot(force=False):
+    if first_decision() is None or not setpoint:
+        return  # Nothing worth resuming from yet
+    snapshot.save(force, setpoint=setpoint, sunrise=sunrise, sunset=sunset, lamp=1 if controller.state else 0)
+
+def restore_snapshot(state):
+    global setpoint, sunrise, sunset
+    clock.restore(state['utc'])
+    setpoint = state['setpoint']
+    sunrise = state['sunrise']
+    sunset = state['sunset']
+    controller.state = bool(state['lamp'])  # Same side of the deadband as before the reset
+    print(f"Warm boot: setpoint {setpoint}°F, lamp {'ON' if controller.state else 'OFF'}")
+
+async def keep_snapshot():
+    while True:
+        await supervisor.pause(SNAPSHOT_INTERVAL)
+        save_snapshot()
+
+async def finish_boot():
+    # Runs once. A warm boot skipped the clock sync and the boot report, they happen here once Wi-Fi is up
+    while first_decision() is None:
+        await supervisor.pause(1)
+    if boot_mode == 'warm':
+        await wifi.wait_connected()
+        if not clock.synced:
+            clock.sync()
+        await send_status_notification(f"Warm boot, Sunrise = {gss.GetTimeStamp(time.gmtime(sunrise))}, Sunset = {gss.GetTimeStamp(time.gmtime(sunset))}, Clock: {clock.stats()}")
+    await send_status_notification(f"{boot_mode.capitalize()} boot, first control decision {first_decision()} ms after reset")
+
+async def report_profile():
+    while True:
+        await supervisor.pause(PROFILE_INTERVAL)
+        await send_status_notification(profiler.summary())
+
+async def task_crashed(name, e):
+    if name == 'read_sensor':
+        relay.off()  # Restarts with the lamp off
+    await send_status_notification(f"Task {name} crashed, restarting: {e}")
+
 async def main():
-    # Start the tasks
+    # Start the tasks, each restarted on its own if it crashes
+    supervisor.on_crash = task_crashed
+    supervisor.add('neopixels', neopixels.run)
+    if control_core is not None:
+        supervisor.add('control_mailbox', control_mailbox)
+    else:
+        supervisor.add('sampler', sampler.run)
+        supervisor.add('read_sensor', read_sensor)
+    supervisor.add('send_temp', send_temp)
+    supervisor.add('send_humidity', send_humidity)
+    supervisor.add('manage_setpoint', manage_setpoint)
+    supervisor.add('control_neopixels', control_neopixels)
+    supervisor.add('check_heap', check_heap)
+    supervisor.add('snapshot', keep_snapshot)
+    supervisor.add('finish_boot', finish_boot)
+    supervisor.add('wifi', wifi.run)
+    supervisor.add('periodic_status_report', periodic_status_report)
+    supervisor.add('send_setpoint_periodically', send_setpoint_periodically)
+    supervisor.add('flush_telemetry', flush_telemetry)
+    supervisor.add('clock', clock.run)
+    supervisor.add('store_offline', store_offline)
+    supervisor.add('drain_backlog', drain_backlog)
+    if link is not aio:
+        supervisor.add('mqtt', link.run)
+    if profiler is not None:
+        supervisor.add('report_profile', report_profile)
+    #supervisor.add('button_checker', button_checker)
+    #supervisor.add('manage_pump', manage_pump)
     try:
-        await asyncio.gather(
-            read_sensor(sht),
-            send_temp(),
-            send_humidity(),
-            manage_setpoint(),
-            control_neopixels(),
-            check_reboot(upday),
-            check_connection(),
-            periodic_status_report(),
-            send_setpoint_periodically(),
-            #button_checker(),
-            #manage_pump()
-        ) # type: ignore
+        if control_core is not None:
+            mailbox.set_setpoint(setpoint)
+            if sample_tick is not None:
+                sample_tick.start()
+            else:
+                control_core.start()
+        await supervisor.run()
     except Exception as e:
+        stop_control()
         relay.off()
         print(f"Exception occurred: {e}")
         send_color(59,255,0,0,255)
-        await send_status_notification(f"Error in main:{e}")
+        await send_status_notification(f"Error in main:{e}", now=True)
+        save_snapshot(force=True)
+        datalog.flush()
         time.sleep(5)
         machine.reset()
 # Run the asyncio event loop
 try:
     print("Inizializing...")
-    reset_trinket()
-    time.sleep(5)
-    wlan = connectWifi()
-    print(wlan)
-    asyncio.run(send_status_notification(f"Connected to Wifi"))
-    print('Connecting to Temperature Sensor...')
-    send_color(58,255,255,255,5)
-    retries = 0
-    while retries < 5:
-        try:
-            sht = SEN0546(scl_pin=19,sda_pin=18) #SHT TEMPERATURE SENSOR
-            if sht is not None:
-                asyncio.run(send_status_notification("Temperature Sensor Connected"))
-                send_color(58,0,255,0,5)
-                break
+    wifi.on_change = wifi_changed
+    if WARM_BOOT and snapshot.load() is not None:
+        # Straight to control from the snapshot. Wi-Fi, NTP, sun times, setpoints and the
+        # Trinket (which retries until it is back from its reset) catch up from the tasks
+        boot_mode = 'warm'
+        restore_snapshot(snapshot.state)
+        sht = SEN0546(scl_pin=19,sda_pin=18)
+    else:
+        reset_trinket()
+        time.sleep(5)
+        if wifi.connect_now(BOOT_WIFI_TIMEOUT):
+            asyncio.run(send_status_notification(f"Connected to Wifi"))
+        print('Connecting to Temperature Sensor...')
+        send_color(58,255,255,255,5)
+        retries = 0
+        while retries < 5:
+            try:
+                sht = SEN0546(scl_pin=19,sda_pin=18) #SHT TEMPERATURE SENSOR
+                if sht is not None:
+                    asyncio.run(send_status_notification("Temperature Sensor Connected"))
+                    send_color(58,0,255,0,5)
+                    break
+                else:
+                    retries+= 1
+            except OSError as e:
+                print(f"Error: {e}")
+                send_color(58,255,0,0,5)
+                retries += 1
+                time.sleep(1)
+                continue
+        print('Getting Sunrise and Sunset Times...')
+        send_color(57,255,255,255,5)
+        if wifi.isconnected() and clock.sync():  # sync() falls back to worldtimeapi when NTP doesn't answer
+            upday = clock.today()
+            uptime2 = clock.local()
+            uptime2_timestamp = gss.GetTimeStamp(time.gmtime(uptime2))
+            times = gss.GetSunriseSunset(clock.date())
+            if times is not None:
+                offset,sunrise,sunset = times
+                asyncio.run(send_status_notification(f"Uptime Date: {uptime2_timestamp}, Upday: {gss.GetTimeStamp(time.gmtime(upday))[:10]}, Sunrise = {gss.GetTimeStamp(time.gmtime(sunrise))}, Sunset = {gss.GetTimeStamp(time.gmtime(sunset))}"))
+                if uptime2 >= sunrise:
+                    sunHasRisen = True
+                if uptime2 >= sunset:
+                    sunHasSet = True
+                print(f"Risen: {sunHasRisen}, Set: {sunHasSet}")
             else:
-                retries+= 1
-        except OSError as e:
-            print(f"Error: {e}")
-            send_color(58,255,0,0,5)
-            retries += 1
-            time.sleep(1)
-            continue
-    print('Getting Sunrise and Sunset Times...')
-    send_color(57,255,255,255,5)
-    if connected:
-        offset,sunrise,sunset = gss.GetSunriseSunset()
-        upday = gss.GetDay()
-        uptime2 = gss.GetTime()
-        uptime2_timestamp = gss.GetTimeStamp(time.localtime(uptime2))
-        asyncio.run(send_status_notification(f"Uptime Date: {uptime2_timestamp}, Upday: {upday}, Sunrise = {sunrise}, Sunset = {sunset}"))
-        if compare_timestamps(uptime2_timestamp,sunrise,0):
-            sunHasRisen = True
-        if compare_timestamps(uptime2_timestamp,sunset,0):
-            sunHasSet = True
-        print(f"Risen: {sunHasRisen}, Set: {sunHasSet}")
-    else: 
-        upday = 0
-    send_color(57,0,255,0,5)
-    asyncio.run(send_status_notification("Initialization complete, System ON"))
-    time.sleep(2)
-    send_color(1,0,0,0,0)
+                # control_neopixels() tries again once its loop starts
+                asyncio.run(send_status_notification(f"Uptime Date: {uptime2_timestamp}, no sunrise/sunset times"))
+        else: 
+            upday = 0
+        send_color(57,0,255,0,5)
+        asyncio.run(send_status_notification("Initialization complete, System ON"))
+        time.sleep(2)
+        send_color(1,0,0,0,0)
+    sampler = Sampler(sht, period=SAMPLE_PERIOD, max_age=SAMPLE_MAX_AGE)
+    sampler.update()  # First reading before the control loop starts
+    if CONTROL_CORE == 1:
+        control_core = ControlCore(sampler, controller, relay, mailbox, period_ms=SAMPLE_PERIOD * 1000)
+    elif SAMPLE_TICK == 'timer':
+        control_core = ControlCore(sampler, controller, relay, mailbox, period_ms=SAMPLE_PERIOD * 1000, pipelined=True)
+        sample_tick = TimerTick(control_core.tick, SAMPLE_PERIOD * 1000)
     #MAIN LOOP
     asyncio.run(main())
 except Exception as e:
+    stop_control()
+    neopixels.stop()
     print(f"System Error: {e}")
     time.sleep(1)
     send_color(57,255,1,1,5)
-    asyncio.run(send_status_notification(f"System Stopped by Exception: {e}"))
+    asyncio.run(send_status_notification(f"System Stopped by Exception: {e}", now=True))
 except KeyboardInterrupt:
+    stop_control()
+    neopixels.stop()
     print("System Stopped")
-    asyncio.run(send_status_notification("System Stopped by Keyboard Interrupt"))
+    asyncio.run(send_status_notification("System Stopped by Keyboard Interrupt", now=True))
 finally:
+    save_snapshot(force=True)
     relay.off()
+    datalog.flush()
+    neopixels.stop()
     send_color(1,0,0,0,0)
\ No newline at end of file
@@ -0,0 +1,146 @@
+#Minimal asyncio MQTT 3.1.1 client, just what Adafruit IO needs.
+#umqtt.simple blocks the event loop on every read, so this uses uasyncio streams.
+
+import time
+import uasyncio as asyncio
+
+CONNECT = 0x10
+CONNACK = 0x20
+PUBLISH = 0x30
+PUBACK = 0x40
+SUBSCRIBE = 0x82
+SUBACK = 0x90
+PINGREQ = 0xC0
+PINGRESP = 0xD0
+DISCONNECT = 0xE0
+
+def encode_length(n):
+    """MQTT remaining length: 7 bits per byte, high bit set on all but the last."""
+    out = bytearray()
+    while True:
+        byte = n & 0x7F
+        n >>= 7
+        out.append(byte | 0x80 if n else byte)
+        if not n:
+            return out
+
+def encode_string(s):
+    if isinstance(s, str):
+        s = s.encode()
+    return len(s).to_bytes(2, 'big') + s
+
+async def read_packet(reader):
+    """Read one packet; returns (first byte, body bytes)."""
+    kind = (await reader.readexactly(1))[0]
+    length = 0
+    shift = 0
+    while True:
+        byte = (await reader.readexactly(1))[0]
+        length |= (byte & 0x7F) << shift
+        shift += 7
+        if not byte & 0x80:
+            break
+    body = await reader.readexactly(length) if length else b''
+    return kind, body
+
+def parse_publish(kind, body):
+    """Split a PUBLISH body; returns (topic, packet id or None, payload)."""
+    n = int.from_bytes(body[:2], 'big')
+    topic = body[2:2 + n].decode()
+    pos = 2 + n
+    pid = None
+    if kind & 0x06:  # QoS 1 or 2
+        pid = int.from_bytes(body[pos:pos + 2], 'big')
+        pos += 2
+    return topic, pid, body[pos:]
+
+class MQTTClient:
+    """
+    One MQTT connection. QoS 0 publishing; subscriptions may ask for QoS 1,
+    incoming QoS 1 messages are acknowledged. run() reads packets and
+    passes each PUBLISH to callback(topic, payload) until the connection
+    drops; ping() should be called at least every keepalive seconds.
+
+    With clean_session=False the broker keeps the subscriptions and queues
+    QoS 1 messages while the client is away, so nothing published during
+    an outage is missed.
+    """
+
+    def __init__(self, client_id, host, port=8883, user=None, password=None, ssl=True, keepalive=60):
+        self.client_id = client_id
+        self.host = host
+        self.port = port
+        self.user = user
+        self.password = password
+        self.ssl = ssl
+        self.keepalive = keepalive
+        self.callback = None
+        self.reader = None
+        self.writer = None
+        self.session_present = False
+        self.last_received = time.ticks_ms()
+        self._pid = 0
+
+    async def connect(self, clean_session=False):
+        self.reader, self.writer = await asyncio.open_connection(self.host, self.port, ssl=self.ssl)
+        flags = 0x02 if clean_session else 0
+        payload = encode_string(self.client_id)
+        if self.user is not None:
+            flags |= 0x80
+            payload += encode_string(self.user)
+        if self.password is not None:
+            flags |= 0x40
+            payload += encode_string(self.password)
+        await self._send(CONNECT, encode_string('MQTT') + bytes([4, flags]) +
+                         self.keepalive.to_bytes(2, 'big') + payload)
+        kind, body = await read_packet(self.reader)
+        if kind != CONNACK or len(body) < 2 or body[1] != 0:
+            self.close()
+            raise OSError(f"MQTT connect refused ({body[1] if len(body) > 1 else kind})")
+        self.session_present = bool(body[0] & 1)
+        self.last_received = time.ticks_ms()
+
+    async def _send(self, kind, body):
+        if self.writer is None:
+            raise OSError("MQTT not connected")
+        self.writer.write(bytes([kind]) + encode_length(len(body)) + body)
+        await self.writer.drain()
+
+    def _next_pid(self):
+        self._pid = self._pid % 65535 + 1
+        return self._pid
+
+    async def publish(self, topic, payload, retain=False):
+        if isinstance(payload, str):
+            payload = payload.encode()
+        await self._send(PUBLISH | (1 if retain else 0), encode_string(topic) + payload)
+
+    async def subscribe(self, topic, qos=1):
+        await self._send(SUBSCRIBE, self._next_pid().to_bytes(2, 'big') + encode_string(topic) + bytes([qos]))
+
+    async def ping(self):
+        await self._send(PINGREQ, b'')
+
+    async def run(self):
+        while True:
+            kind, body = await read_packet(self.reader)
+            self.last_received = time.ticks_ms()
+            if kind & 0xF0 == PUBLISH:
+                topic, pid, payload = parse_publish(kind, body)
+                if pid is not None:
+                    await self._send(PUBACK, pid.to_bytes(2, 'big'))
+                if self.callback:
+                    self.callback(topic, payload)
+
+    def silent_ms(self):
+        """Milliseconds since the broker last sent anything."""
+        return time.ticks_diff(time.ticks_ms(), self.last_received)
+
+    def close(self):
+        if self.writer is not None:
+            try:
+                self.writer.write(bytes([DISCONNECT, 0]))
+                self.writer.close()
+            except Exception:
+                pass
+        self.reader = self.writer = None
@@ -0,0 +1,141 @@
+import time
+import uasyncio as asyncio
+from collections import namedtuple
+
+# One immutable reading; ticks is time.ticks_ms() when it was taken
+Sample = namedtuple('Sample', ('ticks', 'temp', 'humidity'))
+
+class Sampler:
+    """
+    Reads the sensor once per period and shares that reading with every
+    consumer, instead of each consumer starting its own conversion.
+
+    Parameters:
+      sensor  -- any object with read() returning (temperature_in_F, humidity),
+                 like the SHT4x; read_async() is used instead when the driver
+                 has it. Drivers
+                 with update()/update_async() leaving temp_x10 and
+                 humidity_x10 (SEN0546) are read through those instead, which
+                 skips the tuple and the rounding on every reading
+      period  -- seconds between conversions (default: 1)
+      max_age -- seconds after which latest() treats a sample as stale (default: 5)
+
+    Counters:
+      reads    -- conversions actually performed on the bus
+      requests -- readings handed out through latest()
+      errors   -- failed conversions
+    Every request beyond the first per sample is a conversion saved.
+
+    step() is for a fixed-rate tick: it pipelines conversions on sensors
+    with request()/collect(), so the tick never waits for one.
+    """
+
+    def __init__(self, sensor, period=1, max_age=5):
+        self.sensor = sensor
+        self.period = period
+        self.max_age = max_age
+        self.sample = None
+        self.reads = 0
+        self.requests = 0
+        self.errors = 0
+        self._pending = None  # ticks of the conversion step() started, if any
+
+    def _store(self, temp, humidity, ticks=None):
+        self.reads += 1
+        if ticks is None:
+            ticks = time.ticks_ms()
+        self.sample = Sample(ticks, round(temp, 1), round(humidity, 1))
+        return self.sample
+
+    def _store_x10(self, ticks=None):
+        # Already in tenths, no rounding needed
+        self.reads += 1
+        if ticks is None:
+            ticks = time.ticks_ms()
+        self.sample = Sample(ticks, self.sensor.temp_x10 / 10, self.sensor.humidity_x10 / 10)
+        return self.sample
+
+    def _failed(self, e):
+        self.errors += 1
+        print("Sensor read error:", e)
+
+    def update(self):
+        """Take one reading now. Returns the new Sample or None on error."""
+        try:
+            if hasattr(self.sensor, 'temp_x10'):
+                self.sensor.update()
+                return self._store_x10()
+            temp, humidity = self.sensor.read()
+        except Exception as e:
+            self._failed(e)
+            return None
+        return self._store(temp, humidity)
+
+    def step(self, ticks=None):
+        """
+        Collects the conversion the previous call started and starts the
+        next, so nothing waits for the conversion delay; calls must be at
+        least the sensor's conversion time apart. The new Sample is stamped
+        with the ticks its conversion was started at (default: now).
+        Returns it, or None on error or when nothing was pending. Sensors
+        without request()/collect() are read with update() instead.
+        """
+        if not hasattr(self.sensor, 'request'):
+            return self.update()
+        sample = None
+        if self._pending is not None:
+            try:
+                self.sensor.collect()
+                sample = self._store_x10(self._pending)
+            except Exception as e:
+                self._failed(e)
+            self._pending = None
+        try:
+            self.sensor.request()
+            self._pending = time.ticks_ms() if ticks is None else ticks
+        except Exception as e:
+            self._failed(e)
+        return sample
+
+    async def update_async(self):
+        """Like update(), but awaits the conversion delay if the driver allows it."""
+        if not hasattr(self.sensor, 'read_async'):
+            return self.update()
+        try:
+            if hasattr(self.sensor, 'temp_x10'):
+                await self.sensor.update_async()
+                return self._store_x10()
+            temp, humidity = await self.sensor.read_async()
+        except Exception as e:
+            self._failed(e)
+            return None
+        return self._store(temp, humidity)
+
+    async def run(self):
+        while True:
+            await self.update_async()
+            await asyncio.sleep(self.period)
+
+    def age_ms(self):
+        if self.sample is None:
+            return None
+        return time.ticks_diff(time.ticks_ms(), self.sample.ticks)
+
+    def latest(self):
+        """The newest Sample, or None if there is none younger than max_age."""
+        self.requests += 1
+        age = self.age_ms()
+        if age is None or age > self.max_age * 1000:
+            return None
+        return self.sample
+
+    def stats(self):
+        # Each SEN0546 conversion is one I2C write plus one 4 byte read
+        saved = max(self.requests - self.reads, 0)
+        return {
+            'reads': self.reads,
+            'requests': self.requests,
+            'errors': self.errors,
+            'conversions_saved': saved,
+            'transactions_saved': saved * 2,
+        }
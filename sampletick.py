@@ -0,0 +1,101 @@
+#Fixed-rate sampling and control tick driven by a hardware timer.
+
+import time
+import machine
+import micropython
+
+class TimerTick:
+    """
+    Calls fn(ticks) every period_ms from a machine.Timer instead of an
+    asyncio sleep after variable work, so the period no longer stretches
+    with sensor reads and HTTP calls. ticks is the ticks_ms() the timer
+    fired at; use it rather than the time fn happens to run, so readings
+    and control decisions are spaced by exact ticks_ms deltas.
+
+    The timer interrupt only stamps the time and passes fn to
+    micropython.schedule(). fn then runs on the main thread between
+    bytecodes, where it may allocate and use I2C, but must not block.
+    Code that blocks in C (a TLS handshake) still holds fn back; the
+    tick then runs late, not early or twice, and latency_max_ms shows by
+    how much.
+
+    A tick is counted as missed when the previous one hasn't finished
+    running yet, or the schedule queue is full. Missed ticks are dropped,
+    not run back to back later.
+
+    Parameters:
+      fn        -- function(ticks) to run each period
+      period_ms -- tick period
+      timer_id  -- machine.Timer id, -1 for a virtual timer
+    """
+
+    def __init__(self, fn, period_ms=1000, timer_id=-1):
+        self.fn = fn
+        self.period_ms = period_ms
+        self.timer_id = timer_id
+        self.timer = None
+        # Bound once here, the interrupt handler must not allocate
+        self._irq_ref = self._irq
+        self._run_ref = self._run
+        self._pending = False
+        self._fired_at = 0
+        self._last = None
+        self.fired = 0
+        self.missed = 0
+        self.runs = 0
+        self.errors = 0
+        self.latency_max_ms = 0
+        self.period_max_ms = 0
+
+    def start(self):
+        micropython.alloc_emergency_exception_buf(100)
+        self.timer = machine.Timer(self.timer_id)
+        self.timer.init(mode=machine.Timer.PERIODIC, period=self.period_ms, callback=self._irq_ref, hard=True)
+
+    def stop(self):
+        if self.timer is not None:
+            self.timer.deinit()
+            self.timer = None
+
+    def _irq(self, timer):
+        self.fired += 1
+        if self._pending:
+            self.missed += 1
+            return
+        self._pending = True
+        self._fired_at = time.ticks_ms()
+        try:
+            micropython.schedule(self._run_ref, None)
+        except RuntimeError:
+            # Schedule queue full
+            self._pending = False
+            self.missed += 1
+
+    def _run(self, _):
+        fired_at = self._fired_at
+        latency = time.ticks_diff(time.ticks_ms(), fired_at)
+        if latency > self.latency_max_ms:
+            self.latency_max_ms = latency
+        if self._last is not None:
+            period = time.ticks_diff(fired_at, self._last)
+            if period > self.period_max_ms:
+                self.period_max_ms = period
+        self._last = fired_at
+        self.runs += 1
+        try:
+            self.fn(fired_at)
+        except Exception as e:
+            self.errors += 1
+            print(f"Sample tick error: {e}")
+        finally:
+            self._pending = False
+
+    def stats(self):
+        return {
+            'fired': self.fired,
+            'runs': self.runs,
+            'missed': self.missed,
+            'errors': self.errors,
+            'latency_max_ms': self.latency_max_ms,
+            'period_max_ms': self.period_max_ms,
+        }
@@ -1,4 +1,8 @@
 import time, machine
+import uasyncio as asyncio
+
+# Conversion time to wait between the request and the read (ms)
+CONVERSION_MS = 30
 
 class SEN0546:
     """
@@ -12,6 +16,10 @@ class SEN0546:
       - Temperature in °C:  (raw_temp * 165 / 65535) - 40
       - Temperature in °F:  (temp_C * 9/5) + 32
       - Humidity (%RH):      (raw_humidity / 65535) * 100
+
+    update() and update_async() do the conversion in integer tenths and
+    leave the result in temp_x10 and humidity_x10, reusing one buffer, so
+    a reading allocates nothing on the heap.
     """
 
     def __init__(self, i2c=None, scl_pin=None, sda_pin=None, freq=100000, address=0x40, swap_bytes=True):
@@ -26,6 +34,9 @@ class SEN0546:
           address  -- I2C address of the sensor (default: 0x40)
         """
         self.address = address
+        self._buffer = bytearray(4)
+        self.temp_x10 = 0      # Temperature in tenths of °F
+        self.humidity_x10 = 0  # Humidity in tenths of %RH
         if i2c is not None:
             self.i2c = i2c
         else:
@@ -33,47 +44,80 @@ class SEN0546:
                 raise ValueError("You must supply either an I2C instance or both scl_pin and sda_pin.")
             self.i2c = machine.I2C(1, scl=machine.Pin(scl_pin), sda=machine.Pin(sda_pin), freq=freq)
 
+    def update(self):
+        """Reads the sensor into temp_x10 and humidity_x10 without allocating."""
+        self._request()
+        # Delay to allow the sensor to perform the measurement (20 ms as in the Arduino code)
+        time.sleep_ms(CONVERSION_MS)
+        self._collect()
+
+    async def update_async(self):
+        """
+        Same as update(), but yields to other tasks during the conversion
+        delay instead of blocking the event loop.
+        """
+        self._request()
+        await asyncio.sleep_ms(CONVERSION_MS)
+        self._collect()
+
     def read(self):
         """
         Reads the sensor and returns the temperature (°F) and humidity (%RH).
 
         Returns:
-          A tuple: (temperature_in_F, humidity)
+          A tuple: (temperature_in_F, humidity), to 0.1 resolution
+        """
+        self.update()
+        return (self.temp_x10 / 10, self.humidity_x10 / 10)
+
+    async def read_async(self):
+        """Same as read(), but awaits the conversion delay."""
+        await self.update_async()
+        return (self.temp_x10 / 10, self.humidity_x10 / 10)
+
+    def request(self):
         """
+        Starts a conversion without waiting for it. Call collect() at
+        least CONVERSION_MS later, e.g. on the next tick of a fixed-rate
+        loop, so neither call blocks.
+        """
+        self._request()
+
+    def collect(self):
+        """Reads the conversion started by request() into temp_x10 and humidity_x10."""
+        self._collect()
+
+    def _request(self):
         # Request a combined measurement by writing register 0x00.
         # (The Arduino example writes 0x00 then reads 4 bytes.)
         try:
             self.i2c.writeto(self.address, b'\x00')
         except Exception as e:
             raise Exception("I2C write failed: " + str(e))
-        
-        # Delay to allow the sensor to perform the measurement (20 ms as in the Arduino code)
-        time.sleep(0.03)
-        
-        # Read 4 bytes from the sensor.
+
+    def _collect(self):
+        # Read 4 bytes from the sensor into the persistent buffer.
+        raw = self._buffer
         try:
-            raw = self.i2c.readfrom(self.address, 4)
+            self.i2c.readfrom_into(self.address, raw)
         except Exception as e:
             raise Exception("I2C read failed: " + str(e))
         
-        if len(raw) != 4:
-            raise Exception("Expected 4 bytes from sensor, but got {} bytes.".format(len(raw)))
-        
         # Extract the temperature and humidity raw values.
         raw_temp = (raw[0] << 8) | raw[1]
         raw_hum  = (raw[2] << 8) | raw[3]
         
-        # Convert raw values to human‐readable units.
-        temp_c = (raw_temp * 165.0 / 65535.0) - 40.0
-        humidity = (raw_hum * 100.0) / 65535.0
-        temp_f = temp_c * 9.0/5.0 + 32.0
-
-        return (temp_f, humidity)
+        # Convert to tenths, rounded. °F = raw * 297 / 65535 - 40 folds the
+        # two formulas above into one; every product stays a small int.
+        self.temp_x10 = (raw_temp * 2970 + 32767) // 65535 - 400
+        self.humidity_x10 = (raw_hum * 1000 + 32767) // 65535
     
     def temp(self):
-        return round(self.read()[0],1)
+        self.update()
+        return self.temp_x10 / 10
     def humidity(self):
-        return round(self.read()[1],1)
+        self.update()
+        return self.humidity_x10 / 10
     
 
 
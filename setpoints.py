@@ -0,0 +1,135 @@
+#Last known good setpoints, kept in RAM and on flash.
+
+import json
+import time
+
+class SetpointCache:
+    """
+    Remembers the last good value of each setpoint feed with when it was
+    fetched, so boot and outages use the last known setpoints instead of
+    hardcoded fallbacks.
+
+    refresh() only goes to the network for entries older than max_age, and
+    then as a conditional GET: an unchanged feed costs a 304 with no body
+    when the server sends ETags, otherwise a trimmed reply. Any failure
+    (error status, bad JSON, timeout, no connection) keeps the cached value
+    and is counted; the first failure of a run of them is printed.
+
+    Values are written to flash only when one changes.
+
+    Parameters:
+      link     -- AdafruitIO or AdafruitIOMQTT
+      feeds    -- {name: feed key}, e.g. {'day': 'day-setpoint-gecko'}
+      defaults -- {name: value} used until a value has ever been fetched
+      path     -- flash file, or None to keep the cache in RAM only
+      max_age  -- seconds before a cached value is revalidated
+    """
+
+    def __init__(self, link, feeds, defaults, path='setpoints.json', max_age=300):
+        self.link = link
+        self.feeds = feeds
+        self.path = path
+        self.max_age = max_age
+        self.entries = {}
+        for name in feeds:
+            self.entries[name] = {'value': defaults[name], 'fetched': 0, 'etag': None, 'source': 'default'}
+        self.fetches = 0
+        self.not_modified = 0
+        self.changes = 0
+        self.failures = 0
+        self._failing = False
+        if path:
+            self._load()
+
+    def _load(self):
+        try:
+            with open(self.path) as f:
+                saved = json.load(f)
+        except (OSError, ValueError):
+            return
+        for name in self.entries:
+            if name in saved:
+                entry = self.entries[name]
+                entry['value'] = saved[name]['value']
+                entry['etag'] = saved[name].get('etag')
+                entry['fetched'] = saved[name].get('fetched', 0)
+                entry['source'] = 'flash'
+
+    def _save(self):
+        saved = {}
+        for name, entry in self.entries.items():
+            saved[name] = {'value': entry['value'], 'etag': entry['etag'], 'fetched': entry['fetched']}
+        try:
+            with open(self.path, 'w') as f:
+                json.dump(saved, f)
+        except OSError as e:
+            print(f"Setpoint cache write failed: {e}")
+
+    def get(self, name):
+        return self.entries[name]['value']
+
+    def age(self, name):
+        """Seconds since the value was last confirmed."""
+        return time.time() - self.entries[name]['fetched']
+
+    def _failed(self, name, reason):
+        self.failures += 1
+        if not self._failing:
+            print(f"Setpoint fetch failed ({name}: {reason}), using {self.entries[name]['value']} from {self.entries[name]['source']}")
+            self._failing = True
+
+    async def _fetch(self, name):
+        entry = self.entries[name]
+        self.fetches += 1
+        try:
+            response = await self.link.get_last(self.feeds[name], etag=entry['etag'])
+        except Exception as e:
+            self._failed(name, e)
+            return False
+        try:
+            if response.status_code == 304:
+                self.not_modified += 1
+                entry['fetched'] = time.time()
+                self._failing = False
+                return False
+            if response.status_code != 200:
+                self._failed(name, response.status_code)
+                return False
+            value = float(response.json()['value'])
+            etag = response.headers.get('etag')
+        except (ValueError, KeyError, TypeError) as e:
+            self._failed(name, e)
+            return False
+        finally:
+            response.close()
+        self._failing = False
+        entry['fetched'] = time.time()
+        entry['source'] = 'network'
+        changed = value != entry['value'] or etag != entry['etag']
+        entry['value'] = value
+        entry['etag'] = etag
+        if changed:
+            self.changes += 1
+        return changed
+
+    async def refresh(self, force=False):
+        """Revalidate stale entries (all of them if force). Returns True if anything changed."""
+        changed = False
+        for name in self.entries:
+            age = self.age(name)
+            # A negative age means the RTC was reset since the value was saved
+            if force or age >= self.max_age or age < 0:
+                if await self._fetch(name):
+                    changed = True
+        if changed and self.path:
+            self._save()
+        return changed
+
+    def stats(self):
+        return {
+            'values': {name: entry['value'] for name, entry in self.entries.items()},
+            'fetches': self.fetches,
+            'not_modified': self.not_modified,
+            'changes': self.changes,
+            'failures': self.failures,
+        }
@@ -0,0 +1,408 @@
+"""
+Host-side simulation of the enclosure controller.
+
+install() registers stand-ins for the MicroPython-only modules (machine,
+micropython, network, urequests, ntptime, secrets, uasyncio) and the
+MicroPython time functions, so the drivers and main.py import on CPython.
+run() goes further: it starts a fake Adafruit IO server, wires the relay to
+a thermal model of the enclosure, runs main.py faster than real time and
+reports control loop lag, request counts and heap use.
+
+Simulated time runs speed times faster than the host clock: time.time(),
+the ticks functions and every sleep are scaled, and the thermal model is
+advanced to the simulated time whenever a task sleeps.
+
+On the unix MicroPython port install() only registers the stand-in modules
+and devices; time is left alone and run() is not available.
+
+    python -m sim --seconds 7200 --speed 120
+"""
+
+import sys, os, re, time, asyncio, builtins, gc, json
+from . import hardware
+from .thermal import Enclosure, daily_ambient
+
+MICROPYTHON = sys.implementation.name == 'micropython'
+
+# Originals, taken before install() replaces them
+_time = time.time
+_sleep = time.sleep
+_monotonic = time.monotonic if hasattr(time, 'monotonic') else lambda: time.ticks_ms() / 1000
+_async_sleep = asyncio.sleep
+_open_connection = asyncio.open_connection
+_wait_for = asyncio.wait_for
+_run = asyncio.run
+
+RELAY_PIN = 4
+MQTT_PORTS = (1883, 8883)
+SENSOR_ADDRESS = 0x40
+SHT4X_ADDRESS = 0x44
+TRINKET_ADDRESS = 0x12
+PROBE_INTERVAL = 0.01  # s of host time between loop lag probes
+LAG_BUCKETS = (1, 5, 10, 50, 100, 500)  # ms
+SIM_HEAP = 4 * 1024 * 1024  # bytes, stands in for the Pico W's 192 KB
+
+# 2025-06-20 10:00 UTC, 6 am Eastern, so a run starts before sunrise
+DEFAULT_START = 1750413600
+
+class SimDone(KeyboardInterrupt):
+    """Raised from asyncio.run() once the simulated duration is over."""
+
+def outage(at, duration):
+    """Scenario events taking Wi-Fi down at `at` seconds for `duration` seconds."""
+    def down(sim):
+        hardware.NET.down = True
+    def up(sim):
+        hardware.NET.down = False
+    return [(at, down), (at + duration, up)]
+
+def rate_limit(at, duration, retry_after=None):
+    """Scenario events answering every request with 429 for `duration` seconds."""
+    def start(sim):
+        sim.server.status_override = 429
+        sim.server.retry_after = retry_after
+    def stop(sim):
+        sim.server.status_override = None
+    return [(at, start), (at + duration, stop)]
+
+def trinket_hang(at):
+    """Scenario event: the Trinket stops answering until it is reset."""
+    return [(at, lambda sim: hardware.I2C.devices[TRINKET_ADDRESS].wedge())]
+
+def set_feed(at, key, value):
+    """Scenario event: someone sets a feed on the dashboard."""
+    return [(at, lambda sim: sim.set_feed(key, value))]
+
+class Response:
+    def __init__(self, status_code, content):
+        self.status_code = status_code
+        self.content = content
+        self.text = content.decode()
+
+    def json(self):
+        return json.loads(self.content)
+
+    def close(self):
+        pass
+
+class Simulation:
+    """
+    Parameters:
+      speed    -- simulated seconds per host second
+      start    -- simulated UTC epoch at the start (default: a June morning)
+      model    -- thermal model (default: Enclosure with a daily ambient swing)
+      latency  -- seconds the fake server stalls before each reply
+      feeds    -- initial Adafruit IO feed values
+      scenario -- list of (seconds from start, function(sim)) events
+      settings -- {name: value} replacing main.py's top-level constants,
+                  e.g. {'AIO_TRANSPORT': 'mqtt'}
+    """
+
+    def __init__(self, speed=1, start=None, model=None, latency=0.0, feeds=None, scenario=(), settings=None):
+        self.speed = speed
+        self.start = DEFAULT_START if start is None else start
+        self.model = model if model is not None else Enclosure(ambient=daily_ambient())
+        self.latency = latency
+        self.feeds = feeds if feeds is not None else {'day-setpoint-gecko': 75.0, 'night-setpoint-gecko': 69.0}
+        self.scenario = sorted(scenario, key=lambda event: event[0])
+        self.settings = settings or {}
+        self.server = None
+        self.broker = None
+        self.deadline = None
+        self.done = False
+        self.resets = 0
+        self.urequests = 0
+        self.lags = []
+        self.temps = []
+        self._streams = []
+        self._real0 = _monotonic()
+        self._model_at = 0.0
+
+    # Simulated time
+
+    def elapsed(self):
+        return (_monotonic() - self._real0) * self.speed
+
+    def now(self):
+        return self.start + self.elapsed()
+
+    def _advance(self):
+        elapsed = self.elapsed()
+        pin = hardware.PINS.get(RELAY_PIN)
+        lamp_on = bool(pin and pin.value())
+        while self._model_at + 1 <= elapsed:
+            self.model.step(lamp_on)
+            self._model_at += 1
+            self.temps.append(self.model.temp)
+        while self.scenario and self.scenario[0][0] <= elapsed:
+            self.scenario.pop(0)[1](self)
+
+    async def _sleep(self, delay, result=None):
+        self._advance()
+        await _async_sleep(delay / self.speed)
+        return result
+
+    async def _sleep_ms(self, ms):
+        await self._sleep(ms / 1000)
+
+    def _sleep_sync(self, seconds):
+        _sleep(seconds / self.speed)
+        pin = hardware.PINS.get(RELAY_PIN)
+        self.model.advance(self.elapsed() - self._model_at, bool(pin and pin.value()))
+        self._model_at = self.elapsed()
+
+    async def _wait_for_scaled(self, aw, timeout):
+        return await _wait_for(aw, None if timeout is None else timeout / self.speed)
+
+    def _ticks_ms(self):
+        return int(self.elapsed() * 1000)
+
+    def _ticks_us(self):
+        return int(self.elapsed() * 1000000)
+
+    # Network
+
+    async def _open_connection(self, host, port, ssl=None, **kw):
+        if hardware.NET.down:
+            raise OSError(113, 'EHOSTUNREACH')
+        if self.server is None:
+            # install() only, nothing to redirect to
+            return await _open_connection(host, port, ssl=ssl, **kw)
+        target = self.broker if port in MQTT_PORTS else self.server
+        reader, writer = await _open_connection('127.0.0.1', target.port)
+        self._streams.append(writer)
+        return reader, writer
+
+    def _request(self, method, url, headers=None, json=None, data=None, **kw):
+        if hardware.NET.down or self.server is None:
+            raise OSError(113, 'EHOSTUNREACH')
+        self.urequests += 1
+        if json is not None:
+            data = globals()['json'].dumps(json)
+        if isinstance(data, str):
+            data = data.encode()
+        parts = url.split('/', 3)
+        status, content, _ = self.server.respond(method, '/' + (parts[3] if len(parts) > 3 else ''), data or b'')
+        return Response(status, content)
+
+    def set_feed(self, key, value):
+        """Change a feed as if from the dashboard; MQTT subscribers are told."""
+        self.server.call(self.server._store, key, value)
+
+    # Event loop lag
+
+    def _expired(self):
+        return self.deadline is not None and not self.done and self.elapsed() >= self.deadline
+
+    async def _probe(self, task):
+        # Also ends the run: cancels the code under test at the deadline
+        while not self._expired():
+            t0 = _monotonic()
+            await _async_sleep(PROBE_INTERVAL)
+            self.lags.append((_monotonic() - t0 - PROBE_INTERVAL) * 1000)
+        self.done = True
+        task.cancel()
+        return True
+
+    def _run_probed(self, coro, **kw):
+        async def probed():
+            task = asyncio.ensure_future(coro)
+            probe = asyncio.ensure_future(self._probe(task))
+            try:
+                return await task, False
+            except asyncio.CancelledError:
+                if not (probe.done() and probe.result()):
+                    raise
+                return None, True
+            finally:
+                probe.cancel()
+                # CPython streams belong to one loop; drop them like a lost link
+                while self._streams:
+                    self._streams.pop().close()
+        result, cut = _run(probed(), **kw)
+        if cut:
+            # Looks like Ctrl-C to main.py, so its shutdown path runs too
+            raise SimDone()
+        return result
+
+    # Setup
+
+    def _modules(self):
+        sim = self
+
+        class urequests:
+            def request(method, url, **kw):
+                return sim._request(method, url, **kw)
+            def get(url, **kw):
+                return sim._request('GET', url, **kw)
+            def post(url, **kw):
+                return sim._request('POST', url, **kw)
+
+        class ntptime:
+            host = 'pool.ntp.org'
+            def time():
+                if hardware.NET.down:
+                    raise OSError(113, 'EHOSTUNREACH')
+                return int(sim.now())
+            def settime():
+                pass
+
+        class secrets:
+            ADAFRUIT_AIO_USERNAME = 'sim'
+            ADAFRUIT_AIO_KEY = 'sim-key'
+            ssid = 'sim-ssid'
+            password = 'sim-password'
+
+        sys.modules['machine'] = hardware.make_machine()
+        if not MICROPYTHON:
+            sys.modules['micropython'] = hardware.make_micropython()
+        sys.modules['network'] = hardware.make_network()
+        sys.modules['urequests'] = urequests
+        sys.modules['ntptime'] = ntptime
+        sys.modules['secrets'] = secrets
+
+    def install(self):
+        """Register the stand-in modules and scale time. Safe to call again."""
+        self._modules()
+        hardware.I2C.devices[SENSOR_ADDRESS] = hardware.SensorDevice(self.model)
+        hardware.I2C.devices[SHT4X_ADDRESS] = hardware.SensorDevice(self.model, hardware.sht4x_frame)
+        hardware.I2C.devices[TRINKET_ADDRESS] = hardware.TrinketDevice()
+        if MICROPYTHON:
+            return self
+        if hasattr(time, 'tzset'):
+            # mktime() must treat tuples as UTC, like on the Pico
+            os.environ['TZ'] = 'UTC'
+            time.tzset()
+        sys.modules['uasyncio'] = asyncio
+        time.time = lambda: int(self.now())
+        time.sleep = self._sleep_sync
+        time.sleep_ms = lambda ms: self._sleep_sync(ms / 1000)
+        time.sleep_us = lambda us: self._sleep_sync(us / 1000000)
+        time.ticks_ms = self._ticks_ms
+        time.ticks_us = self._ticks_us
+        time.ticks_diff = lambda a, b: a - b
+        time.ticks_add = lambda a, b: a + b
+        asyncio.sleep = self._sleep
+        asyncio.sleep_ms = self._sleep_ms
+        asyncio.open_connection = self._open_connection
+        asyncio.wait_for = self._wait_for_scaled
+        asyncio.run = self._run_probed
+        if not hasattr(builtins, 'const'):
+            builtins.const = lambda x: x
+        return self
+
+    def run(self, seconds, main='main.py', workdir=None):
+        """
+        Run main.py for `seconds` of simulated time. Files main.py writes
+        to flash go to workdir, a fresh temporary folder by default.
+        """
+        from .aioserver import FakeAdafruitIO
+        from .broker import FakeBroker
+        import tracemalloc
+        if not tracemalloc.is_tracing():
+            tracemalloc.start()
+        if not hasattr(gc, 'mem_free'):
+            # A nominal heap for main.py's status report and heap checks. Only what is allocated from
+            # here on counts, and CPython objects are several times the size of MicroPython's.
+            base = tracemalloc.get_traced_memory()[0]
+            gc.mem_alloc = lambda: max(tracemalloc.get_traced_memory()[0] - base, 0)
+            gc.mem_free = lambda: max(SIM_HEAP - gc.mem_alloc(), 0)
+        self.server = FakeAdafruitIO(clock=self.now, latency=self.latency, feeds=self.feeds).start()
+        self.broker = FakeBroker(self.server).start()
+        self.deadline = seconds
+        self._real_start = _time()
+        path = os.path.abspath(main)
+        if os.path.dirname(path) not in sys.path:
+            sys.path.insert(0, os.path.dirname(path))
+        if workdir is None:
+            import tempfile
+            workdir = tempfile.mkdtemp(prefix='sim-')
+        self.workdir = workdir
+        cwd = os.getcwd()
+        os.chdir(workdir)
+        try:
+            with open(path) as f:
+                code = compile(self._configure(f.read()), path, 'exec')
+            exec(code, {'__name__': '__main__', '__file__': path})
+        except hardware.SimReset:
+            self.resets += 1
+        except SimDone:
+            pass
+        finally:
+            self._real_end = _time()
+            self.server.stop()
+            self.broker.stop()
+            os.chdir(cwd)
+        return self
+
+    def _configure(self, source):
+        for name, value in self.settings.items():
+            source, n = re.subn(rf'^{name} = .*$', f'{name} = {value!r}', source, count=1, flags=re.M)
+            if not n:
+                raise ValueError(f"main.py has no top-level {name} to set")
+        return source
+
+    # Results
+
+    def report(self):
+        lags = sorted(self.lags)
+        buckets = {}
+        for lag in lags:
+            for limit in LAG_BUCKETS:
+                if lag < limit:
+                    label = f'<{limit}ms'
+                    break
+            else:
+                label = f'>={LAG_BUCKETS[-1]}ms'
+            buckets[label] = buckets.get(label, 0) + 1
+        relay = hardware.PINS.get(RELAY_PIN)
+        sensor = hardware.I2C.devices[SENSOR_ADDRESS]
+        trinket = hardware.I2C.devices[TRINKET_ADDRESS]
+        server = self.server
+        result = {
+            'simulated_s': round(self.elapsed()),
+            'host_s': round(self._real_end - self._real_start, 2),
+            'loop_lag_ms': {
+                'samples': len(lags),
+                'p50': round(lags[len(lags) // 2], 2) if lags else None,
+                'p99': round(lags[len(lags) * 99 // 100], 2) if lags else None,
+                'max': round(lags[-1], 2) if lags else None,
+                'histogram': buckets,
+            },
+            'http': {
+                'requests': dict(server.requests),
+                'total': sum(server.requests.values()),
+                'not_modified': server.not_modified,
+                'connections': server.connections,
+                'bytes_in': server.bytes_in,
+                'bytes_out': server.bytes_out,
+                'urequests_calls': self.urequests,
+            },
+            'i2c': {'sensor_reads': sensor.reads, 'trinket_frames': trinket.writes,
+                    'trinket_failed': trinket.failed_writes, 'trinket_resets': trinket.resets},
+            'relay_switches': relay.switches if relay else 0,
+            'lamp_on_pct': round(100 * self.model.lamp_seconds / max(self.model.elapsed, 1), 1),
+            'enclosure_f': {
+                'min': round(min(self.temps), 2) if self.temps else None,
+                'mean': round(sum(self.temps) / len(self.temps), 2) if self.temps else None,
+                'max': round(max(self.temps), 2) if self.temps else None,
+            },
+            'mqtt': {
+                'connects': self.broker.connects,
+                'packets': dict(self.broker.packets),
+                'delivered': self.broker.delivered,
+            },
+            'resets': self.resets,
+        }
+        import tracemalloc
+        current, peak = tracemalloc.get_traced_memory()
+        result['heap_kb'] = {'current': current // 1024, 'peak': peak // 1024}
+        return result
+
+def install(**kw):
+    """Register the stand-in modules; see Simulation for the keyword arguments."""
+    return Simulation(**kw).install()
+
+def run(seconds=3600, main='main.py', workdir=None, **kw):
+    """Run main.py in the simulation and return the Simulation for its report()."""
+    return Simulation(**kw).install().run(seconds, main, workdir)
@@ -0,0 +1,45 @@
+#Runs main.py in the simulation and prints the report. From the project folder:
+#   python -m sim --seconds 7200 --speed 120
+
+import argparse
+import ast
+import json
+import sim
+
+def literal(text):
+    try:
+        return ast.literal_eval(text)
+    except (ValueError, SyntaxError):
+        return text
+
+parser = argparse.ArgumentParser(prog='python -m sim', description='Run main.py against simulated hardware and network.')
+parser.add_argument('--seconds', type=int, default=3600, help='simulated seconds to run')
+parser.add_argument('--speed', type=float, default=60, help='simulated seconds per real second')
+parser.add_argument('--start', type=int, default=None, help='simulated UTC epoch to start at')
+parser.add_argument('--latency', type=float, default=0.0, help='seconds the fake server stalls per reply')
+parser.add_argument('--outage', type=int, nargs=2, metavar=('AT', 'SECONDS'), help='take Wi-Fi down for a while')
+parser.add_argument('--rate-limit', type=int, nargs=2, metavar=('AT', 'SECONDS'), help='answer 429 for a while')
+parser.add_argument('--trinket-hang', type=int, metavar='AT', help='wedge the Trinket until it is reset')
+parser.add_argument('--set-feed', nargs=3, action='append', default=[], metavar=('AT', 'KEY', 'VALUE'),
+                    help='change a feed as if from the dashboard')
+parser.add_argument('--set', action='append', default=[], metavar='NAME=VALUE',
+                    help="replace a constant in main.py, e.g. --set AIO_TRANSPORT=mqtt")
+parser.add_argument('--main', default='main.py')
+args = parser.parse_args()
+
+scenario = []
+if args.outage:
+    scenario += sim.outage(*args.outage)
+if args.rate_limit:
+    scenario += sim.rate_limit(*args.rate_limit)
+if args.trinket_hang is not None:
+    scenario += sim.trinket_hang(args.trinket_hang)
+for at, key, value in args.set_feed:
+    scenario += sim.set_feed(int(at), key, literal(value))
+settings = {}
+for item in args.set:
+    name, _, value = item.partition('=')
+    settings[name] = literal(value)
+result = sim.run(args.seconds, args.main, speed=args.speed, start=args.start,
+                 latency=args.latency, scenario=scenario, settings=settings)
+print(json.dumps(result.report(), indent=2))
@@ -0,0 +1,182 @@
+#Local fake of the Adafruit IO REST API (plus worldtimeapi) for the simulation.
+
+import json
+import time
+import asyncio
+import threading
+
+# Taken before sim.install() scales asyncio.sleep for the code under test
+_sleep = asyncio.sleep
+
+class ThreadedServer:
+    """
+    A localhost TCP server running its own event loop in a daemon thread,
+    so every event loop the code under test starts can reach it.
+    Subclasses implement _handle(reader, writer).
+    """
+
+    def __init__(self):
+        self.port = None
+        self.connections = 0
+        self._loop = None
+        self._ready = threading.Event()
+
+    def _serve(self):
+        self._loop = asyncio.new_event_loop()
+        server = self._loop.run_until_complete(asyncio.start_server(self._handle, '127.0.0.1', 0))
+        self.port = server.sockets[0].getsockname()[1]
+        self._ready.set()
+        self._loop.run_forever()
+
+    def start(self):
+        threading.Thread(target=self._serve, daemon=True).start()
+        self._ready.wait()
+        return self
+
+    def call(self, fn, *args):
+        """Run fn(*args) on the server's loop, from any thread."""
+        self._loop.call_soon_threadsafe(fn, *args)
+
+    def stop(self):
+        if self._loop is not None:
+            self._loop.call_soon_threadsafe(self._loop.stop)
+
+class FakeAdafruitIO(ThreadedServer):
+    """
+    Answers the Adafruit IO REST calls main.py makes. Keep-alive
+    connections are supported.
+
+    feeds holds the latest value per feed key; history keeps every value
+    written. GET last sends an ETag and answers If-None-Match with a 304
+    while the feed is unchanged. Counters: requests (by "METHOD endpoint"),
+    304 replies, connections, bytes received and sent.
+
+    Parameters:
+      clock   -- function returning the simulated UTC epoch, for created_at
+      latency -- seconds to stall before each reply
+      feeds   -- initial feed values
+    """
+
+    def __init__(self, clock=time.time, latency=0.0, feeds=None):
+        super().__init__()
+        self.clock = clock
+        self.latency = latency
+        self.feeds = dict(feeds or {})
+        self.history = {}
+        self.requests = {}
+        self.status_override = None
+        self.retry_after = None
+        self.not_modified = 0
+        self.bytes_in = 0
+        self.bytes_out = 0
+        self.listeners = []
+
+    def _created_at(self):
+        tm = time.gmtime(self.clock())
+        return '%04d-%02d-%02dT%02d:%02d:%02dZ' % tm[:6]
+
+    def _count(self, method, path):
+        parts = path.split('?')[0].strip('/').split('/')
+        # /api/v2/{user}/feeds/{key}/data/last -> feeds/*/data/last
+        if len(parts) > 4 and parts[0] == 'api':
+            parts = parts[3:]
+            parts[1] = '*'
+        key = method + ' ' + '/'.join(parts)
+        self.requests[key] = self.requests.get(key, 0) + 1
+
+    def _store(self, key, value):
+        self.feeds[key] = value
+        self.history.setdefault(key, []).append((self.clock(), value))
+        for listener in self.listeners:
+            listener(key, value)
+        return {'id': str(len(self.history[key])), 'feed_key': key, 'value': value,
+                'created_at': self._created_at()}
+
+    def etag(self, key):
+        # Changes whenever the feed gets a new value
+        return '"%s-%d"' % (key, len(self.history.get(key, ())))
+
+    def respond(self, method, path, body=b'', headers=None):
+        """
+        Handle one request; returns (status, response body bytes, extra
+        response headers). headers are the request headers, lowercased.
+        """
+        self._count(method, path)
+        headers = headers or {}
+        if self.status_override is not None:
+            return self.status_override, b'{"error": "simulated"}', {}
+        parts = path.split('?')[0].strip('/').split('/')
+        if parts[:2] == ['api', 'timezone']:
+            return 200, json.dumps(self._worldtime()).encode(), {}
+        if len(parts) < 5 or parts[:2] != ['api', 'v2']:
+            return 404, b'{"error": "not found"}', {}
+        kind, key = parts[3], parts[4]
+        data = json.loads(body) if body else {}
+        if kind == 'feeds' and method == 'GET' and parts[-1] == 'last':
+            if key not in self.feeds:
+                return 404, b'{"error": "not found"}', {}
+            etag = self.etag(key)
+            if headers.get('if-none-match') == etag:
+                self.not_modified += 1
+                return 304, b'', {'ETag': etag}
+            return 200, json.dumps({'value': str(self.feeds[key]), 'created_at': self._created_at()}).encode(), {'ETag': etag}
+        if kind == 'feeds' and method == 'POST' and parts[-1] == 'batch':
+            # Adafruit IO wants {"data": [...]}, a bare list is rejected
+            if not isinstance(data, dict) or not isinstance(data.get('data'), list):
+                return 400, b'{"error": "request body must be {\\"data\\": [...]}"}', {}
+            return 200, json.dumps([self._store(key, item['value']) for item in data['data']]).encode(), {}
+        if kind == 'feeds' and method == 'POST':
+            return 200, json.dumps(self._store(key, data.get('value'))).encode(), {}
+        if kind == 'groups' and method == 'POST':
+            return 200, json.dumps([self._store(item['key'], item['value']) for item in data.get('feeds', [])]).encode(), {}
+        return 404, b'{"error": "not found"}', {}
+
+    def _worldtime(self):
+        utc = int(self.clock())
+        tm = time.gmtime(utc - 5 * 3600)
+        return {'unixtime': utc, 'raw_offset': -18000, 'dst': False, 'day_of_year': tm[7]}
+
+    async def _handle(self, reader, writer):
+        self.connections += 1
+        try:
+            while True:
+                line = await reader.readline()
+                if not line:
+                    break
+                method, path = line.decode().split()[:2]
+                length = 0
+                keep_alive = False
+                headers = {}
+                while True:
+                    line = await reader.readline()
+                    if not line or line == b'\r\n':
+                        break
+                    name, _, value = line.decode().partition(':')
+                    name = name.strip().lower()
+                    headers[name] = value.strip()
+                    if name == 'content-length':
+                        length = int(value)
+                    elif name == 'connection':
+                        keep_alive = value.strip().lower() == 'keep-alive'
+                body = await reader.readexactly(length) if length else b''
+                self.bytes_in += len(body)
+                if self.latency:
+                    await _sleep(self.latency)
+                status, content, reply_headers = self.respond(method, path, body, headers)
+                if status == 429 and self.retry_after:
+                    reply_headers['Retry-After'] = self.retry_after
+                if status != 304:
+                    # Like Adafruit IO, a 304 has no Content-Length
+                    reply_headers['Content-Length'] = len(content)
+                extra = ''.join('%s: %s\r\n' % item for item in reply_headers.items())
+                head = 'HTTP/1.1 %d OK\r\nContent-Type: application/json\r\nConnection: %s\r\n%s\r\n' % (
+                    status, 'keep-alive' if keep_alive else 'close', extra)
+                writer.write(head.encode() + content)
+                self.bytes_out += len(head) + len(content)
+                await writer.drain()
+                if not keep_alive:
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            writer.close()
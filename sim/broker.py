@@ -0,0 +1,204 @@
+#Local MQTT 3.1.1 broker stub speaking the Adafruit IO topic layout.
+
+import json
+from .aioserver import ThreadedServer, asyncio
+
+def _string(s):
+    s = s.encode()
+    return len(s).to_bytes(2, 'big') + s
+
+def _length(n):
+    out = bytearray()
+    while True:
+        byte = n & 0x7F
+        n >>= 7
+        out.append(byte | 0x80 if n else byte)
+        if not n:
+            return bytes(out)
+
+def _matches(pattern, topic):
+    p = pattern.split('/')
+    t = topic.split('/')
+    for i, part in enumerate(p):
+        if part == '#':
+            return True
+        if i >= len(t) or (part != '+' and part != t[i]):
+            return False
+    return len(p) == len(t)
+
+class Session:
+    def __init__(self, client_id, clean):
+        self.client_id = client_id
+        self.clean = clean
+        self.subscriptions = {}  # filter -> qos
+        self.writer = None
+        self.queued = []  # QoS 1 messages kept while the client is away
+
+class FakeBroker(ThreadedServer):
+    """
+    Enough of a mosquitto-compatible broker for mqtt.py: CONNECT with
+    persistent sessions, SUBSCRIBE with + and # wildcards, QoS 0/1 PUBLISH,
+    PINGREQ and DISCONNECT. Deliveries are QoS 0, or QoS 1 if the
+    subscription asked for it. Messages for QoS 1 subscriptions of
+    persistent sessions are queued while the client is away.
+
+    Given a FakeAdafruitIO it behaves like io.adafruit.com: publishes to
+    {user}/feeds/{key} and {user}/groups/{group} are stored as feed data,
+    {user}/feeds/{key}/get sends the current value back, and every feed
+    write (over HTTP too, or from a scenario) goes out to subscribers.
+
+    Counters: connects, packets by type (publishes by endpoint), messages
+    delivered and queued.
+    """
+
+    def __init__(self, aio=None):
+        super().__init__()
+        self.aio = aio
+        self.sessions = {}
+        self.connects = 0
+        self.packets = {}
+        self.delivered = 0
+        self.queued = 0
+        self._pid = 0
+        if aio is not None:
+            aio.listeners.append(lambda key, value: self.call(self._feed_written, key, value))
+
+    def _count(self, name):
+        self.packets[name] = self.packets.get(name, 0) + 1
+
+    def _feed_written(self, key, value):
+        # Adafruit IO topics are per user; answer for any user name
+        for session in self.sessions.values():
+            for pattern in session.subscriptions:
+                user = pattern.split('/')[0]
+                topic = f'{user}/feeds/{key}'
+                if _matches(pattern, topic):
+                    self._deliver(session, topic, str(value).encode(), session.subscriptions[pattern])
+                    break
+
+    def publish(self, topic, payload):
+        """Route a message to subscribers, from any thread."""
+        self.call(self._route, topic, payload if isinstance(payload, bytes) else str(payload).encode())
+
+    def _route(self, topic, payload):
+        for session in self.sessions.values():
+            for pattern, qos in session.subscriptions.items():
+                if _matches(pattern, topic):
+                    self._deliver(session, topic, payload, qos)
+                    break
+
+    def _deliver(self, session, topic, payload, qos):
+        if session.writer is None:
+            if qos and not session.clean:
+                session.queued.append((topic, payload, qos))
+                self.queued += 1
+            return
+        if qos:
+            self._pid = self._pid % 65535 + 1
+            body = _string(topic) + self._pid.to_bytes(2, 'big') + payload
+            session.writer.write(bytes([0x32]) + _length(len(body)) + body)
+        else:
+            body = _string(topic) + payload
+            session.writer.write(bytes([0x30]) + _length(len(body)) + body)
+        self.delivered += 1
+
+    def _incoming(self, session, topic, payload):
+        parts = topic.split('/')
+        if self.aio is None or len(parts) < 3:
+            self._count('PUBLISH')
+            self._route(topic, payload)
+            return
+        user, kind, key = parts[0], parts[1], parts[2]
+        if kind in ('feeds', 'f') and len(parts) == 4 and parts[3] == 'get':
+            self._count('PUBLISH feeds/*/get')
+            if key in self.aio.feeds:
+                self._deliver(session, f'{user}/feeds/{key}', str(self.aio.feeds[key]).encode(), 0)
+        elif kind in ('feeds', 'f'):
+            self._count('PUBLISH feeds/*')
+            self.aio._store(key, payload.decode())
+        elif kind in ('groups', 'g'):
+            self._count('PUBLISH groups/*')
+            for feed, value in json.loads(payload)['feeds'].items():
+                self.aio._store(feed, value)
+        else:
+            self._count('PUBLISH')
+            self._route(topic, payload)
+
+    async def _read(self, reader):
+        kind = (await reader.readexactly(1))[0]
+        length = 0
+        shift = 0
+        while True:
+            byte = (await reader.readexactly(1))[0]
+            length |= (byte & 0x7F) << shift
+            shift += 7
+            if not byte & 0x80:
+                break
+        return kind, (await reader.readexactly(length) if length else b'')
+
+    async def _handle(self, reader, writer):
+        self.connections += 1
+        session = None
+        try:
+            while True:
+                kind, body = await self._read(reader)
+                packet = kind & 0xF0
+                if packet == 0x10:  # CONNECT
+                    self._count('CONNECT')
+                    n = int.from_bytes(body[:2], 'big')
+                    flags = body[2 + n + 1]
+                    pos = 2 + n + 4
+                    n = int.from_bytes(body[pos:pos + 2], 'big')
+                    client_id = body[pos + 2:pos + 2 + n].decode()
+                    clean = bool(flags & 0x02)
+                    session = self.sessions.get(client_id)
+                    present = session is not None and not clean
+                    if not present:
+                        session = Session(client_id, clean)
+                        self.sessions[client_id] = session
+                    if session.writer is not None:
+                        session.writer.close()  # Takeover, like mosquitto
+                    session.writer = writer
+                    self.connects += 1
+                    writer.write(bytes([0x20, 2, 1 if present else 0, 0]))
+                    queued, session.queued = session.queued, []
+                    for topic, payload, qos in queued:
+                        self._deliver(session, topic, payload, qos)
+                elif packet == 0x80:  # SUBSCRIBE
+                    self._count('SUBSCRIBE')
+                    pid = body[:2]
+                    pos = 2
+                    granted = bytearray()
+                    while pos < len(body):
+                        n = int.from_bytes(body[pos:pos + 2], 'big')
+                        pattern = body[pos + 2:pos + 2 + n].decode()
+                        qos = min(body[pos + 2 + n], 1)
+                        session.subscriptions[pattern] = qos
+                        granted.append(qos)
+                        pos += 3 + n
+                    writer.write(bytes([0x90]) + _length(2 + len(granted)) + pid + bytes(granted))
+                elif packet == 0x30:  # PUBLISH
+                    n = int.from_bytes(body[:2], 'big')
+                    topic = body[2:2 + n].decode()
+                    pos = 2 + n
+                    if kind & 0x06:
+                        writer.write(bytes([0x40, 2]) + body[pos:pos + 2])
+                        pos += 2
+                    self._incoming(session, topic, body[pos:])
+                elif packet == 0x40:  # PUBACK
+                    self._count('PUBACK')
+                elif packet == 0xC0:  # PINGREQ
+                    self._count('PINGREQ')
+                    writer.write(bytes([0xD0, 0]))
+                elif packet == 0xE0:  # DISCONNECT
+                    self._count('DISCONNECT')
+                    break
+                await writer.drain()
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            if session is not None and session.writer is writer:
+                session.writer = None
+                if session.clean:
+                    del self.sessions[session.client_id]
+            writer.close()
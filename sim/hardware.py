@@ -0,0 +1,337 @@
+#Stand-ins for the machine, network, ntptime and micropython modules.
+
+import time
+
+_sleep = time.sleep  # Unscaled, taken before install() replaces it
+
+class SimReset(SystemExit):
+    """Raised by machine.reset(); ends a simulation run."""
+
+def crc8(data):
+    crc = 0xFF
+    for byte in data:
+        crc ^= byte
+        for _ in range(8):
+            crc = ((crc << 1) ^ 0x31) if crc & 0x80 else crc << 1
+    return crc & 0xFF
+
+def sen0546_frame(temp_f, humidity):
+    """The 4 bytes the SEN0546 returns for the given reading."""
+    raw_temp = int(((temp_f - 32) * 5 / 9 + 40) * 65535 / 165)
+    raw_hum = int(humidity * 65535 / 100)
+    return bytes([raw_temp >> 8, raw_temp & 0xFF, raw_hum >> 8, raw_hum & 0xFF])
+
+def sht4x_frame(temp_f, humidity):
+    """The 6 bytes (with CRCs) the SHT4x returns for the given reading."""
+    raw_temp = int(((temp_f - 32) * 5 / 9 + 47.5) * 65535 / 175)
+    raw_hum = int((humidity + 6) * 65535 / 125)
+    t = bytes([raw_temp >> 8, raw_temp & 0xFF])
+    h = bytes([raw_hum >> 8, raw_hum & 0xFF])
+    return t + bytes([crc8(t)]) + h + bytes([crc8(h)])
+
+class StaticDevice:
+    """An I2C device that always answers with the same bytes."""
+
+    def __init__(self, frame=b''):
+        self.frame = frame
+        self.writes = 0
+        self.reads = 0
+
+    def write(self, buf):
+        self.writes += 1
+
+    def read(self):
+        self.reads += 1
+        return self.frame
+
+class SensorDevice(StaticDevice):
+    """A temperature/humidity sensor reporting what a thermal model says."""
+
+    def __init__(self, model, encode=sen0546_frame):
+        super().__init__()
+        self.model = model
+        self.encode = encode
+
+    def read(self):
+        self.reads += 1
+        return self.encode(self.model.sensor_temp(), self.model.humidity())
+
+class TrinketDevice(StaticDevice):
+    """
+    The Pro Trinket NeoPixel controller; remembers every frame written.
+    After wedge() every write times out until the board is reset by a
+    pulse on its reset pin.
+    """
+
+    def __init__(self, reset_pin=2):
+        super().__init__()
+        self.last = None
+        self.reset_pin = reset_pin
+        self.wedged = False
+        self.failed_writes = 0
+        self.resets = 0
+        self._mark = 0
+
+    def _pulses(self):
+        pin = PINS.get(self.reset_pin)
+        return pin.switches if pin else 0
+
+    def wedge(self):
+        self.wedged = True
+        self._mark = self._pulses()
+
+    def write(self, buf):
+        if self.wedged:
+            if self._pulses() - self._mark < 2:
+                self.failed_writes += 1
+                raise OSError(116)  # ETIMEDOUT, clock stretched forever
+            self.wedged = False
+            self.resets += 1
+            self.last = None
+        self.writes += 1
+        self.last = bytes(buf)
+
+# Every Pin created, by pin id, so models and reports can see outputs
+PINS = {}
+
+class Pin:
+    OUT = 1
+    IN = 0
+    PULL_UP = 2
+    PULL_DOWN = 3
+
+    def __init__(self, pin, mode=None, *args, **kw):
+        self.pin = pin
+        self._value = 0
+        self.switches = 0
+        PINS[pin] = self
+
+    def value(self, v=None):
+        if v is None:
+            return self._value
+        v = 1 if v else 0
+        if v != self._value:
+            self.switches += 1
+        self._value = v
+
+    def on(self):
+        self.value(1)
+
+    def off(self):
+        self.value(0)
+
+    def high(self):
+        self.value(1)
+
+    def low(self):
+        self.value(0)
+
+    def toggle(self):
+        self.value(not self._value)
+
+class I2C:
+    """
+    Routes transactions to the devices registered by address. Missing
+    devices answer with OSError(5), like a NACK on the real bus. Set
+    fail to an exception to make every transaction raise it.
+    """
+
+    devices = {}
+    fail = None
+
+    def __init__(self, bus=0, *args, **kw):
+        self.bus = bus
+
+    def _device(self, addr):
+        if self.fail is not None:
+            raise self.fail
+        if addr not in self.devices:
+            raise OSError(5)
+        return self.devices[addr]
+
+    def writeto(self, addr, buf):
+        self._device(addr).write(buf)
+        return len(buf)
+
+    def readfrom(self, addr, n):
+        return bytes(self._device(addr).read()[:n])
+
+    def readfrom_into(self, addr, buf):
+        frame = self._device(addr).read()
+        for i in range(len(buf)):
+            buf[i] = frame[i] if i < len(frame) else 0
+
+class WDT:
+    def __init__(self, id=0, timeout=5000):
+        self.timeout = timeout
+        self.feeds = 0
+
+    def feed(self):
+        self.feeds += 1
+
+class RTC:
+    def datetime(self, dt=None):
+        # Wall time comes from the simulation clock, setting it is a no-op
+        return None
+
+class Network:
+    """Shared link state for the fake WLAN, sockets and urequests."""
+
+    def __init__(self):
+        self.down = False
+        self.connects = 0
+
+NET = Network()
+
+class WLAN:
+    # connect() returns straight away on the Pico, association follows later
+    ASSOCIATE_POLLS = 2
+
+    def __init__(self, mode=0):
+        self._active = False
+        self._connected = False
+        self._polls = 0
+
+    def active(self, v=None):
+        if v is None:
+            return self._active
+        self._active = v
+
+    def connect(self, ssid=None, password=None):
+        NET.connects += 1
+        if not self._connected:
+            self._polls = self.ASSOCIATE_POLLS
+
+    def disconnect(self):
+        self._connected = False
+
+    def isconnected(self):
+        if NET.down:
+            self._connected = False
+        elif self._polls:
+            self._polls -= 1
+            self._connected = not self._polls
+        return self._connected
+
+    def status(self):
+        return 3 if self.isconnected() else 0
+
+    def ifconfig(self):
+        return ('192.168.1.50', '255.255.255.0', '192.168.1.1', '192.168.1.1')
+
+    def config(self, *args, **kw):
+        return b'\x28\xcd\xc1\x00\x00\x01'
+
+class Scheduler:
+    """
+    micropython.schedule(): queues fn(arg) to run on the event loop's
+    thread between its callbacks, like the Pico runs scheduled functions
+    between bytecodes. Raises RuntimeError when DEPTH calls are queued.
+    Without a loop fn runs straight away.
+    """
+    DEPTH = 8
+
+    def __init__(self):
+        import threading
+        self.lock = threading.Lock()
+        self.loop = None
+        self.queued = 0
+
+    def _call(self, fn, arg):
+        with self.lock:
+            self.queued -= 1
+        fn(arg)
+
+    def schedule(self, fn, arg):
+        loop = self.loop
+        if loop is None or loop.is_closed():
+            fn(arg)
+            return
+        with self.lock:
+            if self.queued >= self.DEPTH:
+                raise RuntimeError('schedule queue full')
+            self.queued += 1
+        try:
+            loop.call_soon_threadsafe(self._call, fn, arg)
+        except RuntimeError:
+            # The loop closed under us
+            with self.lock:
+                self.queued -= 1
+            raise
+
+SCHEDULER = None
+
+class Timer:
+    """
+    machine.Timer on a host thread, firing on a fixed grid of the scaled
+    ticks_ms(). The callback runs on that thread, so it interrupts the
+    event loop like a hard IRQ; the loop running at init() is the one
+    micropython.schedule() hands work to.
+    """
+    ONE_SHOT = 0
+    PERIODIC = 1
+
+    def __init__(self, id=-1, **kw):
+        self._run_id = None
+        if kw:
+            self.init(**kw)
+
+    def init(self, mode=PERIODIC, period=-1, freq=-1, callback=None, hard=False, tick_hz=1000):
+        import threading, asyncio
+        self.deinit()
+        if freq > 0:
+            period = 1000 // freq
+        try:
+            SCHEDULER.loop = asyncio.get_running_loop()
+        except RuntimeError:
+            pass
+        run_id = self._run_id = object()
+        threading.Thread(target=self._run, args=(run_id, mode, period, callback), daemon=True).start()
+
+    def _run(self, run_id, mode, period, callback):
+        slot = time.ticks_ms() + period
+        while self._run_id is run_id:
+            if time.ticks_diff(slot, time.ticks_ms()) > 0:
+                _sleep(0.0005)
+                continue
+            if callback is not None:
+                callback(self)
+            if mode == self.ONE_SHOT:
+                return
+            slot += period
+
+    def deinit(self):
+        self._run_id = None
+
+def reset():
+    raise SimReset()
+
+def make_machine():
+    # A class stands in for the module, MicroPython can't create module objects
+    class machine:
+        pass
+    machine.Pin = Pin
+    machine.I2C = I2C
+    machine.SoftI2C = I2C
+    machine.WDT = WDT
+    machine.RTC = RTC
+    machine.Timer = Timer
+    machine.reset = reset
+    return machine
+
+def make_micropython():
+    global SCHEDULER
+    SCHEDULER = Scheduler()
+    class micropython:
+        pass
+    micropython.schedule = SCHEDULER.schedule
+    micropython.alloc_emergency_exception_buf = lambda size: None
+    micropython.const = lambda x: x
+    return micropython
+
+def make_network():
+    class network:
+        STA_IF = 0
+        AP_IF = 1
+    network.WLAN = WLAN
+    return network
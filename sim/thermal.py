@@ -0,0 +1,68 @@
+#Thermal model of the enclosure, heated by the lamp on the relay.
+
+import math
+
+class Enclosure:
+    """
+    First-order stages: relay -> lamp heat -> enclosure air -> sensor.
+
+    Parameters:
+      ambient       -- room temperature in °F, or a function of elapsed
+                       seconds returning it (for scripted days)
+      lamp_gain     -- °F the lamp holds the enclosure above ambient at steady state
+      tau_lamp      -- s, lamp and glass warm-up lag
+      tau_enclosure -- s, enclosure heat loss time constant
+      tau_sensor    -- s, lag between the air near the lamp and the sensor
+      humidity      -- %RH at ambient temperature; drops as the lamp dries the air
+    """
+
+    def __init__(self, ambient=66.0, lamp_gain=20.0, tau_lamp=90, tau_enclosure=900,
+                 tau_sensor=60, humidity=70.0, temp=None):
+        self.ambient = ambient
+        self.lamp_gain = lamp_gain
+        self.tau_lamp = tau_lamp
+        self.tau_enclosure = tau_enclosure
+        self.tau_sensor = tau_sensor
+        self.base_humidity = humidity
+        self.elapsed = 0.0
+        self.temp = self.ambient_at(0) if temp is None else temp
+        self.heat = 0.0
+        self.sensor = self.temp
+        self.lamp_seconds = 0.0
+
+    def ambient_at(self, elapsed):
+        if callable(self.ambient):
+            return self.ambient(elapsed)
+        return self.ambient
+
+    def step(self, lamp_on, dt=1.0):
+        """Advance dt seconds; returns the sensor reading at 0.1 °F resolution."""
+        ambient = self.ambient_at(self.elapsed)
+        self.heat += ((self.lamp_gain if lamp_on else 0.0) - self.heat) * dt / self.tau_lamp
+        self.temp += (ambient + self.heat - self.temp) * dt / self.tau_enclosure
+        self.sensor += (self.temp - self.sensor) * dt / self.tau_sensor
+        self.elapsed += dt
+        if lamp_on:
+            self.lamp_seconds += dt
+        return round(self.sensor, 1)
+
+    def advance(self, seconds, lamp_on, max_dt=1.0):
+        """Advance by any number of seconds in steps of at most max_dt."""
+        while seconds > 0:
+            dt = min(seconds, max_dt)
+            self.step(lamp_on, dt)
+            seconds -= dt
+
+    def sensor_temp(self):
+        return self.sensor
+
+    def humidity(self):
+        rh = self.base_humidity - 1.5 * (self.temp - self.ambient_at(self.elapsed))
+        return max(min(rh, 100.0), 0.0)
+
+def daily_ambient(mean=66.0, swing=4.0, coldest_hour=5):
+    """Scripted room temperature: a daily sine wave, coldest at coldest_hour."""
+    def ambient(elapsed):
+        phase = 2 * math.pi * ((elapsed / 3600 - coldest_hour) / 24)
+        return mean - swing * math.cos(phase)
+    return ambient
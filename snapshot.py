@@ -0,0 +1,84 @@
+#Runtime state on flash, so a reset can resume heater control straight away.
+
+import json
+import time
+
+class Snapshot:
+    """
+    The few values main.py needs before its first control decision: the
+    clock, the active setpoint, today's sun times and the lamp state.
+    load() reads them back at boot. save() rewrites the file when any of
+    them changed, or when the clock in it is more than max_age seconds
+    old. Values named in volatile, like the lamp state that flips every
+    few minutes, don't count as a change; they are only brought up to date
+    by those writes and forced ones. Flash then sees about 24 * 3600 /
+    max_age small writes a day, plus one per setpoint or sun time change.
+
+    The RP2040's RTC doesn't survive a reset, so until NTP answers the
+    saved clock is the best guess. It is behind by however long the board
+    was down, plus at most max_age; saving with force=True right before a
+    planned reset keeps that to the reset itself.
+
+    Parameters:
+      path     -- flash file
+      max_age  -- seconds the saved clock may fall behind before save() rewrites it
+      volatile -- names of values that are saved but never cause a save
+    """
+
+    def __init__(self, path='snapshot.json', max_age=900, volatile=()):
+        self.path = path
+        self.max_age = max_age
+        self.volatile = volatile
+        self.state = None  # What load() found
+        self._saved = None
+        self._saved_utc = 0
+        self.saves = 0
+        self.failures = 0
+
+    def load(self):
+        """The saved state as a dict with a 'utc' entry, or None if there is none."""
+        try:
+            with open(self.path) as f:
+                state = json.load(f)
+        except (OSError, ValueError):
+            return None
+        if not isinstance(state, dict) or 'utc' not in state:
+            return None
+        self.state = state
+        self._saved_utc = state['utc']
+        self._saved = {name: value for name, value in state.items() if name != 'utc'}
+        return state
+
+    def _changed(self, values):
+        if self._saved is None:
+            return True
+        for name, value in values.items():
+            if name not in self.volatile and self._saved.get(name) != value:
+                return True
+        return False
+
+    def save(self, force=False, **values):
+        """Write values plus the current UTC if needed. Returns True if the file was written."""
+        utc = time.time()
+        if not force and not self._changed(values) and 0 <= utc - self._saved_utc < self.max_age:
+            return False
+        state = dict(values)
+        state['utc'] = utc
+        try:
+            with open(self.path, 'w') as f:
+                json.dump(state, f)
+        except OSError as e:
+            self.failures += 1
+            print(f"Snapshot write failed: {e}")
+            return False
+        self._saved = values
+        self._saved_utc = utc
+        self.saves += 1
+        return True
+
+    def stats(self):
+        return {
+            'saves': self.saves,
+            'failures': self.failures,
+            'age': time.time() - self._saved_utc if self._saved is not None else None,
+        }
@@ -0,0 +1,87 @@
+import math
+from array import array
+
+# Sun's centre 0.833° below the horizon: refraction plus the solar radius
+ZENITH = 90.833
+
+_DAYS_BEFORE_MONTH = (0, 31, 59, 90, 120, 151, 181, 212, 243, 273, 304, 334)
+
+def is_leap(year):
+    return year % 4 == 0 and (year % 100 != 0 or year % 400 == 0)
+
+def day_of_year(year, month, day):
+    return _DAYS_BEFORE_MONTH[month - 1] + day + (1 if month > 2 and is_leap(year) else 0)
+
+def days_since_j2000(year, yday):
+    """Days from 2000-01-01 12:00 UTC to 00:00 UTC on a day of the year."""
+    y = year - 1
+    # 484 leap days fall before 2000 in the proleptic Gregorian calendar
+    leaps = y // 4 - y // 100 + y // 400 - 484
+    return (year - 2000) * 365 + leaps + yday - 1.5
+
+def _sun(n):
+    """Equation of time (minutes) and declination (radians), n days from J2000.0."""
+    # Low precision solar coordinates from the Astronomical Almanac, ~0.01° for 1950-2050
+    mean_long = (280.460 + 0.9856474 * n) % 360
+    g = math.radians((357.528 + 0.9856003 * n) % 360)
+    ecl_long = math.radians(mean_long + 1.915 * math.sin(g) + 0.020 * math.sin(2 * g))
+    obliq = math.radians(23.439 - 0.0000004 * n)
+    ra = math.degrees(math.atan2(math.cos(obliq) * math.sin(ecl_long), math.cos(ecl_long)))
+    decl = math.asin(math.sin(obliq) * math.sin(ecl_long))
+    eqtime = 4 * ((mean_long - ra + 180) % 360 - 180)
+    return eqtime, decl
+
+def _event(day0, lat, lon, minutes, sign):
+    # Position of the sun at the estimated event time, then the hour angle
+    # where it crosses ZENITH. sign is -1 for sunrise, +1 for sunset.
+    eqtime, decl = _sun(day0 + minutes / 1440)
+    phi = math.radians(lat)
+    cos_ha = math.cos(math.radians(ZENITH)) / (math.cos(phi) * math.cos(decl)) - math.tan(phi) * math.tan(decl)
+    if cos_ha > 1 or cos_ha < -1:
+        return None
+    ha = math.degrees(math.acos(cos_ha))
+    return 720 - 4 * (lon - sign * ha) - eqtime
+
+def sun_times(year, yday, lat, lon):
+    """
+    Sunrise and sunset for a day of the year at a location, in minutes after
+    00:00 UTC of that date (sunset can run past 1440 west of Greenwich).
+    Either value is None when the sun doesn't rise or set that day.
+
+    The sun's position is evaluated at noon, then again at the estimated
+    event time; good to about a minute at mid latitudes.
+    """
+    day0 = days_since_j2000(year, yday)
+    times = []
+    for sign in (-1, 1):
+        t = _event(day0, lat, lon, 720, sign)
+        if t is not None:
+            t = _event(day0, lat, lon, t, sign)
+        times.append(t)
+    return times[0], times[1]
+
+class SunTable:
+    """
+    Sunrise and sunset for every day of a year, precomputed into an array
+    of whole UTC minutes (4 bytes per day), so lookups are just indexing.
+    Days with no sunrise or sunset hold -32768.
+    """
+
+    MISSING = -32768
+
+    def __init__(self, year, lat, lon):
+        self.year = year
+        self.lat = lat
+        self.lon = lon
+        days = 366 if is_leap(year) else 365
+        self.minutes = array('h', [0] * (2 * days))
+        for yday in range(1, days + 1):
+            rise, sset = sun_times(year, yday, lat, lon)
+            self.minutes[2 * yday - 2] = self.MISSING if rise is None else int(rise + 0.5)
+            self.minutes[2 * yday - 1] = self.MISSING if sset is None else int(sset + 0.5)
+
+    def utc_minutes(self, yday):
+        """(sunrise, sunset) in UTC minutes after midnight for a day of the year."""
+        rise = self.minutes[2 * yday - 2]
+        sset = self.minutes[2 * yday - 1]
+        return (None if rise == self.MISSING else rise, None if sset == self.MISSING else sset)
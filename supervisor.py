@@ -0,0 +1,180 @@
+#Runs the main loop's tasks one by one and restarts the ones that crash.
+
+import time
+import uasyncio as asyncio
+
+class TaskInfo:
+    def __init__(self, name, fn, args):
+        self.name = name
+        self.fn = fn
+        self.args = args
+        self.state = 'waiting'
+        self.starts = 0
+        self.crashes = 0
+        self.last_error = None
+        self.backoff = 0
+        self.iterations = 0
+        self.busy_ms = 0  # Total over all iterations
+        self.last_ms = 0
+        self.max_ms = 0
+        self.resumed = None
+
+class Supervisor:
+    """
+    Runs each task in its own uasyncio task instead of one gather, so an
+    exception in one of them no longer takes the rest down. A task that
+    raises is restarted after a backoff that starts at backoff seconds and
+    doubles up to max_backoff, resetting once the task has stayed up for
+    stable seconds. A task that returns is left finished.
+
+    Tasks that sleep with pause() instead of asyncio.sleep() also get
+    per-iteration timing: the time from waking up to the next pause(),
+    including any awaits in between. A probe measures event loop lag: how
+    much later than asked a lag_period_ms sleep comes back.
+
+    Given a profiler.Profiler, every task is wrapped to time its steps
+    and the lag probe feeds its histogram.
+
+    Parameters:
+      on_crash    -- async function(name, exception) run before the restart wait
+      backoff     -- seconds before the first restart
+      max_backoff -- longest wait before a restart
+      stable      -- seconds a task must run before its backoff resets
+      lag_period_ms -- how often the loop lag probe runs
+      profiler    -- a profiler.Profiler, or None
+    """
+
+    def __init__(self, on_crash=None, backoff=1, max_backoff=300, stable=600, lag_period_ms=250, profiler=None):
+        self.on_crash = on_crash
+        self.profiler = profiler
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.stable = stable
+        self.lag_period_ms = lag_period_ms
+        self.tasks = {}
+        self._running = {}  # uasyncio task -> TaskInfo, for pause()
+        self.lag_last = 0
+        self.lag_max = 0
+        self._lag_total = 0
+        self._lag_samples = 0
+
+    def add(self, name, fn, *args):
+        """Register a task; fn(*args) must return a new coroutine each time it is called."""
+        self.tasks[name] = TaskInfo(name, fn, args)
+
+    async def pause(self, seconds):
+        """asyncio.sleep() that also ends one timed iteration of the calling task."""
+        info = self._running.get(asyncio.current_task())
+        if info is None:
+            await asyncio.sleep(seconds)
+            return
+        now = time.ticks_ms()
+        if info.resumed is not None:
+            ms = time.ticks_diff(now, info.resumed)
+            info.iterations += 1
+            info.busy_ms += ms
+            info.last_ms = ms
+            if ms > info.max_ms:
+                info.max_ms = ms
+        await asyncio.sleep(seconds)
+        info.resumed = time.ticks_ms()
+
+    async def _watch(self, info):
+        while True:
+            info.state = 'running'
+            info.starts += 1
+            info.resumed = time.ticks_ms()
+            started = time.time()
+            coro = info.fn(*info.args)
+            if self.profiler is not None:
+                coro = self.profiler.wrap(info.name, coro)
+            # A task of its own, so the scheduler steps the profiler's wrapper and pause() can find it
+            task = asyncio.create_task(coro)
+            self._running[task] = info
+            try:
+                await task
+                info.state = 'done'
+                return
+            except asyncio.CancelledError:
+                task.cancel()
+                raise
+            except Exception as e:
+                info.crashes += 1
+                info.last_error = repr(e)
+                info.state = 'backoff'
+                if time.time() - started >= self.stable:
+                    info.backoff = 0
+                info.backoff = min(info.backoff * 2 if info.backoff else self.backoff, self.max_backoff)
+                print(f"Task {info.name} crashed: {e!r}, restarting in {info.backoff} s")
+                if self.on_crash:
+                    try:
+                        await self.on_crash(info.name, e)
+                    except Exception as e2:
+                        print(f"Crash handler failed: {e2}")
+            finally:
+                del self._running[task]
+            await asyncio.sleep(info.backoff)
+
+    async def _lag_probe(self):
+        while True:
+            start = time.ticks_us()
+            await asyncio.sleep_ms(self.lag_period_ms)
+            lag_us = time.ticks_diff(time.ticks_us(), start) - self.lag_period_ms * 1000
+            if lag_us < 0:
+                lag_us = 0
+            if self.profiler is not None:
+                self.profiler.lag(lag_us)
+            lag = lag_us // 1000
+            self.lag_last = lag
+            if lag > self.lag_max:
+                self.lag_max = lag
+            self._lag_total += lag
+            self._lag_samples += 1
+
+    async def run(self):
+        """Start every task and the lag probe; runs until cancelled."""
+        tasks = [asyncio.create_task(self._watch(info)) for info in self.tasks.values()]
+        tasks.append(asyncio.create_task(self._lag_probe()))
+        try:
+            while True:
+                await asyncio.sleep(3600)
+        finally:
+            for task in tasks:
+                task.cancel()
+
+    def stats(self, slow_ms=100, top=6):
+        """
+        Compact enough for one 1 KB status value: how many tasks are in
+        each state, plus at most top tasks that crashed or took slow_ms or
+        more in one iteration, crashes first. Keys are short: st state,
+        cr crashes, err last error (first 40 characters), avg and max ms
+        per iteration.
+        """
+        states = {}
+        notable = []
+        for name, info in self.tasks.items():
+            states[info.state] = states.get(info.state, 0) + 1
+            if info.crashes or info.max_ms >= slow_ms:
+                notable.append((name, info))
+        notable.sort(key=lambda item: (item[1].crashes, item[1].max_ms), reverse=True)
+        tasks = {}
+        for name, info in notable[:top]:
+            entry = {}
+            if info.state != 'running':
+                entry['st'] = info.state
+            if info.crashes:
+                entry['cr'] = info.crashes
+                entry['err'] = info.last_error[:40]
+            if info.iterations:
+                entry['avg'] = info.busy_ms // info.iterations
+                entry['max'] = info.max_ms
+            tasks[name] = entry
+        return {
+            'states': states,
+            'tasks': tasks,
+            'lag_ms': {
+                'last': self.lag_last,
+                'avg': self._lag_total // self._lag_samples if self._lag_samples else 0,
+                'max': self.lag_max,
+            },
+        }
@@ -0,0 +1,195 @@
+import time
+
+# Estimated wire cost of one standalone POST that batching avoids:
+# TLS handshake with certificate chain plus request and response headers.
+# With a pooled keep-alive connection most of this is the headers alone, so
+# treat the figure as an upper bound.
+REQUEST_OVERHEAD_BYTES = 5000
+
+class TelemetryQueue:
+    """
+    Collects pending feed values and sends them to Adafruit IO in a single
+    POST to the group data endpoint instead of one POST per feed.
+
+    Sampled feeds (temperature, humidity, setpoint) only keep their newest
+    value with put(). Event feeds (lamp, status, lights) keep every message
+    with append(); the group endpoint takes one value per feed per request,
+    so extra events for the same feed go out in follow-up batches.
+
+    Sampled feeds listed in deltas are change-driven: a value is only
+    queued when it differs from the last one queued by more than the
+    feed's delta, or heartbeat seconds have passed. A flush with nothing
+    queued sends no request.
+
+    A 429 (rate limited) reply puts the batch back and holds off flushing,
+    for Retry-After seconds if the reply has one, otherwise for a backoff
+    that starts at interval and doubles up to max_backoff. The backoff
+    resets after the next accepted batch.
+
+    Feed keys are unprefixed because every feed lives in the Adafruit IO
+    default group.
+
+    Parameters:
+      aio       -- an AdafruitIO client
+      group     -- group key to post to (default: 'default')
+      interval  -- seconds between flushes
+      max_events -- cap on queued event messages, oldest are dropped first
+      deltas    -- {feed: smallest change worth sending}
+      heartbeat -- seconds after which a change-driven feed is sent anyway
+      max_backoff -- longest hold-off after a 429, in seconds
+    """
+
+    def __init__(self, aio, group='default', interval=10, max_events=32, deltas=None, heartbeat=300,
+                 max_backoff=600):
+        self.aio = aio
+        self.group = group
+        self.interval = interval
+        self.max_events = max_events
+        self.deltas = deltas or {}
+        self.heartbeat = heartbeat
+        self.max_backoff = max_backoff
+        self._latest = {}
+        self._events = []
+        self._sent = {}
+        self._hold_until = None
+        self.backoff = 0
+        self.started = time.time()
+        self.posts = 0
+        self.values_sent = 0
+        self.failures = 0
+        self.bytes_saved = 0
+        self.suppressed = 0
+        self.requests_avoided = 0
+        self.rate_limited = 0
+
+    def put(self, feed, value):
+        """Queue a sampled value, replacing any unsent value for the same feed."""
+        delta = self.deltas.get(feed)
+        if delta is not None:
+            now = time.time()
+            last = self._sent.get(feed)
+            if last is not None and abs(value - last[0]) <= delta and now - last[1] < self.heartbeat:
+                self.suppressed += 1
+                return
+            self._sent[feed] = (value, now)
+        self._latest[feed] = value
+
+    def append(self, feed, value):
+        """Queue an event value; every event is delivered in order."""
+        if len(self._events) >= self.max_events:
+            self._events.pop(0)
+        self._events.append((feed, value))
+
+    def pending(self):
+        return len(self._latest) + len(self._events)
+
+    def _next_batch(self):
+        batch = []
+        seen = []
+        for feed in self._latest:
+            batch.append({'key': feed, 'value': self._latest[feed]})
+            seen.append(feed)
+        self._latest = {}
+        rest = []
+        for feed, value in self._events:
+            if feed in seen:
+                rest.append((feed, value))
+            else:
+                batch.append({'key': feed, 'value': value})
+                seen.append(feed)
+        self._events = rest
+        return batch
+
+    def _requeue(self, batch):
+        # Put a failed batch back in front of anything queued since
+        for item in reversed(batch):
+            feed, value = item['key'], item['value']
+            if feed in self._latest:
+                continue
+            self._events.insert(0, (feed, value))
+        del self._events[self.max_events:]
+
+    def _account(self, batch):
+        # Bytes the same values would have cost as one POST each
+        single = 0
+        for item in batch:
+            single += REQUEST_OVERHEAD_BYTES + len(str(item['value'])) + 12
+        grouped = REQUEST_OVERHEAD_BYTES + 12
+        for item in batch:
+            grouped += len(item['key']) + len(str(item['value'])) + 24
+        self.posts += 1
+        self.values_sent += len(batch)
+        self.bytes_saved += single - grouped
+
+    def _rate_limit(self, reply):
+        self.rate_limited += 1
+        self.backoff = min(self.backoff * 2 if self.backoff else self.interval, self.max_backoff)
+        try:
+            wait = max(int(reply.headers.get('retry-after', 0)), self.backoff)
+        except ValueError:
+            wait = self.backoff
+        self._hold_until = time.ticks_add(time.ticks_ms(), wait * 1000)
+        print(f"Telemetry rate limited, holding off {wait} s")
+
+    def holding(self):
+        """True while flushing is held off after a 429."""
+        if self._hold_until is None:
+            return False
+        if time.ticks_diff(self._hold_until, time.ticks_ms()) > 0:
+            return True
+        self._hold_until = None
+        return False
+
+    async def flush(self):
+        """
+        Send everything queued. Returns the created_at string of the last
+        accepted batch, or None if nothing was accepted.
+        """
+        created_at = None
+        if self.holding():
+            return None
+        if not self.pending():
+            self.requests_avoided += 1
+            return None
+        while self.pending():
+            batch = self._next_batch()
+            try:
+                reply = await self.aio.post_group(batch, self.group)
+                if reply.status_code == 200:
+                    self._account(batch)
+                    self.backoff = 0
+                    data = reply.json()
+                    if isinstance(data, list) and data:
+                        created_at = data[0].get('created_at', created_at)
+                elif reply.status_code == 429:
+                    self._rate_limit(reply)
+                    reply.close()
+                    self._requeue(batch)
+                    break
+                else:
+                    print(reply.status_code)
+                    print(reply.text)
+                    self.failures += 1
+                reply.close()
+            except Exception as e:
+                print(f"Failed to send telemetry: {e}")
+                self.failures += 1
+                self._requeue(batch)
+                break
+        return created_at
+
+    def stats(self):
+        """Requests and bytes saved per hour compared to one POST per value."""
+        hours = max(time.time() - self.started, 1) / 3600
+        saved = self.values_sent - self.posts
+        return {
+            'posts': self.posts,
+            'values': self.values_sent,
+            'failures': self.failures,
+            'requests_saved_per_hour': round(saved / hours, 1),
+            'bytes_saved_per_hour': int(self.bytes_saved / hours),
+            'suppressed': self.suppressed,
+            'requests_avoided': self.requests_avoided,
+            'rate_limited': self.rate_limited,
+            'backoff': self.backoff,
+        }
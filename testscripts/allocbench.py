@@ -0,0 +1,55 @@
+#Heap allocated per 1000 SEN0546 reads against the fake I2C bus.
+#Run from the project folder on the unix port (or copy sim/ to the Pico):
+#   micropython testscripts/allocbench.py
+
+import sys, gc
+sys.path.append('.')
+import sim
+from sim import hardware
+sim.install()
+import sen0546
+from sen0546 import SEN0546
+
+READS = 1000
+sen0546.CONVERSION_MS = 0  # No need to wait on a fake sensor
+
+hardware.I2C.devices[0x40] = hardware.StaticDevice(hardware.sen0546_frame(75.0, 55.0))
+sensor = SEN0546(scl_pin=19, sda_pin=18)
+
+if not hasattr(gc, 'mem_alloc'):
+    # CPython frees temporaries by refcount, so only MicroPython's counter is meaningful
+    print("gc.mem_alloc() is MicroPython only, run this on the unix port or the Pico")
+    sys.exit()
+
+def allocated(fn):
+    gc.collect()
+    gc.disable()
+    before = gc.mem_alloc()
+    fn()
+    after = gc.mem_alloc()
+    gc.enable()
+    return after - before
+
+def old_path():
+    # What the driver did before: new bytes per read, float math, fresh tuple, round()
+    for _ in range(READS):
+        sensor.i2c.writeto(0x40, b'\x00')
+        raw = sensor.i2c.readfrom(0x40, 4)
+        temp_c = (((raw[0] << 8) | raw[1]) * 165.0 / 65535.0) - 40.0
+        humidity = (((raw[2] << 8) | raw[3]) * 100.0) / 65535.0
+        reading = (temp_c * 9.0/5.0 + 32.0, humidity)
+        round(reading[0], 1)
+
+def read_path():
+    for _ in range(READS):
+        sensor.read()
+
+def update_path():
+    for _ in range(READS):
+        sensor.update()
+
+print(f"Bytes allocated per {READS} reads:")
+print(f"  previous driver : {allocated(old_path)}")
+print(f"  read()          : {allocated(read_path)}")
+print(f"  update()        : {allocated(update_path)}")
+print(f"Last reading: {sensor.temp_x10 / 10} F, {sensor.humidity_x10 / 10} %")
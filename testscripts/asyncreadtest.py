@@ -0,0 +1,54 @@
+#Shows the event loop staying responsive while the sensors convert.
+#Runs on the host against the fake I2C bus, from the project folder:
+#   python testscripts/asyncreadtest.py
+
+import sys, time
+sys.path.append('.')
+import sim
+from sim import hardware
+sim.install()
+import uasyncio as asyncio
+from sen0546 import SEN0546
+from adafruit_sht4x import SHT4x, Mode
+
+READS = 10
+
+hardware.I2C.devices[0x40] = hardware.StaticDevice(hardware.sen0546_frame(75.0, 55.0))
+hardware.I2C.devices[0x44] = hardware.StaticDevice(hardware.sht4x_frame(75.0, 55.0))
+
+async def ticker(gaps, done):
+    last = time.ticks_ms()
+    while not done:
+        await asyncio.sleep_ms(1)
+        now = time.ticks_ms()
+        gaps.append(time.ticks_diff(now, last))
+        last = now
+
+async def measure(name, read):
+    gaps = []
+    done = []
+    task = asyncio.create_task(ticker(gaps, done))
+    await asyncio.sleep_ms(5)
+    for _ in range(READS):
+        result = await read()
+        await asyncio.sleep_ms(2)
+    done.append(True)
+    await task
+    print(f"{name}: {result[0]:.1f} F {result[1]:.1f} %, longest loop stall {max(gaps)} ms")
+
+async def main():
+    sen = SEN0546(scl_pin=19, sda_pin=18)
+    sht = SHT4x(1, 18, 19)
+    sht.mode = Mode.HIGHHEAT_100MS
+
+    async def sen_sync():
+        return sen.read()
+    async def sht_sync():
+        return sht.measurements()
+
+    await measure("SEN0546 read()", sen_sync)
+    await measure("SEN0546 read_async()", sen.read_async)
+    await measure("SHT4x measurements() HIGHHEAT_100MS", sht_sync)
+    await measure("SHT4x read_async() HIGHHEAT_100MS", sht.read_async)
+
+asyncio.run(main())
@@ -0,0 +1,58 @@
+#Compares heat lamp controllers on a simulated enclosure: settling time,
+#overshoot, relay switches per hour and the steady-state temperature ripple. Run from the project folder:
+#   python testscripts/controlbench.py
+
+import sys
+sys.path.append('.')
+import sim
+sim.install()
+from sim.thermal import Enclosure
+from control import BangBang, TimeProportional
+
+AMBIENT = 66.0    # °F room temperature
+SETPOINT = 75.0
+HOURS = 6
+BAND = 0.5        # °F, settled once it stays within this of the setpoint
+
+def run(controller):
+    box = Enclosure(ambient=AMBIENT)
+    reading = box.step(False)
+    state = False
+    switches = 0
+    settled_at = None
+    crossed = False
+    peak = 0.0
+    steady_switches = 0
+    low, high = 999.0, -999.0  # Temperature range over the second half
+    for second in range(HOURS * 3600):
+        new_state = controller.update(reading, SETPOINT, second * 1000)
+        if new_state != state:
+            switches += 1
+            if second >= HOURS * 1800:
+                steady_switches += 1
+            state = new_state
+        reading = box.step(state)
+        if second >= HOURS * 1800:
+            low, high = min(low, box.temp), max(high, box.temp)
+        if box.temp >= SETPOINT:
+            crossed = True
+        if crossed:
+            peak = max(peak, box.temp - SETPOINT)
+        if abs(box.temp - SETPOINT) <= BAND:
+            if settled_at is None:
+                settled_at = second
+        else:
+            settled_at = None
+    return settled_at, peak, switches / HOURS, steady_switches / (HOURS / 2), high - low
+
+box = Enclosure(ambient=AMBIENT)
+print(f"Enclosure: ambient {AMBIENT} F, lamp +{box.lamp_gain} F, lags {box.tau_lamp}/{box.tau_enclosure}/{box.tau_sensor} s, setpoint {SETPOINT} F")
+print(f"{'controller':32}{'settle (min)':>14}{'overshoot F':>13}{'switch/h':>10}{'steady sw/h':>13}{'ripple F':>10}")
+for name, controller in (("bang-bang, deadband 0.25", BangBang(0.25)),
+                         ("PID time-prop, 120 s window", TimeProportional(window=120)),
+                         ("PID time-prop, defaults", TimeProportional()),
+                         ("PID time-prop, 420 s window", TimeProportional(window=420)),
+                         ("PID time-prop, 180 s, kp 0.1 kd 0", TimeProportional(0.1, 0.0001, 0, window=180))):
+    settled_at, peak, per_hour, steady, ripple = run(controller)
+    settle = 'never' if settled_at is None else f'{settled_at / 60:.1f}'
+    print(f"{name:32}{settle:>14}{peak:>13.2f}{per_hour:>10.1f}{steady:>13.1f}{ripple:>10.2f}")
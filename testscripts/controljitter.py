@@ -0,0 +1,96 @@
+#Control tick jitter under heavy uplink load: the tick as an asyncio task
+#next to the load (CONTROL_CORE = 0) versus dualcore.ControlCore on its own
+#thread (CONTROL_CORE = 1). The load stands in for TLS handshakes and JSON
+#parsing: blocking CPU bursts between awaits.
+#Runs on the host against the fake I2C bus, from the project folder:
+#   python testscripts/controljitter.py
+#On the host the second thread shares the GIL, so it only gets the CPU at
+#the interpreter's switch interval; on the Pico it has a core to itself.
+
+import sys, time, json, hashlib
+sys.path.append('.')
+import sim
+from sim import hardware
+sim.install()
+import uasyncio as asyncio
+from machine import Pin
+from sen0546 import SEN0546
+from sampler import Sampler
+from control import make_controller
+from dualcore import Mailbox, ControlCore
+
+PERIOD_MS = 100
+SECONDS = 5
+BURST_MS = 40  # Longest stretch the load holds the CPU without awaiting
+
+hardware.I2C.devices[0x40] = hardware.StaticDevice(hardware.sen0546_frame(74.0, 60.0))
+
+DOC = json.dumps({'feeds': [{'key': f'feed-{i}', 'value': i * 1.5, 'created_at': '2025-06-20T10:00:00Z'}
+                            for i in range(40)]})
+
+def burst():
+    # A TLS handshake's worth of hashing plus a reply's worth of JSON
+    end = time.ticks_add(time.ticks_ms(), BURST_MS)
+    h = hashlib.sha256()
+    while time.ticks_diff(end, time.ticks_ms()) > 0:
+        h.update(DOC.encode())
+        json.loads(DOC)
+
+async def uplink(done, count):
+    while not done:
+        burst()
+        count[0] += 1
+        await asyncio.sleep_ms(1)
+
+def make_core():
+    sampler = Sampler(SEN0546(scl_pin=19, sda_pin=18), max_age=5)
+    mailbox = Mailbox()
+    mailbox.set_setpoint(75.0)
+    return ControlCore(sampler, make_controller('bangbang'), Pin(4, Pin.OUT), mailbox, period_ms=PERIOD_MS)
+
+async def ticker(core, done):
+    # The CONTROL_CORE = 0 case: same tick and the same jitter accounting, driven from the event loop
+    slot = time.ticks_us()
+    while not done:
+        jitter = time.ticks_diff(time.ticks_us(), slot)
+        core._jitter_total += jitter
+        core.jitter_max_us = max(core.jitter_max_us, jitter)
+        core.tick()
+        slot = time.ticks_add(slot, PERIOD_MS * 1000)
+        wait = time.ticks_diff(slot, time.ticks_us())
+        if wait < 0:
+            core.overruns += 1
+            slot = time.ticks_us()
+        else:
+            await asyncio.sleep_ms(wait // 1000)
+
+def report(name, core, bursts):
+    s = core.stats()
+    print(f"{name}: {s['ticks']} ticks, jitter avg {s['jitter_avg_us'] / 1000:.1f} ms "
+          f"max {s['jitter_max_us'] / 1000:.1f} ms, {s['overruns']} overruns, {bursts} load bursts")
+
+async def single_loop():
+    core = make_core()
+    done = []
+    count = [0]
+    tasks = [asyncio.create_task(ticker(core, done)), asyncio.create_task(uplink(done, count))]
+    await asyncio.sleep(SECONDS)
+    done.append(True)
+    for task in tasks:
+        await task
+    report("Event loop (CONTROL_CORE = 0)", core, count[0])
+
+async def second_core():
+    core = make_core()
+    done = []
+    count = [0]
+    core.start()
+    task = asyncio.create_task(uplink(done, count))
+    await asyncio.sleep(SECONDS)
+    done.append(True)
+    await task
+    core.stop()
+    report("Own core    (CONTROL_CORE = 1)", core, count[0])
+
+asyncio.run(single_loop())
+asyncio.run(second_core())
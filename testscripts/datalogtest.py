@@ -0,0 +1,74 @@
+#Logs four simulated days of one-second readings, then checks the rollups and
+#the range reader against the raw readings. Run from the project folder:
+#   python testscripts/datalogtest.py
+
+import sys, os, time, tempfile
+sys.path.append('.')
+import sim
+sim.install()
+from sim.thermal import Enclosure, daily_ambient
+from control import BangBang
+from datalog import DataLog
+
+DAYS = 4
+START = 1750377600  # 2025-06-20 00:00 UTC
+SETPOINT = 75.0
+
+os.chdir(tempfile.mkdtemp(prefix='datalog-'))
+log = DataLog()
+box = Enclosure(ambient=daily_ambient())
+controller = BangBang(0.25)
+raw = {}  # minute start -> readings x10, for the check
+lamp = False
+t0 = time.ticks_ms()
+for second in range(DAYS * 86400):
+    epoch = START + second
+    temp = round(box.sensor_temp(), 1)
+    humidity = round(box.humidity(), 1)
+    lamp = controller.update(temp, SETPOINT, second * 1000)
+    log.add(epoch, temp, humidity, lamp)
+    if second >= (DAYS - 1) * 86400:
+        raw.setdefault(epoch - epoch % 60, []).append((int(round(temp * 10)), int(round(humidity * 10))))
+    box.step(lamp)
+log.flush()
+print(f"Logged {DAYS * 86400} readings in {time.ticks_diff(time.ticks_ms(), t0) / 1000:.1f} s")
+
+for name, series in (('minute', log.minute), ('hour', log.hour)):
+    stats = series.stats()
+    files = sorted(f for f in os.listdir() if f.startswith(series.name))
+    on_flash = sum(os.stat(f)[6] for f in files)
+    print(f"{name:6}: {stats['records']} records, {stats['writes']} writes, {stats['bytes']} bytes, "
+          f"{stats['rotations']} rotations, {len(files)} files, {on_flash} bytes on flash")
+
+# Check the last day's minutes against the raw readings
+checked = 0
+bad = 0
+day = START + (DAYS - 1) * 86400
+for record in log.minute.read(day, day + 86400):
+    temps = [t for t, h in raw[record[0]]]
+    hums = [h for t, h in raw[record[0]]]
+    expect = (min(temps), (sum(temps) + len(temps) // 2) // len(temps), max(temps),
+              min(hums), (sum(hums) + len(hums) // 2) // len(hums), max(hums))
+    if record[1:7] != expect:
+        bad += 1
+    checked += 1
+print(f"Last day: {checked} minute records checked against raw readings, {bad} mismatches")
+
+# Stream a two-hour window out of the middle of the log
+t0 = time.ticks_us()
+window = list(log.minute.read(day + 6 * 3600, day + 8 * 3600))
+elapsed = time.ticks_diff(time.ticks_us(), t0) / 1000
+print(f"Range read: {len(window)} records in {elapsed:.1f} ms, first {time.gmtime(window[0][0])[3]:02d}:00 UTC")
+for record in log.hour.read(day + 12 * 3600, day + 15 * 3600):
+    print(f"  hour {time.gmtime(record[0])[3]:02d}:00  temp {record[1] / 10}/{record[2] / 10}/{record[3] / 10} F  "
+          f"humidity {record[4] / 10}/{record[5] / 10}/{record[6] / 10} %  lamp {record[7]}%")
+
+# A warm boot's restored clock can be behind the log on flash: those readings are dropped
+end = START + DAYS * 86400
+rebooted = DataLog()
+for epoch in range(end - 900, end + 120):
+    rebooted.add(epoch, SETPOINT, 50.0, False)
+rebooted.flush()
+starts = [record[0] for record in rebooted.minute.read()]
+print(f"After a reboot 900 s behind: {rebooted.minute.stats()['dropped']} readings dropped, "
+      f"minute records {'in' if starts == sorted(starts) else 'OUT OF'} time order")
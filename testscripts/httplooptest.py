@@ -0,0 +1,67 @@
+#Measures the control loop period while slow uplinks are in flight.
+#Run from the project folder so asynchttp can be imported, e.g. on the unix port:
+#   micropython testscripts/httplooptest.py
+
+import sys, time
+sys.path.append('.')
+import uasyncio as asyncio
+import asynchttp
+
+PORT = 8081
+RESPONSE_DELAY = 2  # Seconds the stub server stalls before answering
+CONTROL_PERIOD_MS = 100
+RUN_SECONDS = 10
+
+async def stub_server(reader, writer):
+    # Read the request head and body, stall, then answer like Adafruit IO
+    length = 0
+    while True:
+        line = await reader.readline()
+        if not line or line == b'\r\n':
+            break
+        if line.lower().startswith(b'content-length:'):
+            length = int(line.split(b':')[1])
+    if length:
+        await reader.readexactly(length)
+    await asyncio.sleep(RESPONSE_DELAY)
+    body = b'[{"created_at": "2025-01-01T12:00:00Z"}]'
+    writer.write(b'HTTP/1.1 200 OK\r\nContent-Type: application/json\r\nContent-Length: %d\r\n\r\n' % len(body) + body)
+    await writer.drain()
+    writer.close()
+    await writer.wait_closed()
+
+async def uplink(stats):
+    url = f'http://127.0.0.1:{PORT}/api/v2/test/groups/default/data'
+    while True:
+        reply = await asynchttp.post(url, json={'feeds': [{'key': 'temperature-gecko', 'value': 72.1}]}, timeout=5)
+        reply.close()
+        stats['uplinks'] += 1
+
+async def control_loop(periods):
+    last = time.ticks_ms()
+    while True:
+        await asyncio.sleep_ms(CONTROL_PERIOD_MS)
+        now = time.ticks_ms()
+        periods.append(time.ticks_diff(now, last))
+        last = now
+
+async def main():
+    server = await asyncio.start_server(stub_server, '127.0.0.1', PORT)
+    periods = []
+    stats = {'uplinks': 0}
+    tasks = [asyncio.create_task(control_loop(periods))]
+    for _ in range(3):
+        tasks.append(asyncio.create_task(uplink(stats)))
+    await asyncio.sleep(RUN_SECONDS)
+    for task in tasks:
+        task.cancel()
+    server.close()
+    await server.wait_closed()
+
+    jitter = [abs(p - CONTROL_PERIOD_MS) for p in periods]
+    print(f"Uplinks completed: {stats['uplinks']}")
+    print(f"Control ticks: {len(periods)}, target period {CONTROL_PERIOD_MS} ms")
+    print(f"Period min/mean/max: {min(periods)} / {sum(periods) / len(periods):.1f} / {max(periods)} ms")
+    print(f"Max jitter: {max(jitter)} ms")
+
+asyncio.run(main())
@@ -0,0 +1,73 @@
+#Checks mqtt.py against the simulation's broker stub: current value on
+#subscribe, a pushed change, and a change made while disconnected arriving
+#on reconnect through the persistent session, and a broker that never sends
+#CONNACK timing out into the reconnect backoff. Run from the project folder:
+#   python testscripts/mqtttest.py
+
+import sys
+sys.path.append('.')
+import sim
+sim.install()
+import uasyncio as asyncio
+from sim.aioserver import FakeAdafruitIO
+from sim.broker import FakeBroker
+from mqtt import MQTTClient
+from adafruitio import AdafruitIOMQTT
+
+FEED = 'day-setpoint-gecko'
+
+aio = FakeAdafruitIO(feeds={FEED: 75.0}).start()
+broker = FakeBroker(aio).start()
+received = []
+
+async def settle():
+    await asyncio.sleep(0.2)
+
+async def main():
+    client = MQTTClient('sim-gecko', '127.0.0.1', broker.port, 'sim', 'sim-key', ssl=False)
+    client.callback = lambda topic, payload: received.append(payload.decode())
+    await client.connect()
+    await client.subscribe(f'sim/feeds/{FEED}')
+    await client.publish(f'sim/feeds/{FEED}/get', '')
+    reader = asyncio.create_task(client.run())
+    await settle()
+    print(f"Current value on subscribe: {received}")
+    aio.call(aio._store, FEED, 77.0)
+    await settle()
+    print(f"Pushed while connected:     {received[1:]}")
+    client.close()
+    reader.cancel()
+    await settle()  # Let the broker see the disconnect before the next write
+    aio.call(aio._store, FEED, 72.0)
+    await settle()
+    await client.connect()
+    reader = asyncio.create_task(client.run())
+    await settle()
+    print(f"Reconnected, session present {client.session_present}, queued while away: {received[2:]}")
+    await client.ping()
+    await settle()
+    reader.cancel()
+    client.close()
+    ok = received == ['75.0', '77.0', '72.0']
+    print("PASS" if ok else "FAIL", broker.packets)
+
+async def silent_broker():
+    # Accepts the connection, never answers
+    attempts = []
+    async def accept(reader, writer):
+        attempts.append(True)
+        await reader.read(-1)
+    server = await asyncio.start_server(accept, '127.0.0.1', 0)
+    io = AdafruitIOMQTT('sim', 'sim-key', keepalive=1, port=1883)
+    io.client.host = '127.0.0.1'
+    io.client.port = server.sockets[0].getsockname()[1]
+    task = asyncio.create_task(io.run())
+    await asyncio.sleep(3.5)
+    task.cancel()
+    io.client.close()
+    server.close()
+    ok = len(attempts) >= 2 and io.connects == 0
+    print("PASS" if ok else "FAIL", f"silent broker: {len(attempts)} connect attempts timed out")
+
+asyncio.run(main())
+asyncio.run(silent_broker())
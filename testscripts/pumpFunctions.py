@@ -5,19 +5,15 @@ def control_pump(state):
 async def manage_pump():
     while True:
         FEED_KEY = 'pump-gecko'
-        url = f'https://io.adafruit.com/api/v2/{ADAFRUIT_AIO_USERNAME}/feeds/{FEED_KEY}/data'
-        headers = {
-        'X-AIO-Key': ADAFRUIT_AIO_KEY,
-        'Content-Type': 'application/json'
-        }
-        response = requests.get(url+"/last",headers=headers)
+        response = await link.get_last(FEED_KEY)  # From RAM when AIO_TRANSPORT is 'mqtt'
         data = response.json()
+        response.close()
         if int(data["value"]) == 1:
             control_pump('on')  # Turn the pump on
             print("Pump turned ON manually.")
             await asyncio.sleep(10)  # Run the pump for 30 seconds
             control_pump('off')  # Turn the pump off
-            requests.post(url,headers=headers,json={"value":0})
+            await link.post_feed(FEED_KEY, 0)
         if current_hour == 8:  # Start pump at 8:00 AM
             control_pump('on')  # Turn the pump on
             print("Pump turned ON at 8:00 AM.")
@@ -0,0 +1,88 @@
+#Checks solar.sun_times against reference sunrise/sunset values for a full year.
+#The reference is the NOAA solar calculator spreadsheet algorithm (Meeus),
+#iterated to the event time. Run from the project folder:
+#   python testscripts/solartest.py
+
+import sys, time, math
+sys.path.append('.')
+import solar
+
+LAT, LON = 42.385408, -71.113114
+YEARS = (2025, 2028)
+TOLERANCE = 1.0  # minutes
+
+# Almanac sunrise/sunset for Boston, local clock time (EDT in June, EST in December)
+ALMANAC = (
+    ((2025, 6, 20), -240, (5, 7), (20, 24)),
+    ((2025, 12, 21), -300, (7, 11), (16, 15)),
+)
+
+def julian_day(year, month, day):
+    if month <= 2:
+        year -= 1
+        month += 12
+    a = year // 100
+    b = 2 - a + a // 4
+    return int(365.25 * (year + 4716)) + int(30.6001 * (month + 1)) + day + b - 1524.5
+
+def reference_event(year, month, day, lat, lon, sign):
+    minutes = 720.0
+    for _ in range(3):
+        t = (julian_day(year, month, day) + minutes / 1440 - 2451545.0) / 36525
+        l0 = math.radians((280.46646 + t * (36000.76983 + t * 0.0003032)) % 360)
+        m = math.radians(357.52911 + t * (35999.05029 - 0.0001537 * t))
+        e = 0.016708634 - t * (0.000042037 + 0.0000001267 * t)
+        c = (math.sin(m) * (1.914602 - t * (0.004817 + 0.000014 * t))
+             + math.sin(2 * m) * (0.019993 - 0.000101 * t) + math.sin(3 * m) * 0.000289)
+        omega = math.radians(125.04 - 1934.136 * t)
+        app_long = math.radians(math.degrees(l0) + c - 0.00569 - 0.00478 * math.sin(omega))
+        obliq = 23 + (26 + (21.448 - t * (46.815 + t * (0.00059 - t * 0.001813))) / 60) / 60
+        obliq = math.radians(obliq + 0.00256 * math.cos(omega))
+        decl = math.asin(math.sin(obliq) * math.sin(app_long))
+        y = math.tan(obliq / 2) ** 2
+        eqtime = 4 * math.degrees(y * math.sin(2 * l0) - 2 * e * math.sin(m)
+                                  + 4 * e * y * math.sin(m) * math.cos(2 * l0)
+                                  - 0.5 * y * y * math.sin(4 * l0) - 1.25 * e * e * math.sin(2 * m))
+        phi = math.radians(lat)
+        ha = math.degrees(math.acos(math.cos(math.radians(90.833)) / (math.cos(phi) * math.cos(decl))
+                                    - math.tan(phi) * math.tan(decl)))
+        minutes = 720 - 4 * (lon - sign * ha) - eqtime
+    return minutes
+
+def check_year(year):
+    days = 366 if solar.is_leap(year) else 365
+    worst = 0.0
+    worst_day = None
+    month, day = 1, 1
+    month_days = (31, 29 if solar.is_leap(year) else 28, 31, 30, 31, 30, 31, 31, 30, 31, 30, 31)
+    for yday in range(1, days + 1):
+        rise, sset = solar.sun_times(year, yday, LAT, LON)
+        ref_rise = reference_event(year, month, day, LAT, LON, -1)
+        ref_set = reference_event(year, month, day, LAT, LON, 1)
+        for err in (abs(rise - ref_rise), abs(sset - ref_set)):
+            if err > worst:
+                worst, worst_day = err, (year, month, day)
+        day += 1
+        if day > month_days[month - 1]:
+            month, day = month + 1, 1
+    return worst, worst_day
+
+failed = False
+for year in YEARS:
+    worst, worst_day = check_year(year)
+    ok = worst <= TOLERANCE
+    failed = failed or not ok
+    print(f"{year}: max error {worst:.2f} min on {worst_day} {'OK' if ok else 'FAIL'}")
+
+for (year, month, day), offset, rise_hm, set_hm in ALMANAC:
+    rise, sset = solar.sun_times(year, solar.day_of_year(year, month, day), LAT, LON)
+    for name, got, hm in (('sunrise', rise, rise_hm), ('sunset', sset, set_hm)):
+        err = abs(got + offset - (hm[0] * 60 + hm[1]))
+        ok = err <= TOLERANCE
+        failed = failed or not ok
+        print(f"{year}-{month:02d}-{day:02d} {name}: {err:.2f} min from almanac {'OK' if ok else 'FAIL'}")
+
+start = time.time()
+table = solar.SunTable(2025, LAT, LON)
+print(f"Year table: {len(table.minutes)} entries in {time.time() - start:.3f} s")
+print("FAILED" if failed else "All within tolerance")
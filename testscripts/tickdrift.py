@@ -0,0 +1,89 @@
+#Sampling period drift under uplink load: the old read_sensor() pacing, a
+#blocking read then asyncio.sleep(period), versus sampletick.TimerTick
+#(SAMPLE_TICK = 'timer') running a pipelined ControlCore.tick().
+#The load stands in for TLS handshakes and JSON parsing: blocking CPU
+#bursts between awaits.
+#Runs on the host against the fake I2C bus, from the project folder:
+#   python testscripts/tickdrift.py
+
+import sys, time, json, hashlib
+sys.path.append('.')
+import sim
+from sim import hardware
+sim.install()
+import uasyncio as asyncio
+from machine import Pin
+from sen0546 import SEN0546
+from sampler import Sampler
+from control import make_controller
+from dualcore import Mailbox, ControlCore
+from sampletick import TimerTick
+
+PERIOD_MS = 100
+SECONDS = 5
+BURST_MS = 40  # Longest stretch the load holds the CPU without awaiting
+
+hardware.I2C.devices[0x40] = hardware.StaticDevice(hardware.sen0546_frame(74.0, 60.0))
+
+DOC = json.dumps({'feeds': [{'key': f'feed-{i}', 'value': i * 1.5, 'created_at': '2025-06-20T10:00:00Z'}
+                            for i in range(40)]})
+
+def burst():
+    end = time.ticks_add(time.ticks_ms(), BURST_MS)
+    h = hashlib.sha256()
+    while time.ticks_diff(end, time.ticks_ms()) > 0:
+        h.update(DOC.encode())
+        json.loads(DOC)
+
+async def uplink(done):
+    while not done:
+        burst()
+        await asyncio.sleep_ms(1)
+
+def make_core(pipelined):
+    sampler = Sampler(SEN0546(scl_pin=19, sda_pin=18), max_age=5)
+    mailbox = Mailbox(lock=False)
+    mailbox.set_setpoint(75.0)
+    core = ControlCore(sampler, make_controller('bangbang'), Pin(4, Pin.OUT), mailbox,
+                       period_ms=PERIOD_MS, pipelined=pipelined)
+    return sampler, core
+
+def report(name, sampler, elapsed_ms, extra=''):
+    expected = elapsed_ms // PERIOD_MS
+    print(f"{name}: {sampler.reads} readings of {expected} due, "
+          f"{(expected - sampler.reads) * 100 / expected:.0f}% lost to drift{extra}")
+
+async def run_sleep():
+    sampler, core = make_core(False)
+    done = []
+
+    async def ticker():
+        while not done:
+            core.tick()
+            await asyncio.sleep_ms(PERIOD_MS)
+
+    start = time.ticks_ms()
+    tasks = [asyncio.create_task(ticker()), asyncio.create_task(uplink(done))]
+    await asyncio.sleep(SECONDS)
+    done.append(True)
+    for task in tasks:
+        await task
+    report("Sleep paced (SAMPLE_TICK = 'sleep')", sampler, time.ticks_diff(time.ticks_ms(), start))
+
+async def run_timer():
+    sampler, core = make_core(True)
+    done = []
+    tick = TimerTick(core.tick, PERIOD_MS)
+    start = time.ticks_ms()
+    tick.start()
+    task = asyncio.create_task(uplink(done))
+    await asyncio.sleep(SECONDS)
+    done.append(True)
+    await task
+    tick.stop()
+    s = tick.stats()
+    report("Timer tick  (SAMPLE_TICK = 'timer')", sampler, time.ticks_diff(time.ticks_ms(), start),
+           f", {s['missed']} missed, latency max {s['latency_max_ms']} ms")
+
+asyncio.run(run_sleep())
+asyncio.run(run_timer())
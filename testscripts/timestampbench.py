@@ -0,0 +1,74 @@
+#Comparisons per second and heap allocated, ISO string timestamps versus epoch ints.
+#Run from the project folder on the host or the unix port:
+#   python testscripts/timestampbench.py
+
+import sys, time, gc
+sys.path.append('.')
+import sim
+sim.install()
+import getSunriseSunset as gss
+
+COMPARISONS = 20000
+
+current_str = "2025-06-20T12:00:00"
+sunrise_str = "2025-06-20T05:07:00"
+current_int = time.mktime(gss.GetTimeTuple(current_str))
+sunrise_int = time.mktime(gss.GetTimeTuple(sunrise_str))
+
+def old_compare(currenttime, eventtime, newoffset):
+    # compare_timestamps() as it was in main.py
+    ct = time.mktime(gss.GetTimeTuple(currenttime))-newoffset
+    et = time.mktime(gss.GetTimeTuple(eventtime))-newoffset
+    if int(ct) >= int(et):
+        return True
+    else:
+        return False
+
+def old_timestamp(input_timestamp):
+    # GetTimeStamp() as it was, run for every telemetry reply
+    timestamp = []
+    for item in input_timestamp:
+        if item < 10:
+            timestamp.append(f'0{item}')
+        else:
+            timestamp.append(item)
+    return f'{timestamp[0]}-{timestamp[1]}-{timestamp[2]}T{timestamp[3]}:{timestamp[4]}:{timestamp[5]}'
+
+def old_path():
+    for _ in range(COMPARISONS):
+        old_compare(current_str, sunrise_str, 0)
+
+def new_path():
+    for _ in range(COMPARISONS):
+        current_int >= sunrise_int
+
+def old_edge():
+    for _ in range(COMPARISONS):
+        old_timestamp(time.gmtime(current_int))
+
+def new_edge():
+    for _ in range(COMPARISONS):
+        gss.GetTimeStamp(time.gmtime(current_int))
+
+def run(fn):
+    alloc = None
+    gc.collect()
+    if hasattr(gc, 'mem_alloc'):
+        gc.disable()
+        before = gc.mem_alloc()
+    start = time.ticks_us()
+    fn()
+    elapsed = time.ticks_diff(time.ticks_us(), start)
+    if hasattr(gc, 'mem_alloc'):
+        alloc = gc.mem_alloc() - before
+        gc.enable()
+    rate = COMPARISONS * 1000000 // max(elapsed, 1)
+    per_op = 'n/a (needs gc.mem_alloc)' if alloc is None else f'{alloc / COMPARISONS:.1f}'
+    return rate, per_op
+
+assert old_compare(current_str, sunrise_str, 0) == (current_int >= sunrise_int)
+print(f"{'':28}{'ops/s':>12}  bytes/op")
+for name, fn in (("compare, ISO strings", old_path), ("compare, epoch ints", new_path),
+                 ("format, old GetTimeStamp", old_edge), ("format, new GetTimeStamp", new_edge)):
+    rate, per_op = run(fn)
+    print(f"{name:28}{rate:>12}  {per_op}")
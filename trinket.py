@@ -0,0 +1,214 @@
+#Non-blocking command channel to the Pro Trinket NeoPixel controller.
+
+import time
+import uasyncio as asyncio
+
+FRAME = 5  # lighttype, r, g, b, brightness
+
+class TrinketChannel:
+    """
+    Queues color frames for the Trinket and writes them from run(), so a
+    Trinket that stops answering costs a few awaited retries instead of
+    freezing the event loop (and the heater control with it).
+
+    Frames are kept in a preallocated ring, so send() doesn't allocate. A
+    frame identical to the last one written for its lighttype is dropped,
+    and a newer frame replaces one for the same lighttype still waiting in
+    the queue.
+
+    A failed write is tried retries times in all, waiting backoff_ms
+    before the first retry and doubling after that. If every try fails,
+    the Trinket is reset through its reset pin. It comes back dark, so the
+    latest frame of every lighttype is queued again. If it fails again
+    straight after a reset, the next reset waits longer, doubling up to
+    max_backoff_ms.
+
+    Until run() is started (boot, shutdown) send() writes straight away
+    with the same bounded retries, sleeping instead of awaiting.
+
+    Parameters:
+      i2c            -- machine.I2C the Trinket is on
+      address        -- its I2C address
+      reset_pin      -- machine.Pin wired to the Trinket reset, or None
+      size           -- frames the queue holds; the oldest is dropped when full
+      retries        -- write attempts per frame before a reset
+      backoff_ms     -- wait before the first retry
+      max_backoff_ms -- longest wait between resets of a Trinket that stays down
+    """
+
+    def __init__(self, i2c, address=0x12, reset_pin=None, size=8, retries=3, backoff_ms=50,
+                 max_backoff_ms=60000):
+        self.i2c = i2c
+        self.address = address
+        self.reset_pin = reset_pin
+        self.size = size
+        self.retries = retries
+        self.backoff_ms = backoff_ms
+        self.max_backoff_ms = max_backoff_ms
+        self._ring = bytearray(size * FRAME)
+        self._view = memoryview(self._ring)
+        self._head = 0
+        self._count = 0
+        self._frame = bytearray(FRAME)  # send() builds frames here
+        self._out = bytearray(FRAME)  # run() writes from here
+        self._last = {}  # lighttype -> last frame written
+        self._ready = asyncio.Event()
+        self._hold_ms = 0
+        self._error = None
+        self.running = False
+        self.sent = 0
+        self.deduplicated = 0
+        self.failed = 0
+        self.retried = 0
+        self.dropped = 0
+        self.resets = 0
+
+    def send(self, lighttype, r, g, b, brightness):
+        """Queue a frame; returns immediately once run() has started."""
+        f = self._frame
+        f[0] = lighttype
+        f[1] = r
+        f[2] = g
+        f[3] = b
+        f[4] = brightness
+        pos = self._queued(lighttype)
+        if pos >= 0:
+            self._view[pos:pos + FRAME] = f
+            self.deduplicated += 1
+            return
+        if self._last.get(lighttype) == f:
+            self.deduplicated += 1
+            return
+        if not self.running:
+            self._write_now(f)
+            return
+        if self._count == self.size:
+            self._head = (self._head + 1) % self.size
+            self._count -= 1
+            self.dropped += 1
+        pos = (self._head + self._count) % self.size * FRAME
+        self._view[pos:pos + FRAME] = f
+        self._count += 1
+        self._ready.set()
+
+    def _queued(self, lighttype):
+        # Ring offset of the queued frame for a lighttype, or -1
+        for k in range(self._count):
+            pos = (self._head + k) % self.size * FRAME
+            if self._ring[pos] == lighttype:
+                return pos
+        return -1
+
+    def stop(self):
+        """
+        Write directly from now on, and whatever is still queued first. For
+        shutdown paths once the event loop has exited, since uasyncio
+        doesn't cancel the run() task.
+        """
+        self.running = False
+        while self._count:
+            pos = self._head * FRAME
+            self._out[:] = self._view[pos:pos + FRAME]
+            self._head = (self._head + 1) % self.size
+            self._count -= 1
+            self._write_now(self._out)
+
+    def pending(self):
+        return self._count
+
+    def _try(self, frame):
+        try:
+            self.i2c.writeto(self.address, frame)
+        except OSError as e:
+            self._error = e
+            return False
+        last = self._last.get(frame[0])
+        if last is None:
+            self._last[frame[0]] = bytearray(frame)
+        else:
+            last[:] = frame
+        self.sent += 1
+        return True
+
+    def _write_now(self, frame):
+        delay = self.backoff_ms
+        for attempt in range(self.retries):
+            if self._try(frame):
+                return True
+            if attempt + 1 < self.retries:
+                self.retried += 1
+                time.sleep_ms(delay)
+                delay *= 2
+        self.failed += 1
+        print(f"Error sending color: {self._error}, resetting Trinket")
+        self.reset()
+        return False
+
+    def reset(self):
+        """Pulse the Trinket reset pin, blocking for 200 ms."""
+        if self.reset_pin is None:
+            return
+        self.reset_pin.low()
+        time.sleep(.1)
+        self.reset_pin.high()
+        time.sleep(.1)
+        self.resets += 1
+        self._last = {}  # It comes back dark, don't skip anything as a repeat
+
+    async def _reset(self, failed):
+        if self._hold_ms:
+            await asyncio.sleep_ms(self._hold_ms)
+        if self.reset_pin is not None:
+            self.reset_pin.low()
+            await asyncio.sleep_ms(100)
+            self.reset_pin.high()
+            await asyncio.sleep_ms(100)
+            self.resets += 1
+        self._hold_ms = min(self._hold_ms * 2 if self._hold_ms else 1000, self.max_backoff_ms)
+        # The failed frame is still what its lighttype should show
+        self._last[failed[0]] = bytearray(failed)
+        frames = list(self._last.values())
+        self._last = {}
+        for frame in frames:
+            if self._queued(frame[0]) < 0:
+                self.send(*frame)
+
+    async def run(self):
+        self.running = True
+        out = self._out
+        try:
+            while True:
+                if not self._count:
+                    self._ready.clear()
+                    await self._ready.wait()
+                    continue
+                pos = self._head * FRAME
+                out[:] = self._view[pos:pos + FRAME]
+                self._head = (self._head + 1) % self.size
+                self._count -= 1
+                delay = self.backoff_ms
+                for attempt in range(self.retries):
+                    if self._try(out):
+                        self._hold_ms = 0
+                        break
+                    if attempt + 1 < self.retries:
+                        self.retried += 1
+                        await asyncio.sleep_ms(delay)
+                        delay *= 2
+                else:
+                    self.failed += 1
+                    print(f"Error sending color: {self._error}, resetting Trinket")
+                    await self._reset(out)
+        finally:
+            self.running = False
+
+    def stats(self):
+        return {
+            'sent': self.sent,
+            'deduplicated': self.deduplicated,
+            'failed': self.failed,
+            'retried': self.retried,
+            'dropped': self.dropped,
+            'resets': self.resets,
+            'pending': self._count,
+        }
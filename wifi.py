@@ -0,0 +1,170 @@
+#Wi-Fi connection manager that never blocks the event loop.
+
+import time
+import network
+import random
+import uasyncio as asyncio
+
+IDLE = 'idle'
+CONNECTING = 'connecting'
+CONNECTED = 'connected'
+BACKOFF = 'backoff'
+
+class WifiManager:
+    """
+    Keeps the station connected from run(), in explicit states:
+
+      idle       -- not connected, about to try
+      connecting -- connect() issued, polling for up to timeout seconds
+      connected  -- checked every check_interval seconds
+      backoff    -- waiting before the next try
+
+    Every wait is an await, so heater control keeps running through an
+    outage. The wait after a failed try starts at backoff seconds and
+    doubles up to max_backoff. Each wait is jittered to between half and
+    all of that, so a router reboot doesn't have every board on the
+    network retrying in lockstep.
+
+    Tasks can wait for wait_connected() / wait_disconnected() instead of
+    polling isconnected(). on_change(state, previous) is called on every
+    state change.
+
+    Counters: connects, disconnects, attempts, time from losing the
+    connection to having it back (last and max), and the worst event
+    loop lag seen while polling during an outage.
+
+    Parameters:
+      ssid, password -- network to join
+      timeout        -- seconds to wait for association per try
+      backoff        -- seconds before the first retry
+      max_backoff    -- longest wait between tries
+      check_interval -- seconds between checks while connected
+      on_change      -- function(state, previous), or None
+    """
+
+    def __init__(self, ssid, password, timeout=10, backoff=1, max_backoff=60, check_interval=5, on_change=None):
+        self.ssid = ssid
+        self.password = password
+        self.timeout = timeout
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.check_interval = check_interval
+        self.on_change = on_change
+        self.wlan = None
+        self.state = IDLE
+        self._up = asyncio.Event()
+        self._down = asyncio.Event()
+        self._down.set()
+        self._delay = backoff
+        self._lost_at = None
+        self.connects = 0
+        self.disconnects = 0
+        self.attempts = 0
+        self.last_reconnect_s = None
+        self.max_reconnect_s = 0
+        self.outage_lag_ms = 0
+
+    def _set_state(self, state):
+        previous = self.state
+        if state == previous:
+            return
+        self.state = state
+        if state == CONNECTED:
+            self._down.clear()
+            self._up.set()
+        elif previous == CONNECTED:
+            self._up.clear()
+            self._down.set()
+        if self.on_change:
+            self.on_change(state, previous)
+
+    def _start(self):
+        if self.wlan is None:
+            self.wlan = network.WLAN(network.STA_IF)
+            self.wlan.active(True)
+        self.attempts += 1
+        self._set_state(CONNECTING)
+        self.wlan.connect(self.ssid, self.password)
+
+    def _connected(self):
+        self.connects += 1
+        self._delay = self.backoff
+        if self._lost_at is not None:
+            self.last_reconnect_s = time.ticks_diff(time.ticks_ms(), self._lost_at) // 1000
+            if self.last_reconnect_s > self.max_reconnect_s:
+                self.max_reconnect_s = self.last_reconnect_s
+            self._lost_at = None
+        print(f'Connected to {self.ssid}.')
+        self._set_state(CONNECTED)
+
+    def _jittered(self):
+        # Between half and all of the current backoff
+        return self._delay / 2 + self._delay / 2 * random.getrandbits(8) / 255
+
+    def isconnected(self):
+        return self.state == CONNECTED and self.wlan.isconnected()
+
+    async def wait_connected(self):
+        await self._up.wait()
+
+    async def wait_disconnected(self):
+        await self._down.wait()
+
+    def connect_now(self, timeout=30):
+        """Blocking connect for boot, before the event loop runs. Returns True if connected."""
+        print('Attempting to Connect to WiFi...')
+        deadline = time.ticks_add(time.ticks_ms(), timeout * 1000)
+        while time.ticks_diff(deadline, time.ticks_ms()) > 0:
+            self._start()
+            for _ in range(self.timeout):
+                if self.wlan.isconnected():
+                    self._connected()
+                    return True
+                time.sleep(1)
+        print(f'No WiFi after {timeout} s, carrying on offline.')
+        self._set_state(BACKOFF)
+        return False
+
+    async def _sleep(self, seconds):
+        # Sleeps that happen while offline also measure how late they wake up
+        start = time.ticks_ms()
+        await asyncio.sleep(seconds)
+        lag = time.ticks_diff(time.ticks_ms(), start) - int(seconds * 1000)
+        if lag > self.outage_lag_ms:
+            self.outage_lag_ms = lag
+
+    async def run(self):
+        while True:
+            if self.state == CONNECTED:
+                if self.wlan.isconnected():
+                    await asyncio.sleep(self.check_interval)
+                    continue
+                print("Wi-Fi disconnected! Attempting to reconnect...")
+                self.disconnects += 1
+                self._lost_at = time.ticks_ms()
+                self._set_state(IDLE)
+            if self._lost_at is None:
+                self._lost_at = time.ticks_ms()
+            self._start()
+            for _ in range(self.timeout):
+                await self._sleep(1)
+                if self.wlan.isconnected():
+                    self._connected()
+                    break
+            else:
+                delay = self._jittered()
+                print(f"Retrying WiFi in {delay:.1f} seconds...")
+                self._set_state(BACKOFF)
+                await self._sleep(delay)
+                self._delay = min(self._delay * 2, self.max_backoff)
+
+    def stats(self):
+        return {
+            'state': self.state,
+            'connects': self.connects,
+            'disconnects': self.disconnects,
+            'attempts': self.attempts,
+            'last_reconnect_s': self.last_reconnect_s,
+            'max_reconnect_s': self.max_reconnect_s,
+            'outage_lag_ms': self.outage_lag_ms,
+        }